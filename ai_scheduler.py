@@ -0,0 +1,141 @@
+"""
+This module defines the AIScheduler class, which time-slices enemy AI updates based on
+distance to the player and the enemy's current AI state.
+Classes:
+    AIScheduler: Spreads enemy updates across frames in round-robin buckets.
+How it works:
+    Every enemy is assigned an update interval (1, 2, 4 or 8 frames). Enemies sharing an
+    interval are spread over that many buckets, and each frame only the bucket whose phase
+    matches the frame counter is updated. Enemies that are skipped accumulate frames, which
+    are passed to Enemy.update as dt so movement and cooldowns stay consistent.
+    A hard per-frame budget (in microseconds) caps the total AI time. Enemies that are due
+    but do not fit in the budget are deferred to the next frame.
+AIScheduler Methods:
+    __init__(budget_us): Initializes the scheduler with an empty set of buckets.
+    add(enemy): Registers an enemy; new enemies start in the every-frame bucket.
+    remove(enemy): Unregisters an enemy.
+    clear(): Unregisters all enemies.
+    update(players, obstacles, projectiles): Runs the due enemies for this frame, each against its nearest player.
+    get_interval(enemy): Returns the update interval an enemy should use.
+    get_stats(): Returns the per-bucket counters.
+"""
+
+import time
+from constants import *
+from helpers import nearest
+
+# Update intervals in frames, in priority order
+AI_INTERVALS = (1, 2, 4, 8)
+
+
+class AIScheduler:
+    def __init__(self, budget_us=AI_FRAME_BUDGET_US):
+        self.budget_us = budget_us
+        self.frame = 0
+        # buckets[interval][phase] -> list of enemies
+        self.buckets = {interval: [[] for _ in range(interval)] for interval in AI_INTERVALS}
+        # Enemies that were due but did not fit in the frame budget
+        self.deferred = []
+        self.last_frame_us = 0
+        self.stats = {interval: {'population': 0, 'updated': 0, 'deferred': 0, 'total_updated': 0}
+                      for interval in AI_INTERVALS}
+
+    def add(self, enemy):
+        """Register an enemy, updating it every frame until it is classified."""
+        enemy.ai_slot = None
+        enemy.ai_last_frame = self.frame - 1
+        self._place(enemy, 1)
+
+    def remove(self, enemy):
+        """Unregister an enemy."""
+        if enemy.ai_slot is not None:
+            interval, phase = enemy.ai_slot
+            self.buckets[interval][phase].remove(enemy)
+            self.stats[interval]['population'] -= 1
+            enemy.ai_slot = None
+        if enemy in self.deferred:
+            self.deferred.remove(enemy)
+
+    def clear(self):
+        """Unregister all enemies."""
+        for interval, phases in self.buckets.items():
+            for bucket in phases:
+                bucket.clear()
+            self.stats[interval]['population'] = 0
+        self.deferred.clear()
+
+    def update(self, players, obstacles, projectiles):
+        """Update the enemies that are due this frame, within the AI budget."""
+        frame = self.frame
+        player = players[0] if len(players) == 1 else None
+        deadline = time.perf_counter_ns() + self.budget_us * 1000
+        start = time.perf_counter_ns()
+        for stats in self.stats.values():
+            stats['updated'] = 0
+            stats['deferred'] = 0
+
+        # Nearby and attacking enemies first, then last frame's leftovers, then the rest
+        due = [self.buckets[1][0]]
+        if self.deferred:
+            due.append(self.deferred)
+            self.deferred = []
+        for interval in AI_INTERVALS[1:]:
+            due.append(self.buckets[interval][frame % interval])
+
+        over_budget = False
+        for bucket in due:
+            for enemy in bucket[:]:
+                if enemy.ai_last_frame == frame or enemy.ai_slot is None:
+                    continue
+                interval = enemy.ai_slot[0]
+                if over_budget or time.perf_counter_ns() > deadline:
+                    over_budget = True
+                    self.deferred.append(enemy)
+                    self.stats[interval]['deferred'] += 1
+                    continue
+                dt = min(frame - enemy.ai_last_frame, AI_MAX_DT)
+                enemy.update(player or nearest(enemy, players), obstacles, projectiles, dt)
+                enemy.ai_last_frame = frame
+                self.stats[interval]['updated'] += 1
+                self.stats[interval]['total_updated'] += 1
+
+                # Reclassify the enemy now that its state and distance are fresh
+                new_interval = self.get_interval(enemy)
+                if new_interval != interval:
+                    self._move(enemy, new_interval)
+
+        self.last_frame_us = (time.perf_counter_ns() - start) // 1000
+        self.frame += 1
+
+    def get_interval(self, enemy):
+        """Return the update interval for an enemy based on its AI state and distance."""
+        if enemy.ai_state == 'attacking' or enemy.player_distance < AI_NEAR_RADIUS:
+            return 1
+        if enemy.ai_state == 'chasing':
+            return 2
+        if enemy.player_distance < AI_FAR_RADIUS:
+            return 4
+        return 8
+
+    def get_stats(self):
+        """Return the per-bucket counters and the time spent in the last frame."""
+        return {
+            'frame_us': self.last_frame_us,
+            'budget_us': self.budget_us,
+            'deferred': len(self.deferred),
+            'buckets': {interval: dict(stats) for interval, stats in self.stats.items()},
+        }
+
+    def _move(self, enemy, interval):
+        old_interval, phase = enemy.ai_slot
+        self.buckets[old_interval][phase].remove(enemy)
+        self.stats[old_interval]['population'] -= 1
+        self._place(enemy, interval)
+
+    def _place(self, enemy, interval):
+        # Use the least populated phase to keep the buckets balanced
+        phases = self.buckets[interval]
+        phase = min(range(interval), key=lambda p: len(phases[p]))
+        phases[phase].append(enemy)
+        enemy.ai_slot = (interval, phase)
+        self.stats[interval]['population'] += 1
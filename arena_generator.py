@@ -0,0 +1,262 @@
+"""
+This module generates the arenas the game is played in: the four walls and the trees between them.
+Trees are placed by Poisson-disk sampling (Bridson's algorithm), which keeps every pair of trees
+at least a given spacing apart while filling the arena evenly, so there are no clumps and no
+large empty areas. A fraction of the sampled points, the density, become trees. The player's
+start point is the first sample, so no tree is ever placed on or next to it.
+The arena is then checked with a flood fill over a grid of tile-sized cells: every cell that no
+obstacle overlaps must be reachable from the player's cell. The open areas the flood fill finds
+are joined by removing the trees whose cells would connect two of them, until only one is left.
+Generation runs on a worker thread: while a game is played, the arena of the next one is
+prepared, and a restart only takes it.
+Classes:
+    ArenaGenerator: Generates arenas of a given size and density, ahead of time on a worker thread.
+ArenaGenerator Methods:
+    __init__(width=WIDTH, height=HEIGHT, top=HUD_HEIGHT, spacing=ARENA_TREE_SPACING,
+             density=ARENA_TREE_DENSITY, tree_size=TILE_SIZE, start=None, seed=None):
+        Sets the size of the arena, below top, the tree spacing and density, and the player's start point.
+    generate(): Returns the obstacles of a new arena, walls first.
+    prefetch(): Starts generating the next arena on the worker thread.
+    take(): Returns the prefetched arena, waiting for it if needed, or generates one.
+ArenaGenerator Attributes:
+    timings (dict): Sampling and connectivity times, in milliseconds, and counts of the last arena.
+Functions:
+    poisson_disk(rng, bounds, radius, start=None, attempts=30): Returns points at least radius apart.
+    label_components(blocked, cols, rows): Flood fills the open cells and labels the areas they form.
+Usage:
+    Run this module directly to report generation times for large maps:
+        python arena_generator.py [spacing] [density]
+"""
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from constants import *
+from obstacle import Obstacle
+
+WALL_THICKNESS = 10
+
+
+def poisson_disk(rng, bounds, radius, start=None, attempts=30):
+    """Return points inside bounds (x0, y0, x1, y1) that are all at least radius apart."""
+    x0, y0, x1, y1 = bounds
+    cell = radius / math.sqrt(2)  # At most one point per grid cell
+    # The grid has two empty cells of padding on every side, so neighbors never need clipping
+    cols = int((x1 - x0) / cell) + 5
+    rows = int((y1 - y0) / cell) + 5
+    grid = [None] * (cols * rows)
+    neighbors = [dy * cols + dx for dy in range(-2, 3) for dx in range(-2, 3)
+                 if abs(dx) + abs(dy) < 4]  # The corner cells are too far to hold a conflict
+    radius_sq = radius * radius
+    points = []
+    active = []
+
+    def add(x, y):
+        point = (x, y)
+        grid[(int((y - y0) / cell) + 2) * cols + int((x - x0) / cell) + 2] = point
+        active.append(point)
+        points.append(point)
+
+    if start is not None:
+        add(*start)
+    else:
+        add(rng.uniform(x0, x1), rng.uniform(y0, y1))
+    random_value = rng.random
+    cos = math.cos
+    sin = math.sin
+    tau = 2 * math.pi
+    while active:
+        index = int(random_value() * len(active))
+        px, py = active[index]
+        for _ in range(attempts):
+            # Candidates come from the annulus between radius and twice the radius
+            angle = random_value() * tau
+            distance = radius * (1 + random_value())
+            x = px + cos(angle) * distance
+            y = py + sin(angle) * distance
+            if not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            center = (int((y - y0) / cell) + 2) * cols + int((x - x0) / cell) + 2
+            for offset in neighbors:
+                other = grid[center + offset]
+                if other is not None and (other[0] - x) ** 2 + (other[1] - y) ** 2 < radius_sq:
+                    break
+            else:
+                add(x, y)
+                break
+        else:
+            # No room left around this point
+            active[index] = active[-1]
+            active.pop()
+    return points
+
+
+def label_components(blocked, cols, rows):
+    """Return the 4-connected component of every cell, or -1 for blocked cells, and the count."""
+    labels = [-1] * (cols * rows)
+    count = 0
+    last_row = (rows - 1) * cols
+    for first in range(cols * rows):
+        if blocked[first] or labels[first] >= 0:
+            continue
+        labels[first] = count
+        queue = deque([first])
+        while queue:
+            index = queue.popleft()
+            x = index % cols
+            for neighbor, inside in ((index - 1, x > 0), (index + 1, x < cols - 1),
+                                     (index - cols, index >= cols), (index + cols, index < last_row)):
+                if inside and not blocked[neighbor] and labels[neighbor] < 0:
+                    labels[neighbor] = count
+                    queue.append(neighbor)
+        count += 1
+    return labels, count
+
+
+class ArenaGenerator:
+    def __init__(self, width=WIDTH, height=HEIGHT, top=HUD_HEIGHT, spacing=ARENA_TREE_SPACING,
+                 density=ARENA_TREE_DENSITY, tree_size=TILE_SIZE, start=None, seed=None):
+        self.width = width
+        self.height = height
+        self.top = top
+        # Trees a diagonal apart can never overlap
+        self.spacing = max(spacing, tree_size * math.sqrt(2))
+        self.density = density
+        self.tree_size = tree_size
+        self.start = start if start is not None else (width // 2, top + (height - top) // 2)
+        self.rng = random.Random(seed)  # Only used by one thread at a time
+        self.worker = None
+        self.pending = None
+        self.timings = {}
+
+    def generate(self):
+        """Return the obstacles of a new arena: the walls, then the trees."""
+        width, height, top, size = self.width, self.height, self.top, self.tree_size
+        rng = self.rng
+        began = time.perf_counter()
+        walls = [
+            Obstacle(0, top, width, WALL_THICKNESS, DARK_GREEN),  # Top wall
+            Obstacle(0, height - WALL_THICKNESS, width, WALL_THICKNESS, DARK_GREEN),  # Bottom wall
+            Obstacle(0, top, WALL_THICKNESS, height - top, DARK_GREEN),  # Left wall
+            Obstacle(width - WALL_THICKNESS, top, WALL_THICKNESS, height - top, DARK_GREEN)  # Right wall
+        ]
+        bounds = (ARENA_MARGIN, top + ARENA_MARGIN, width - ARENA_MARGIN, height - ARENA_MARGIN)
+        points = poisson_disk(rng, bounds, self.spacing, start=self.start)
+        half = size // 2
+        trees = [Obstacle(int(x) - half, int(y) - half, size, size) for x, y in points[1:]
+                 if rng.random() < self.density]
+        sampled = time.perf_counter()
+        trees, removed = self.connect(walls, trees)
+        self.timings = {
+            'sample_ms': (sampled - began) * 1000,
+            'connect_ms': (time.perf_counter() - sampled) * 1000,
+            'trees': len(trees),
+            'removed': removed,
+        }
+        return walls + trees
+
+    def connect(self, walls, trees):
+        """Remove trees until every open cell is reachable; return the trees kept and the number removed."""
+        cell = TILE_SIZE
+        cols = -(-self.width // cell)
+        rows = -(-self.height // cell)
+        top_rows = self.top // cell + 1  # The HUD is not part of the arena
+        start = self.start[1] // cell * cols + self.start[0] // cell
+        removed = 0
+        while True:
+            # Number of obstacles covering each cell
+            cover = [0] * (cols * rows)
+            for index in range(top_rows * cols):
+                cover[index] = 1
+            tree_cells = []
+            for obstacle in walls + trees:
+                rect = obstacle.rect
+                cells = [cy * cols + cx
+                         for cy in range(max(rect.top // cell, 0), min((rect.bottom - 1) // cell + 1, rows))
+                         for cx in range(max(rect.left // cell, 0), min((rect.right - 1) // cell + 1, cols))]
+                for index in cells:
+                    cover[index] += 1
+                tree_cells.append(cells)
+            del tree_cells[:len(walls)]
+            labels, count = label_components(cover, cols, rows)
+            if count <= 1 and not cover[start]:
+                return trees, removed
+
+            # Join the areas like Kruskal's algorithm joins trees: a tree is removed only when
+            # the cells it frees connect areas that are not connected yet
+            parent = list(range(count))
+
+            def find(area):
+                while parent[area] != area:
+                    parent[area] = parent[parent[area]]
+                    area = parent[area]
+                return area
+
+            kept = []
+            for tree, cells in zip(trees, tree_cells):
+                freed = [index for index in cells if cover[index] == 1]
+                # Cells on the edges are walls, so a neighbor index wrapping to another row is blocked
+                areas = {find(labels[neighbor]) for index in freed
+                         for neighbor in (index - 1, index + 1, index - cols, index + cols)
+                         if 0 <= neighbor < len(labels) and labels[neighbor] >= 0}
+                if len(areas) < 2 and start not in freed:
+                    kept.append(tree)
+                    continue
+                removed += 1
+                root = min(areas) if areas else len(parent)
+                if not areas:
+                    parent.append(root)
+                for area in areas:
+                    parent[area] = root
+                for index in freed:
+                    cover[index] = 0
+                    labels[index] = root
+            if len(kept) == len(trees):
+                # No single tree joins two areas: remove every tree next to a cell the player cannot reach
+                main = labels[start]
+                kept = [tree for tree, cells in zip(trees, tree_cells)
+                        if not any(0 <= neighbor < len(labels) and labels[neighbor] not in (-1, main)
+                                   for index in cells
+                                   for neighbor in (index - 1, index + 1, index - cols, index + cols))]
+                removed += len(trees) - len(kept)
+                if len(kept) == len(trees):
+                    return trees, removed  # Only walls separate what is left
+            trees = kept
+
+    def prefetch(self):
+        """Start generating the next arena on the worker thread."""
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run_worker, name="arena generator", daemon=True)
+            self.worker.start()
+
+    def run_worker(self):
+        self.pending = self.generate()
+
+    def take(self):
+        """Return the prefetched arena, or a new one if none was prefetched."""
+        if self.worker is None:
+            return self.generate()
+        self.worker.join()
+        self.worker = None
+        arena, self.pending = self.pending, None
+        return arena
+
+
+if __name__ == "__main__":
+    # Generation times from the game's arena up to maps with thousands of trees.
+    import sys
+
+    spacing = float(sys.argv[1]) if len(sys.argv) > 1 else ARENA_TREE_SPACING
+    density = float(sys.argv[2]) if len(sys.argv) > 2 else ARENA_TREE_DENSITY
+    print(f"spacing {spacing:g}, density {density:g}")
+    for width, height in ((WIDTH, HEIGHT), (4000, 4000), (8000, 8000), (16000, 16000)):
+        generator = ArenaGenerator(width, height, top=HUD_HEIGHT, spacing=spacing, density=density, seed=1)
+        began = time.perf_counter()
+        generator.generate()
+        total = (time.perf_counter() - began) * 1000
+        timings = generator.timings
+        print(f"  {width:>5}x{height:<5} {timings['trees']:6} trees  sampling {timings['sample_ms']:8.1f} ms"
+              f"  connectivity {timings['connect_ms']:7.1f} ms  total {total:8.1f} ms"
+              f"  ({timings['removed']} removed)")
@@ -0,0 +1,71 @@
+"""
+This module defines the aura and area-of-effect system.
+Emitters (healers, the boss, exploding spells) do not look for targets themselves. They emit
+an Aura, and once per tick the AuraSystem resolves every pending aura against the enemy
+SpatialHash that was built for the frame, so the cost follows the number of entities
+actually inside an aura instead of emitters x entities.
+Classes:
+    Aura: A single heal or damage pulse centered on a point.
+    AuraSystem: Collects the auras emitted during a tick and resolves them in one pass.
+AuraSystem Methods:
+    emit(x, y, radius, amount, kind, target, exclude=None): Queues an aura for this tick.
+    resolve(enemy_grid, players): Applies all pending auras and clears them.
+    clear(): Drops all pending auras.
+"""
+
+
+class Aura:
+    __slots__ = ('x', 'y', 'radius', 'amount', 'kind', 'target', 'exclude')
+
+    def __init__(self, x, y, radius, amount, kind, target, exclude=None):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.amount = amount
+        self.kind = kind  # 'heal' or 'damage'
+        self.target = target  # 'enemies' or 'player'
+        self.exclude = exclude  # Entity the aura must not affect, usually its emitter
+
+
+class AuraSystem:
+    def __init__(self):
+        self.pending = []
+        self.affected = 0  # Entities affected during the last resolve
+
+    def emit(self, x, y, radius, amount, kind, target, exclude=None):
+        """Queue an aura to be resolved at the end of the tick."""
+        self.pending.append(Aura(x, y, radius, amount, kind, target, exclude))
+
+    def resolve(self, enemy_grid, players):
+        """Apply every pending aura, using enemy_grid for the radius queries."""
+        self.affected = 0
+        if not self.pending:
+            return
+        for aura in self.pending:
+            if aura.target == 'enemies':
+                for enemy, _, _, _ in enemy_grid.query(aura.x, aura.y, aura.radius, exclude=aura.exclude):
+                    if enemy.health <= 0:
+                        continue
+                    self.apply(aura, enemy)
+            else:
+                radius_sq = aura.radius * aura.radius
+                for player in players:
+                    dx = player.rect.centerx - aura.x
+                    dy = player.rect.centery - aura.y
+                    if dx * dx + dy * dy <= radius_sq and player is not aura.exclude:
+                        self.apply(aura, player)
+        self.pending.clear()
+
+    def apply(self, aura, entity):
+        """Apply one aura to one entity."""
+        self.affected += 1
+        if aura.kind == 'heal':
+            entity.health = min(entity.health + aura.amount, entity.max_health)
+            if aura.target == 'enemies':
+                entity.publish_state()
+        else:
+            entity.take_damage(aura.amount)
+
+    def clear(self):
+        """Drop all pending auras."""
+        self.pending.clear()
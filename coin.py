@@ -8,8 +8,8 @@ Constants:
 Methods:
     __init__(self, x, y):
         Initializes a Coin instance with a specified position.
-    draw(self, surface):
-        Draws the coin on the given surface.
+    draw(self, sprites):
+        Appends the coin's sprite to the frame's render snapshot.
 """
 
 import pygame
@@ -22,8 +22,9 @@ class Coin(pygame.sprite.Sprite):
         self.radius = 10
         self.color = GOLD
         self.rect = pygame.Rect(x, y, self.radius * 2, self.radius * 2)
+        self.sprite_key = ('outlined_circle', self.color, self.radius)
+        self.net_id = None  # Assigned by the co-op server
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, self.rect.center, self.radius)
-        pygame.draw.circle(surface, WHITE, self.rect.center, self.radius, 2)
+    def draw(self, sprites):
+        sprites.append((self.sprite_key, self.rect.x, self.rect.y))
 
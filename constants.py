@@ -1,12 +1,11 @@
 """
 This module sets up the constants and initial configurations for the Top-Down Adventure game.
-Modules:
-    pygame: A set of Python modules designed for writing video games.
+It does not initialize pygame; the window is opened by startup.init_display() and the fonts
+are loaded by fonts.load_fonts().
 Constants:
     WIDTH (int): The width of the game screen.
     HEIGHT (int): The height of the game screen.
     HUD_HEIGHT (int): The height of the Heads-Up Display (HUD).
-    SCREEN (pygame.Surface): The display surface for the game.
     FPS (int): Frames per second for the game loop.
     WHITE (tuple): RGB color value for white.
     GREEN (tuple): RGB color value for green.
@@ -23,27 +22,79 @@ Constants:
     GOLD (tuple): RGB color value for gold.
     BROWN (tuple): RGB color value for brown.
     PURPLE (tuple): RGB color value for purple.
-    FONT (pygame.font.Font): The default font for the game.
-    FONT_LARGE (pygame.font.Font): The large font for the game.
+    FONT_NAME (str): Family name of the game font.
+    FONT_SIZE (int): Size of the default font.
+    FONT_LARGE_SIZE (int): Size of the large font.
     TILE_SIZE (int): The size of each tile in the game.
     MAGIC_SPELLS (list): List of available magic spells.
     SPELL_COLORS (dict): Dictionary mapping each spell to its corresponding color.
+    AI_FRAME_BUDGET_US (int): Hard per-frame budget for enemy AI updates, in microseconds.
+    AI_NEAR_RADIUS (int): Enemies closer than this to the player are updated every frame.
+    AI_FAR_RADIUS (int): Idle enemies farther than this are updated least often.
+    AI_MAX_DT (int): Upper bound on the frames an enemy can catch up in a single update.
+    JOY_DEADZONE (float): Joystick axis values within this range are ignored.
+    INPUT_BUFFER_SIZE (int): Number of recent presses kept in the input buffer.
+    INPUT_BUFFER_MS (int): How long a buffered press stays valid, in milliseconds.
+    MENU_IDLE_TIMEOUT_MS (int): Longest time an idle menu blocks waiting for events.
+    HEALTH_BAR_STEPS (int): Number of pre-rendered enemy health bar widths, besides empty.
+    SEPARATION_RADIUS (int): Enemies closer than this push each other apart.
+    SEPARATION_MAX_NEIGHBORS (int): Most neighbors considered per enemy when separating.
+    SEPARATION_MAX_SCANNED (int): Most neighbors found per enemy before the nearest are picked.
+    SEPARATION_WEIGHT (float): Strength of separation relative to chasing the player.
+    SPELL_SPLASH_RADIUS (dict): Splash radius of each spell that has splash damage.
+    SPELL_SPLASH_FACTOR (float): Fraction of a spell's damage dealt as splash damage.
+    PROJECTILE_SPEED (float): Distance a projectile travels per frame.
+    OBSTACLE_GRID_MARGIN (int): Largest projectile size the obstacle grid supports in swept tests.
+    COOP_PORT (int): Default UDP port of the co-op server.
+    COOP_MAX_PLAYERS (int): Most players a co-op server accepts.
+    COOP_SNAPSHOT_INTERVAL (int): Ticks between two snapshots sent to each co-op client.
+    COOP_MAX_PACKET (int): Largest snapshot datagram, in bytes, which bounds per-client bandwidth.
+    COOP_HISTORY (int): Number of sent snapshots kept per client as delta baselines.
+    COOP_POS_SCALE (int): Network positions are quantized to 1 / COOP_POS_SCALE pixel.
+    COOP_CLIENT_TIMEOUT (float): Seconds without input after which a co-op client is dropped.
+    TELEMETRY_BUFFER_BYTES (int): Size of each of the two in-memory telemetry buffers.
+    TELEMETRY_FLUSH_INTERVAL (float): Longest time, in seconds, telemetry waits in memory before being written.
+    TELEMETRY_FILE_BYTES (int): Size at which a telemetry file is closed and a new one started.
+    TELEMETRY_MAX_FILES (int): Number of telemetry files kept; older ones are deleted.
+    PARTICLE_CAP (int): Largest number of live particles; bursts past it are cut short.
+    PARTICLE_DRAG (float): Factor applied to the velocity of every particle each tick.
+    PARTICLE_SHADES (int): Number of shades a particle fades through as it ages.
+    ARENA_TREE_SPACING (float): Smallest distance, in pixels, between the centers of two trees in an arena.
+    ARENA_TREE_DENSITY (float): Fraction of the places sampled at that spacing that get a tree.
+    ARENA_MARGIN (int): Distance, in pixels, from the arena edges within which no tree center is placed.
+    ARENA_PREFETCH_DELAY (int): Ticks into a game after which the next game's arena starts generating.
+    GC_YOUNG_COUNT (int): Young objects after which the GC policy collects generation 0 in frame slack.
+    GC_MIDDLE_COUNT (int): Generation 0 collections after which the GC policy collects generation 1.
+    GC_FORCE_COUNT (int): Young objects after which generation 0 is collected even without slack.
+    GC_MIN_SLACK_MS (float): Frame slack, in milliseconds, needed for a generation 0 collection.
+    GC_FULL_SLACK_MS (float): Frame slack, in milliseconds, needed for a generation 1 collection.
+    BURN_DURATION (int): Ticks a Fireball keeps burning the enemy it hits.
+    BURN_INTERVAL (int): Ticks between two burn damage ticks.
+    BURN_DAMAGE_FACTOR (float): Fraction of a Fireball's damage dealt by each burn damage tick.
+    SLOW_DURATION (int): Ticks an Ice Spike slows the enemy it hits.
+    SLOW_FACTOR (float): Factor applied to the speed of slowed enemies.
+    STUN_DURATION (int): Ticks a Lightning Bolt stuns each enemy it strikes.
+    CHAIN_JUMPS (int): Number of further enemies a Lightning Bolt jumps to.
+    CHAIN_RADIUS (int): Largest distance, in pixels, of a Lightning Bolt jump.
+    CHAIN_DELAY (int): Ticks between two Lightning Bolt jumps.
+    CHAIN_FALLOFF (float): Factor applied to a Lightning Bolt's damage at each jump.
+    POWER_UP_SPEED_FACTOR (float): Factor applied to the player's speed by the speed power-up.
+    SHARED_STATE_NAME (str): Default name of the shared memory block the live game state is published in.
+    SHARED_STATE_MAX_ENEMIES (int): Most enemies the shared game state holds.
+    SHARED_STATE_MAX_PROJECTILES (int): Most projectiles the shared game state holds.
+    SHARED_STATE_MAX_PICKUPS (int): Most coins and potions the shared game state holds.
+    COIN_LIFETIME (int): Frames a coin stays in the arena before it disappears.
+    COIN_MAX (int): Most coins in the arena at once; no coin spawns while that many are out.
+    FOG_VIEW_RADIUS (int): Distance, in tiles, the players see in fog-of-war mode.
+    FOG_ALPHA (int): Opacity of the fog over the cells the players do not see; below 255 the arena
+        shows through it, at about four times the blit cost.
 """
 
-import pygame
-
-
-# Initialize Pygame
-pygame.init()
-
 # Screen setup
 WIDTH, HEIGHT = 1280, 960
 HUD_HEIGHT = 140
-SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Top-Down Adventure")
 
-# Clock and FPS
-clock = pygame.time.Clock()
+# FPS
 FPS = 60
 
 # Colors
@@ -64,8 +115,9 @@ BROWN = (139, 69, 19)
 PURPLE = (128, 0, 128)
 
 # Fonts
-FONT = pygame.font.SysFont('Arial', 20)
-FONT_LARGE = pygame.font.SysFont('Arial', 40)
+FONT_NAME = 'Arial'
+FONT_SIZE = 20
+FONT_LARGE_SIZE = 40
 
 # Game variables
 TILE_SIZE = 40
@@ -74,3 +126,93 @@ TILE_SIZE = 40
 MAGIC_SPELLS = ['Fireball', 'Ice Spike', 'Lightning Bolt']
 SPELL_COLORS = {'Fireball': RED, 'Ice Spike': CYAN, 'Lightning Bolt': YELLOW}
 
+# AI scheduling
+AI_FRAME_BUDGET_US = 2000
+AI_NEAR_RADIUS = 250
+AI_FAR_RADIUS = 500
+AI_MAX_DT = 16
+
+# Input
+JOY_DEADZONE = 0.1
+INPUT_BUFFER_SIZE = 16
+INPUT_BUFFER_MS = 150
+
+# Menus
+MENU_IDLE_TIMEOUT_MS = 1000
+
+# Rendering
+HEALTH_BAR_STEPS = 15
+
+# Crowd separation
+SEPARATION_RADIUS = 34
+SEPARATION_MAX_NEIGHBORS = 6
+SEPARATION_MAX_SCANNED = 2 * SEPARATION_MAX_NEIGHBORS
+SEPARATION_WEIGHT = 1.5
+
+# Auras and area of effect
+SPELL_SPLASH_RADIUS = {'Fireball': 60}
+SPELL_SPLASH_FACTOR = 0.5
+
+# Projectiles
+PROJECTILE_SPEED = 5
+OBSTACLE_GRID_MARGIN = 8
+
+# Co-op networking
+COOP_PORT = 47800
+COOP_MAX_PLAYERS = 4
+COOP_SNAPSHOT_INTERVAL = 2
+COOP_MAX_PACKET = 1200
+COOP_HISTORY = 64
+COOP_POS_SCALE = 4
+COOP_CLIENT_TIMEOUT = 5.0
+
+# Telemetry
+TELEMETRY_BUFFER_BYTES = 64 * 1024
+TELEMETRY_FLUSH_INTERVAL = 1.0
+TELEMETRY_FILE_BYTES = 1024 * 1024
+TELEMETRY_MAX_FILES = 8
+
+# Particles
+PARTICLE_CAP = 50000
+PARTICLE_DRAG = 0.92
+PARTICLE_SHADES = 4
+
+# Arena generation
+ARENA_TREE_SPACING = 120
+ARENA_TREE_DENSITY = 0.5
+ARENA_MARGIN = 50
+ARENA_PREFETCH_DELAY = 60
+
+# Garbage collector policy
+GC_YOUNG_COUNT = 2000
+GC_MIDDLE_COUNT = 10
+GC_FORCE_COUNT = 20000
+GC_MIN_SLACK_MS = 2.0
+GC_FULL_SLACK_MS = 6.0
+
+# Status effects
+BURN_DURATION = 180
+BURN_INTERVAL = 30
+BURN_DAMAGE_FACTOR = 0.1
+SLOW_DURATION = 120
+SLOW_FACTOR = 0.5
+STUN_DURATION = 30
+CHAIN_JUMPS = 3
+CHAIN_RADIUS = 150
+CHAIN_DELAY = 6
+CHAIN_FALLOFF = 0.7
+POWER_UP_SPEED_FACTOR = 1.5
+
+# Shared game state
+SHARED_STATE_NAME = 'tda_state'
+SHARED_STATE_MAX_ENEMIES = 1024
+SHARED_STATE_MAX_PROJECTILES = 1024
+SHARED_STATE_MAX_PICKUPS = 64
+
+# Coins
+COIN_LIFETIME = 1800
+COIN_MAX = 8
+
+# Fog of war
+FOG_VIEW_RADIUS = 9
+FOG_ALPHA = 255
@@ -0,0 +1,274 @@
+"""
+This module defines the co-op client side of the protocol and a benchmark of the co-op mode.
+A CoopClient sends its held action bitmask to the server every tick together with the tick
+of the newest snapshot it has, and rebuilds its view of the world from the delta snapshots
+it receives. Projectiles are only announced when they spawn, so the client moves them itself.
+Classes:
+    LossyLink: Simulates packet loss, latency and jitter in both directions of a client socket.
+    CoopClient: Keeps a client's view of the co-op world in sync with the server.
+CoopClient Methods:
+    __init__(server_address, link=None): Opens the client socket.
+    send_input(actions): Sends the held actions, or asks to join until the server answers.
+    poll(): Handles every datagram that has arrived.
+    entities(kind): Returns the (net_id, state) pairs of one kind of entity in the current view.
+    projectile_positions(tick): Returns where the client predicts each projectile is at a tick.
+    leave(): Tells the server the client is disconnecting.
+Usage:
+    Run this module directly to benchmark the server over localhost with bot clients:
+        python coop_client.py [--clients N] [--enemies 20,100,300] [--loss 0.05]
+                              [--latency 50] [--jitter 10] [--seconds 5]
+"""
+
+import heapq
+import math
+import random
+import socket
+import time
+from constants import *
+from coop_protocol import *
+
+
+class LossyLink:
+    def __init__(self, loss=0.0, latency_ms=0, jitter_ms=0, seed=None):
+        self.loss = loss
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.random = random.Random(seed)
+        self.outgoing = []  # Heap of (due time, order, data, address)
+        self.incoming = []  # Heap of (due time, order, data)
+        self.order = 0
+        self.lost = 0
+
+    def delay(self):
+        return self.latency + self.random.uniform(-self.jitter, self.jitter)
+
+    def send(self, data, address, now):
+        """Queue an outgoing datagram, or lose it."""
+        if self.random.random() < self.loss:
+            self.lost += 1
+            return
+        self.order += 1
+        heapq.heappush(self.outgoing, (now + self.delay(), self.order, data, address))
+
+    def receive(self, data, now):
+        """Queue an incoming datagram, or lose it."""
+        if self.random.random() < self.loss:
+            self.lost += 1
+            return
+        self.order += 1
+        heapq.heappush(self.incoming, (now + self.delay(), self.order, data))
+
+    def flush(self, sock, now):
+        """Send the outgoing datagrams that are due."""
+        while self.outgoing and self.outgoing[0][0] <= now:
+            _, _, data, address = heapq.heappop(self.outgoing)
+            sock.sendto(data, address)
+
+    def deliver(self, now):
+        """Return the incoming datagrams that are due."""
+        arrived = []
+        while self.incoming and self.incoming[0][0] <= now:
+            arrived.append(heapq.heappop(self.incoming)[2])
+        return arrived
+
+
+class CoopClient:
+    def __init__(self, server_address, link=None):
+        self.server_address = server_address
+        self.link = link
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('0.0.0.0', 0))
+        self.socket.setblocking(False)
+        self.player_id = None
+        self.sequence = 0
+        self.latest_tick = 0
+        self.views = {}  # tick -> view, kept while the server may use them as baselines
+        self.view = {}
+        self.hud = None
+        self.moving = {}  # Projectile net_id -> [x, y, vx, vy, tick] as predicted so far
+        self.snapshots_received = 0
+        self.bytes_received = 0
+        self.unusable = 0  # Snapshots whose baseline was already discarded
+
+    def now(self):
+        return time.monotonic()
+
+    def send(self, data):
+        if self.link is not None:
+            self.link.send(data, self.server_address, self.now())
+            self.link.flush(self.socket, self.now())
+        else:
+            self.socket.sendto(data, self.server_address)
+
+    def send_input(self, actions):
+        """Send the held actions, or ask to join until the server has answered."""
+        if self.player_id is None:
+            self.send(PACKET_TYPE.pack(JOIN))
+            return
+        self.sequence += 1
+        self.send(INPUT_PACKET.pack(INPUT, self.sequence, self.latest_tick, actions))
+
+    def leave(self):
+        """Tell the server the client is disconnecting."""
+        self.socket.sendto(PACKET_TYPE.pack(LEAVE), self.server_address)
+
+    def poll(self):
+        """Handle every datagram that has arrived."""
+        datagrams = []
+        while True:
+            try:
+                data, _ = self.socket.recvfrom(65536)
+            except BlockingIOError:
+                break
+            except ConnectionError:
+                continue
+            datagrams.append(data)
+        if self.link is not None:
+            now = self.now()
+            for data in datagrams:
+                self.link.receive(data, now)
+            self.link.flush(self.socket, now)
+            datagrams = self.link.deliver(now)
+        for data in datagrams:
+            self.handle(data)
+
+    def handle(self, data):
+        packet_type = data[0]
+        if packet_type == WELCOME:
+            self.player_id = WELCOME_PACKET.unpack(data)[1]
+        elif packet_type == SNAPSHOT:
+            self.bytes_received += len(data)
+            if SNAPSHOT_HEADER.unpack_from(data)[1] <= self.latest_tick:
+                return  # Reordered behind a newer snapshot
+            decoded = decode_snapshot(data, self.views)
+            if decoded is None:
+                self.unusable += 1
+                return
+            tick, baseline_tick, self.player_id, self.hud, self.view = decoded
+            self.snapshots_received += 1
+            self.latest_tick = tick
+            self.views[tick] = self.view
+            # The server only encodes against snapshots we acknowledged, never older ones
+            for old in [t for t in self.views if t < baseline_tick]:
+                del self.views[old]
+
+    def entities(self, kind):
+        """Return the (net_id, state) pairs of one kind of entity in the current view."""
+        return [(key[1], state) for key, state in self.view.items() if key[0] == kind]
+
+    def projectile_positions(self, tick):
+        """Return the predicted pixel position of every projectile at the given tick.
+
+        Projectiles fly straight from their spawn, or home on their target while the target
+        is in the view, as Projectile.update does on the server.
+        """
+        positions = {}
+        moving = {}
+        for key, state in self.view.items():
+            if key[0] != PROJECTILE:
+                continue
+            net_id = key[1]
+            flight = self.moving.get(net_id)
+            if flight is None:
+                x, y, vx, vy, spawn_tick, _, _ = state
+                flight = [x / COOP_POS_SCALE, y / COOP_POS_SCALE, vx / 256, vy / 256, spawn_tick]
+            target = self.view.get((ENEMY, state[6])) if state[6] else None
+            while flight[4] < tick:
+                if target is not None:
+                    dx = target[1] / COOP_POS_SCALE - flight[0]
+                    dy = target[2] / COOP_POS_SCALE - flight[1]
+                    distance = math.hypot(dx, dy)
+                    if distance:
+                        speed = math.hypot(flight[2], flight[3])
+                        flight[2] = dx / distance * speed
+                        flight[3] = dy / distance * speed
+                flight[0] += flight[2]
+                flight[1] += flight[3]
+                flight[4] += 1
+            moving[net_id] = flight
+            positions[net_id] = (flight[0], flight[1])
+        self.moving = moving
+        return positions
+
+
+if __name__ == "__main__":
+    import argparse
+    import statistics
+    from coop_server import CoopServer
+    from input_manager import MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN, ATTACK, MAGIC
+
+    parser = argparse.ArgumentParser(description="Co-op bandwidth and tick cost benchmark over localhost.")
+    parser.add_argument('--clients', type=int, default=2)
+    parser.add_argument('--enemies', default='20,100,300')
+    parser.add_argument('--loss', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=50, help="one-way latency in ms")
+    parser.add_argument('--jitter', type=float, default=10, help="one-way jitter in ms")
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    moves = [0, MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN, MOVE_LEFT | MOVE_UP, MOVE_RIGHT | MOVE_DOWN]
+    print(f"{args.clients} clients, {args.loss:.0%} loss each way, {args.latency:.0f}+-{args.jitter:.0f} ms each way, "
+          f"{args.seconds:.0f} s per run, {COOP_MAX_PACKET} byte packets every {COOP_SNAPSHOT_INTERVAL} ticks")
+    print(f"{'enemies':>8}{'sim ms':>9}{'snap ms':>9}{'p95 tick':>10}{'down kB/s':>11}{'avg pkt':>9}"
+          f"{'full':>6}{'recv':>7}{'unusable':>10}{'pos err':>9}{'proj err':>10}")
+
+    for enemy_count in [int(n) for n in args.enemies.split(',')]:
+        random.seed(1)
+        server = CoopServer(host='127.0.0.1', port=0)
+        address = ('127.0.0.1', server.address[1])
+        clients = [CoopClient(address, LossyLink(args.loss, args.latency, args.jitter, seed=i))
+                   for i in range(args.clients)]
+        rng = random.Random(2)
+        actions = [0] * len(clients)
+        ticks = int(args.seconds * FPS)
+        position_errors = []
+        projectile_errors = []
+        start = time.perf_counter()
+        for tick in range(ticks):
+            # Keep the enemy count constant and the players alive for the whole run
+            while len(server.game.enemies) < enemy_count:
+                server.game.spawn_enemy()
+            for player in server.game.players:
+                player.health = player.max_health
+            for i, client in enumerate(clients):
+                if tick % 30 == 0:
+                    actions[i] = rng.choice(moves) | (ATTACK if rng.random() < 0.3 else 0) | (
+                        MAGIC if rng.random() < 0.2 else 0)
+                client.send_input(actions[i])
+            server.tick()
+            for client in clients:
+                client.poll()
+
+            if tick % FPS == FPS - 1 and tick > FPS:
+                # How far each client's view is from the server's world, in pixels
+                world = server.capture()
+                for client in clients:
+                    for key, state in client.view.items():
+                        actual = world.get(key)
+                        if actual is None or key[0] not in (ENEMY, PLAYER):
+                            continue
+                        p = POSITION_INDEX[key[0]]
+                        position_errors.append(math.hypot(state[p] - actual[p], state[p + 1] - actual[p + 1])
+                                               / COOP_POS_SCALE)
+                    positions = {projectile.net_id: (projectile.x, projectile.y)
+                                 for projectile in server.game.projectiles}
+                    for net_id, (x, y) in client.projectile_positions(server.tick_count).items():
+                        if net_id in positions:
+                            projectile_errors.append(math.hypot(x - positions[net_id][0], y - positions[net_id][1]))
+            delay = start + (tick + 1) / FPS - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        elapsed = time.perf_counter() - start
+        connections = list(server.clients.values())
+        tick_ms = sorted((s + n) / 1e6 for s, n in zip(server.sim_ns, server.snapshot_ns))
+        sent = sum(c.snapshots_sent for c in connections)
+        down = sum(c.bytes_sent for c in connections) / len(connections) / elapsed / 1000
+        print(f"{enemy_count:>8}{statistics.mean(server.sim_ns) / 1e6:>9.2f}{statistics.mean(server.snapshot_ns) / 1e6:>9.2f}"
+              f"{tick_ms[int(len(tick_ms) * 0.95)]:>10.2f}{down:>11.1f}"
+              f"{sum(c.bytes_sent for c in connections) / sent:>9.0f}{sum(c.full_snapshots for c in connections):>6}"
+              f"{sum(c.snapshots_received for c in clients) / sent:>7.0%}{sum(c.unusable for c in clients):>10}"
+              f"{statistics.mean(position_errors or [0]):>9.1f}{statistics.mean(projectile_errors or [0]):>10.1f}")
+        for client in clients:
+            client.leave()
+        server.socket.close()
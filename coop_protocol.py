@@ -0,0 +1,187 @@
+"""
+This module defines the wire format of the co-op mode, shared by the server and the clients.
+Clients send their held InputManager actions as a bitmask every tick. The server sends each
+client a snapshot of the world every COOP_SNAPSHOT_INTERVAL ticks, delta-compressed against
+the last snapshot that client acknowledged:
+    - Entities are identified by (kind, net_id). Each entity has a small state tuple with
+      positions quantized to 1 / COOP_POS_SCALE pixel and health rounded up to whole points.
+    - Only entities whose state differs from the baseline are sent. Enemies and players that
+      were already known are sent as deltas: a signed byte pair for small moves, and their
+      health or pose only when those changed.
+    - Projectiles, coins and potions never change once spawned, so they are sent once as a
+      spawn record and once as a removal. Clients move projectiles themselves from the spawn
+      position, velocity and tick, homing on their target like the server does.
+A snapshot that is lost is simply never acknowledged, and later snapshots keep being encoded
+against the older baseline until one gets through.
+State tuples:
+    ENEMY: (archetype_id, x, y, health, max_health)
+    PLAYER: (x, y, health, pose), where pose is the direction index plus 4 when attacking
+    PROJECTILE: (x, y, vx, vy, spawn_tick, color_index, target_id), velocity in 1/256 px per tick
+    COIN, POTION: (x, y, subtype)
+Packets:
+    JOIN: Client asks for a player.
+    WELCOME(player_id): Server accepted the client.
+    INPUT(sequence, ack_tick, actions): Held actions and the newest snapshot the client has.
+    SNAPSHOT(tick, baseline_tick, player_id, hud..., records): A delta snapshot.
+    LEAVE: Client is disconnecting.
+Functions:
+    quantize(value): Converts a pixel coordinate to a network position.
+    quantize_health(value): Converts health to a network value.
+    encode_record(kind, net_id, state, base): Encodes one entity against its baseline state.
+    encode_snapshot(tick, baseline_tick, player_id, hud, records): Builds a snapshot packet.
+    decode_snapshot(data, baselines): Rebuilds the client's view of the world from a snapshot.
+"""
+
+import math
+import struct
+from constants import *
+from sprite_atlas import PROJECTILE_COLORS
+
+# Packet types
+JOIN, WELCOME, INPUT, SNAPSHOT, LEAVE = range(5)
+
+# Entity kinds
+ENEMY, PLAYER, PROJECTILE, COIN, POTION = range(5)
+# Record operations, stored in the high bits of the kind byte
+REMOVE, FULL, DELTA = range(3)
+
+DIRECTIONS = ('up', 'down', 'left', 'right')
+DIRECTION_INDEX = {name: index for index, name in enumerate(DIRECTIONS)}
+POTION_TYPES = ('health', 'mana')
+PROJECTILE_COLOR_INDEX = {color: index for index, color in enumerate(PROJECTILE_COLORS)}
+ATTACKING_POSE = 4
+
+# Delta flags
+DELTA_POS_SMALL = 1
+DELTA_POS_FULL = 2
+DELTA_HEALTH = 4
+DELTA_POSE = 8
+
+PACKET_TYPE = struct.Struct('<B')
+WELCOME_PACKET = struct.Struct('<BH')
+INPUT_PACKET = struct.Struct('<BIIH')
+# type, tick, baseline tick, player id, health, max health, mana, max mana, experience,
+# next level experience, level, score, spell index, score multiplier in halves, record count
+SNAPSHOT_HEADER = struct.Struct('<BIIHHHHHHHBIBBH')
+RECORD_HEADER = struct.Struct('<BH')
+FULL_STATES = {
+    ENEMY: struct.Struct('<BHHHH'),
+    PLAYER: struct.Struct('<HHHB'),
+    PROJECTILE: struct.Struct('<HHhhIBH'),
+    COIN: struct.Struct('<HHB'),
+    POTION: struct.Struct('<HHB'),
+}
+DELTA_FLAGS = struct.Struct('<B')
+POS_SMALL = struct.Struct('<bb')
+POS_FULL = struct.Struct('<HH')
+HEALTH = struct.Struct('<H')
+POSE = struct.Struct('<B')
+
+# Where the position, health and pose live in the state tuples of entities sent as deltas
+POSITION_INDEX = {ENEMY: 1, PLAYER: 0, PROJECTILE: 0, COIN: 0, POTION: 0}
+HEALTH_INDEX = {ENEMY: 3, PLAYER: 2}
+POSE_INDEX = {PLAYER: 3}
+
+
+def quantize(value):
+    """Convert a pixel coordinate to a network position."""
+    return min(max(int(round(value * COOP_POS_SCALE)), 0), 0xFFFF)
+
+
+def quantize_health(value):
+    """Convert health to a network value, so anything still alive shows at least 1."""
+    return min(max(math.ceil(value), 0), 0xFFFF)
+
+
+def encode_record(kind, net_id, state, base):
+    """Encode an entity's state against the state the client already has.
+
+    state is None for an entity that no longer exists; base is None for one the client
+    does not know yet.
+    """
+    if state is None:
+        return RECORD_HEADER.pack(kind | REMOVE << 4, net_id)
+    if base is None or kind not in HEALTH_INDEX or (kind == ENEMY and (base[0] != state[0] or base[4] != state[4])):
+        return RECORD_HEADER.pack(kind | FULL << 4, net_id) + FULL_STATES[kind].pack(*state)
+
+    p = POSITION_INDEX[kind]
+    flags = 0
+    parts = []
+    dx = state[p] - base[p]
+    dy = state[p + 1] - base[p + 1]
+    if dx or dy:
+        if -128 <= dx <= 127 and -128 <= dy <= 127:
+            flags |= DELTA_POS_SMALL
+            parts.append(POS_SMALL.pack(dx, dy))
+        else:
+            flags |= DELTA_POS_FULL
+            parts.append(POS_FULL.pack(state[p], state[p + 1]))
+    h = HEALTH_INDEX[kind]
+    if state[h] != base[h]:
+        flags |= DELTA_HEALTH
+        parts.append(HEALTH.pack(state[h]))
+    pose = POSE_INDEX.get(kind)
+    if pose is not None and state[pose] != base[pose]:
+        flags |= DELTA_POSE
+        parts.append(POSE.pack(state[pose]))
+    return RECORD_HEADER.pack(kind | DELTA << 4, net_id) + DELTA_FLAGS.pack(flags) + b''.join(parts)
+
+
+def encode_snapshot(tick, baseline_tick, player_id, hud, records):
+    """Build a snapshot packet from the HUD values of the client's player and encoded records."""
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT, tick, baseline_tick, player_id, *hud, len(records))
+    return header + b''.join(records)
+
+
+def decode_snapshot(data, baselines):
+    """Decode a snapshot against the client's stored views.
+
+    Returns (tick, baseline_tick, player_id, hud, view), or None when the baseline the server
+    used is no longer known to the client.
+    """
+    fields = SNAPSHOT_HEADER.unpack_from(data)
+    tick, baseline_tick, player_id = fields[1:4]
+    hud = fields[4:14]
+    count = fields[14]
+    if baseline_tick:
+        base = baselines.get(baseline_tick)
+        if base is None:
+            return None
+        view = dict(base)
+    else:
+        view = {}
+
+    offset = SNAPSHOT_HEADER.size
+    for _ in range(count):
+        kind_op, net_id = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        kind = kind_op & 0x0F
+        op = kind_op >> 4
+        key = (kind, net_id)
+        if op == REMOVE:
+            view.pop(key, None)
+        elif op == FULL:
+            full = FULL_STATES[kind]
+            view[key] = full.unpack_from(data, offset)
+            offset += full.size
+        else:
+            flags = data[offset]
+            offset += DELTA_FLAGS.size
+            state = list(view[key])
+            p = POSITION_INDEX[kind]
+            if flags & DELTA_POS_SMALL:
+                dx, dy = POS_SMALL.unpack_from(data, offset)
+                offset += POS_SMALL.size
+                state[p] += dx
+                state[p + 1] += dy
+            elif flags & DELTA_POS_FULL:
+                state[p], state[p + 1] = POS_FULL.unpack_from(data, offset)
+                offset += POS_FULL.size
+            if flags & DELTA_HEALTH:
+                state[HEALTH_INDEX[kind]] = HEALTH.unpack_from(data, offset)[0]
+                offset += HEALTH.size
+            if flags & DELTA_POSE:
+                state[POSE_INDEX[kind]] = data[offset]
+                offset += POSE.size
+            view[key] = tuple(state)
+    return tick, baseline_tick, player_id, hud, view
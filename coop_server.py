@@ -0,0 +1,299 @@
+"""
+This module defines the authoritative co-op server. It runs GameManager's simulation
+headless, with one Player per connected client, and talks to the clients over UDP.
+Each tick the server applies the newest action bitmask received from every client to that
+client's InputManager and advances the world. Every COOP_SNAPSHOT_INTERVAL ticks it captures
+the world as entity state tuples (see coop_protocol) and sends each client a snapshot
+delta-compressed against the last snapshot the client acknowledged.
+Per-client bandwidth is bounded by COOP_MAX_PACKET: when the changes do not fit, players and
+projectile spawns go first, then the other entities ordered by distance to the client's
+player, weighted by how many snapshots they have been left out of. An entity that does not
+fit keeps its old state in the client's view, so it is sent again in a later snapshot.
+Classes:
+    ClientConnection: A connected client, its player and its snapshot history.
+    CoopServer: Owns the socket, the headless game and the clients.
+ClientConnection Methods:
+    __init__(address, player, input_manager): Initializes the connection.
+    acknowledge(tick): Records the newest snapshot the client has received.
+    build_snapshot(tick, world, hud): Encodes the next snapshot for this client within the packet budget.
+CoopServer Methods:
+    __init__(host='0.0.0.0', port=COOP_PORT): Binds the socket and creates the headless game.
+    receive(): Handles every datagram waiting on the socket.
+    tick(): Runs one server tick: input, simulation and, when due, snapshots.
+    capture(): Returns the world as a dict of (kind, net_id) -> state tuple.
+    send_snapshots(): Sends every client its next snapshot.
+    restart(): Starts a new game with the connected players once every player is down.
+    run(): Runs ticks at FPS until interrupted.
+Usage:
+    python coop_server.py [port]
+"""
+
+import socket
+import sys
+import time
+from constants import *
+from game_manager import GameManager
+from input_manager import InputManager
+from coop_protocol import *
+
+
+class ClientConnection:
+    def __init__(self, address, player, input_manager):
+        self.address = address
+        self.player = player
+        self.input_manager = input_manager
+        self.actions = 0
+        self.sequence = -1  # Newest input sequence received; older datagrams are ignored
+        self.acked_tick = 0
+        self.history = {}  # tick -> view of the world the client has after that snapshot
+        self.starved = {}  # Entity key -> snapshots it was left out of for lack of space
+        self.last_heard = time.monotonic()
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+        self.full_snapshots = 0
+
+    def acknowledge(self, tick):
+        """Record the newest snapshot the client has received."""
+        if tick > self.acked_tick and tick in self.history:
+            self.acked_tick = tick
+            # Baselines older than the acknowledged one will never be used again
+            for old in [t for t in self.history if t < tick]:
+                del self.history[old]
+
+    def build_snapshot(self, tick, world, hud):
+        """Encode the changes since the acknowledged snapshot, within COOP_MAX_PACKET bytes."""
+        base = self.history.get(self.acked_tick)
+        baseline_tick = self.acked_tick if base is not None else 0
+        if base is None:
+            base = {}
+            self.full_snapshots += 1
+
+        budget = COOP_MAX_PACKET - SNAPSHOT_HEADER.size
+        records = []
+        view = dict(base)
+        # Removals are small and must not linger, so they always go first
+        for key in base:
+            if key not in world and budget >= RECORD_HEADER.size:
+                records.append(encode_record(key[0], key[1], None, None))
+                budget -= RECORD_HEADER.size
+                del view[key]
+
+        px = quantize(self.player.rect.centerx)
+        py = quantize(self.player.rect.centery)
+        starved = self.starved
+        changed = []
+        for key, state in world.items():
+            if base.get(key) != state:
+                kind = key[0]
+                if kind == PLAYER or kind == PROJECTILE:
+                    priority = -1
+                else:
+                    p = POSITION_INDEX[kind]
+                    distance = abs(state[p] - px) + abs(state[p + 1] - py)
+                    priority = distance / (1 + starved.get(key, 0))
+                changed.append((priority, key, state))
+        changed.sort(key=lambda entry: entry[0])
+
+        for _, key, state in changed:
+            record = encode_record(key[0], key[1], state, base.get(key))
+            if len(record) > budget:
+                starved[key] = starved.get(key, 0) + 1
+                continue
+            records.append(record)
+            budget -= len(record)
+            view[key] = state
+            starved.pop(key, None)
+        if len(starved) > len(world):
+            for key in [key for key in starved if key not in world]:
+                del starved[key]
+
+        self.history[tick] = view
+        if len(self.history) > COOP_HISTORY:
+            del self.history[min(self.history)]
+        packet = encode_snapshot(tick, baseline_tick, self.player.net_id, hud, records)
+        self.bytes_sent += len(packet)
+        self.snapshots_sent += 1
+        return packet
+
+
+class CoopServer:
+    def __init__(self, host='0.0.0.0', port=COOP_PORT):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+        self.tick_count = 0
+        self.next_net_id = 0
+        self.clients = {}  # address -> ClientConnection
+        self.projectile_states = {}  # net_id -> spawn state of each live projectile
+        self.game = None
+        self.restart()
+
+        # Timing of the last ticks, in nanoseconds
+        self.sim_ns = []
+        self.snapshot_ns = []
+
+    def new_net_id(self):
+        self.next_net_id = self.next_net_id % 0xFFFF + 1
+        return self.next_net_id
+
+    def clock(self):
+        """Simulation time in milliseconds, used to timestamp buffered presses."""
+        return self.tick_count * 1000 // FPS
+
+    def restart(self):
+        """Start a new game, keeping every connected client's input."""
+        self.game = GameManager(headless=True)
+        self.game.remove_player(self.game.player)  # Every player belongs to a client
+        self.game.state = 'playing'
+        for client in self.clients.values():
+            client.player = self.game.add_player(client.input_manager)
+            client.player.net_id = self.new_net_id()
+
+    def receive(self):
+        """Handle every datagram waiting on the socket."""
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except BlockingIOError:
+                return
+            except ConnectionError:
+                continue  # ICMP error from a client that went away
+            if not data:
+                continue
+            packet_type = data[0]
+            client = self.clients.get(address)
+            if packet_type == INPUT and client is not None and len(data) == INPUT_PACKET.size:
+                _, sequence, ack_tick, actions = INPUT_PACKET.unpack(data)
+                client.last_heard = time.monotonic()
+                if sequence > client.sequence:
+                    client.sequence = sequence
+                    client.actions = actions
+                client.acknowledge(ack_tick)
+            elif packet_type == JOIN:
+                if client is None:
+                    if len(self.clients) >= COOP_MAX_PLAYERS:
+                        continue
+                    input_manager = InputManager(clock=self.clock)
+                    player = self.game.add_player(input_manager)
+                    player.net_id = self.new_net_id()
+                    client = ClientConnection(address, player, input_manager)
+                    self.clients[address] = client
+                # Repeated JOINs mean the WELCOME was lost
+                self.socket.sendto(WELCOME_PACKET.pack(WELCOME, client.player.net_id), address)
+            elif packet_type == LEAVE and client is not None:
+                self.drop(client)
+
+    def drop(self, client):
+        del self.clients[client.address]
+        self.game.remove_player(client.player)
+
+    def tick(self):
+        """Run one server tick."""
+        self.receive()
+        now = time.monotonic()
+        for client in list(self.clients.values()):
+            if now - client.last_heard > COOP_CLIENT_TIMEOUT:
+                self.drop(client)
+        if not self.clients:
+            return
+
+        start = time.perf_counter_ns()
+        for client in self.clients.values():
+            client.input_manager.apply_actions(client.actions)
+        self.game.simulate()
+        if self.game.state == 'game_over':
+            self.restart()
+        self.tick_count += 1
+        middle = time.perf_counter_ns()
+        if self.tick_count % COOP_SNAPSHOT_INTERVAL == 0:
+            self.send_snapshots()
+        end = time.perf_counter_ns()
+
+        self.sim_ns.append(middle - start)
+        self.snapshot_ns.append(end - middle)
+        if len(self.sim_ns) > FPS * 10:
+            del self.sim_ns[:FPS]
+            del self.snapshot_ns[:FPS]
+
+    def capture(self):
+        """Return the current world as a dict of (kind, net_id) -> state tuple."""
+        world = {}
+        for enemy in self.game.enemies:
+            if enemy.net_id is None:
+                enemy.net_id = self.new_net_id()
+            world[(ENEMY, enemy.net_id)] = (
+                enemy.archetype_id, quantize(enemy.rect.centerx), quantize(enemy.rect.centery),
+                quantize_health(enemy.health), quantize_health(enemy.max_health))
+        for player in self.game.players:
+            pose = DIRECTION_INDEX[player.direction] + (ATTACKING_POSE if player.attacking else 0)
+            world[(PLAYER, player.net_id)] = (
+                quantize(player.rect.centerx), quantize(player.rect.centery), quantize_health(player.health), pose)
+
+        # Projectiles are only described by how they were spawned
+        states = {}
+        for projectile in self.game.projectiles:
+            if projectile.net_id is None:
+                projectile.net_id = self.new_net_id()
+                target = projectile.target
+                velocity = [min(max(int(round(d * projectile.speed * 256)), -0x8000), 0x7FFF)
+                            for d in (projectile.dx, projectile.dy)]
+                state = (quantize(projectile.x), quantize(projectile.y), velocity[0], velocity[1], self.tick_count,
+                         PROJECTILE_COLOR_INDEX.get(projectile.color, 0),
+                         (target.net_id or 0) if target is not None else 0)
+            else:
+                state = self.projectile_states[projectile.net_id]
+            states[projectile.net_id] = state
+            world[(PROJECTILE, projectile.net_id)] = state
+        self.projectile_states = states
+
+        for coin in self.game.coins:
+            if coin.net_id is None:
+                coin.net_id = self.new_net_id()
+            world[(COIN, coin.net_id)] = (quantize(coin.rect.centerx), quantize(coin.rect.centery), 0)
+        for potion in self.game.potions:
+            if potion.net_id is None:
+                potion.net_id = self.new_net_id()
+            world[(POTION, potion.net_id)] = (quantize(potion.rect.centerx), quantize(potion.rect.centery),
+                                              POTION_TYPES.index(potion.potion_type))
+        return world
+
+    def send_snapshots(self):
+        """Send every client its next snapshot."""
+        world = self.capture()
+        for client in self.clients.values():
+            player = client.player
+            hud = (
+                quantize_health(player.health), quantize_health(player.max_health),
+                quantize_health(player.mana), quantize_health(player.max_mana),
+                min(int(player.experience), 0xFFFF), min(int(player.next_level_exp), 0xFFFF),
+                min(player.level, 0xFF), min(int(player.score), 0xFFFFFFFF),
+                player.current_spell_index, min(int(player.score_multiplier * 2), 0xFF))
+            packet = client.build_snapshot(self.tick_count, world, hud)
+            try:
+                self.socket.sendto(packet, client.address)
+            except OSError:
+                pass  # A full send buffer behaves like a lost datagram
+
+    def run(self):
+        """Run ticks at FPS until interrupted."""
+        interval = 1 / FPS
+        next_tick = time.perf_counter()
+        while True:
+            self.tick()
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()  # Running late: do not try to catch up
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else COOP_PORT
+    server = CoopServer(port=port)
+    print(f"Co-op server listening on {server.address[0]}:{server.address[1]}")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,139 @@
+"""
+This module defines the CrowdSeparation class, which keeps enemies from stacking into a
+single blob while they chase the player.
+Once per frame the enemies are bucketed into a SpatialHash. When an enemy moves, it asks for
+a separation vector that pushes it away from its SEPARATION_MAX_NEIGHBORS nearest neighbors
+within SEPARATION_RADIUS. Only the cells around the enemy are searched, and the search stops
+after SEPARATION_MAX_SCANNED neighbors, so the cost per enemy is bounded even inside a dense
+blob and the frame cost stays far from the O(n^2) of checking every pair. The nearest of the
+neighbors found push the enemy, which keeps the push bounded too.
+Classes:
+    CrowdSeparation: Builds the neighbor grid and computes separation vectors.
+CrowdSeparation Methods:
+    __init__(radius, max_neighbors, max_scanned): Initializes the separation pass.
+    rebuild(enemies): Rebuilds the neighbor grid from the enemies' current positions.
+    separation(enemy): Returns the separation vector for an enemy.
+Functions:
+    brute_force_separation(enemy, enemies, radius): Reference O(n) per enemy implementation.
+Usage:
+    Run this module directly to benchmark the grid against the brute-force version, with the
+    enemies spread over the arena and packed into one blob.
+"""
+
+import heapq
+import math
+from operator import itemgetter
+from constants import *
+from spatial_hash import SpatialHash
+
+
+def push_away(dx, dy, distance_sq, radius):
+    """Return the push from one neighbor, stronger the closer it is."""
+    if distance_sq == 0:
+        # Exactly stacked: push in a fixed direction so the pair splits up
+        return -1.0, 0.0
+    distance = math.sqrt(distance_sq)
+    weight = (radius - distance) / (radius * distance)
+    return -dx * weight, -dy * weight
+
+
+class CrowdSeparation:
+    def __init__(self, radius=SEPARATION_RADIUS, max_neighbors=SEPARATION_MAX_NEIGHBORS,
+                 max_scanned=SEPARATION_MAX_SCANNED):
+        self.radius = radius
+        self.max_neighbors = max_neighbors
+        self.max_scanned = max(max_scanned, max_neighbors)
+        self.grid = SpatialHash(radius)
+
+    def rebuild(self, enemies):
+        """Rebuild the neighbor grid from the enemies' current positions."""
+        self.grid.build(enemies)
+
+    def separation(self, enemy):
+        """Return a vector of length at most 1 pointing away from the enemy's close neighbors."""
+        x, y = enemy.rect.center
+        sx = sy = 0.0
+        neighbors = self.grid.query(x, y, self.radius, max_results=self.max_scanned, exclude=enemy)
+        if len(neighbors) > self.max_neighbors:
+            # The nearest neighbors push hardest; the ones found are in cell order
+            neighbors = heapq.nsmallest(self.max_neighbors, neighbors, key=itemgetter(3))
+        for _, dx, dy, distance_sq in neighbors:
+            px, py = push_away(dx, dy, distance_sq, self.radius)
+            sx += px
+            sy += py
+        length = math.hypot(sx, sy)
+        if length > 1:
+            sx /= length
+            sy /= length
+        return sx, sy
+
+
+def brute_force_separation(enemy, enemies, radius=SEPARATION_RADIUS):
+    """Separation against every other enemy, for comparison with CrowdSeparation."""
+    x, y = enemy.rect.center
+    radius_sq = radius * radius
+    sx = sy = 0.0
+    for other in enemies:
+        if other is enemy:
+            continue
+        dx = other.rect.centerx - x
+        dy = other.rect.centery - y
+        distance_sq = dx * dx + dy * dy
+        if distance_sq <= radius_sq:
+            px, py = push_away(dx, dy, distance_sq, radius)
+            sx += px
+            sy += py
+    length = math.hypot(sx, sy)
+    if length > 1:
+        sx /= length
+        sy /= length
+    return sx, sy
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import time
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from enemy import Enemy
+    from game_manager import GameManager
+    from timer_wheel import TimerWheel
+
+    random.seed(0)
+    frames = 30
+    timers = TimerWheel()
+    # Every separation() call is timed, outside the AI scheduler's budget
+    layouts = {
+        'spread': lambda: (random.randint(10, WIDTH - 40), random.randint(HUD_HEIGHT + 10, HEIGHT - 40)),
+        'blob': lambda: (WIDTH // 2 + random.randint(-20, 20), HEIGHT // 2 + random.randint(-20, 20)),
+    }
+    for (layout, position), count in ((layout, count) for layout in layouts.items() for count in (100, 500, 1000)):
+        enemies = [Enemy(*position(), timers) for _ in range(count)]
+        crowd = CrowdSeparation()
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            crowd.rebuild(enemies)
+            for enemy in enemies:
+                crowd.separation(enemy)
+        grid_ms = (time.perf_counter() - start) * 1000 / frames
+
+        start = time.perf_counter()
+        for enemy in enemies:
+            brute_force_separation(enemy, enemies)
+        brute_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{count:5d} enemies, {layout:6s}: grid {grid_ms:7.2f} ms/frame, brute force {brute_ms:8.2f} ms/frame")
+
+    # Full enemy update with 1,000 enemies swarming the player; the AI scheduler defers whatever
+    # does not fit its budget, so this shows the frame cost, not the cost of separating them all
+    game = GameManager()
+    game.state = 'playing'
+    for _ in range(1000):
+        game.spawn_enemy()
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.update_enemies()
+    update_ms = (time.perf_counter() - start) * 1000 / frames
+    print(f"update_enemies with 1000 enemies: {update_ms:.2f} ms/frame "
+          f"(AI budget {AI_FRAME_BUDGET_US / 1000:.2f} ms, frame budget {1000 / FPS:.2f} ms)")
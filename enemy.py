@@ -1,42 +1,72 @@
 """
 Enemy class representing different types of enemies in the game.
+The stats, damage, cooldowns and behavior of each type come from its archetype in
+enemy_archetypes.json (see enemy_archetypes). Behaviors are dispatched through BEHAVIORS,
+a table of Enemy methods indexed by archetype_id that is built once at import time.
 Attributes:
     width (int): Width of the enemy sprite.
     height (int): Height of the enemy sprite.
     type (str): Type of the enemy (e.g., 'melee', 'archer', 'tank', 'healer', 'assassin', 'boss').
+    archetype_id (int): Index of the enemy's archetype in ARCHETYPES and BEHAVIORS.
+    archetype (Archetype): The enemy's archetype.
     color (tuple): Color of the enemy sprite.
-    speed (float): Speed of the enemy.
+    speed (float): Speed of the enemy; lowered while it is slowed by a status effect.
+    stunned (bool): Whether a status effect stuns the enemy, which then neither moves nor attacks.
     health (int): Current health of the enemy.
     max_health (int): Maximum health of the enemy.
     exp_value (int): Experience value awarded to the player upon defeating the enemy.
-    attack_cooldown (int): Cooldown period between attacks for certain enemy types.
-    heal_cooldown (int): Cooldown period between heals for healer type enemies.
+    timers (TimerWheel): Shared game clock; cooldowns are stored as the tick at which they end.
+    attack_ready_tick (int): Tick from which the enemy may attack again.
+    aura_ready_tick (int): Tick from which a healer may heal, or the boss pulse, again.
     rect (pygame.Rect): Rectangular area representing the enemy's position and size.
+    ai_state (str): Current AI state ('idle', 'chasing' or 'attacking'), used by the AIScheduler.
+    player_distance (float): Distance to the player at the last update, used by the AIScheduler.
+    event_bus (EventBus): Bus that receives the enemy's DamageTaken and EnemyKilled events.
+    crowd (CrowdSeparation): Neighbor grid used to keep chasing enemies apart.
+    auras (AuraSystem): Receives the heal auras of healers and the damage pulses of the boss.
+    line_of_sight (LineOfSight): Used by archers to only shoot when the player is visible.
+    shared_state (EnemyColumns): Columns of the published game state, or None when it is not published.
 Methods:
-    __init__(self, x, y, enemy_type='melee'):
+    __init__(self, x, y, timers, enemy_type='melee', event_bus=None, crowd=None, auras=None, line_of_sight=None,
+             shared_state=None):
         Initializes the enemy with the given position and type.
-    update(self, player, obstacles, projectiles):
-        Updates the enemy's behavior based on its type and interactions with the player, obstacles, and projectiles.
-    move_towards_player(self, player, obstacles):
-        Moves the enemy towards the player, considering obstacles.
-    archer_behavior(self, player, obstacles, projectiles):
-        Defines the behavior for archer type enemies, including movement and attacking.
-    healer_behavior(self):
-        Defines the behavior for healer type enemies, including healing nearby enemies.
-    assassin_behavior(self, player, obstacles):
+    update(self, player, obstacles, projectiles, dt=1):
+        Runs the behavior of the enemy's archetype against the player, obstacles, and projectiles,
+        unless the enemy is stunned.
+        dt is the number of frames since the last update, so time-sliced enemies catch up on movement.
+        Cooldowns compare against the current tick, so they need no catching up.
+    move_towards_player(self, player, obstacles, dt=1):
+        Moves the enemy towards the player, considering obstacles and steering away from nearby enemies.
+    melee_behavior(self, player, obstacles, projectiles, dt=1):
+        Chases the player inside the aggro radius and strikes it on contact (melee and tank enemies).
+    boss_behavior(self, player, obstacles, projectiles, dt=1):
+        Fights like a melee enemy and periodically emits a damage pulse while engaged.
+    archer_behavior(self, player, obstacles, projectiles, dt=1):
+        Defines the behavior for archer type enemies, including movement and attacking with a clear line of sight.
+    healer_behavior(self, player, obstacles, projectiles, dt=1):
+        Defines the behavior for healer type enemies, periodically emitting a heal aura for nearby enemies.
+    assassin_behavior(self, player, obstacles, projectiles, dt=1):
         Defines the behavior for assassin type enemies, including movement and attacking.
+    strike(self, player):
+        Damages the player if the attack cooldown is over.
+    emit_aura(self, kind, target_type):
+        Emits the archetype's aura if its cooldown is over.
     move(self, dx, dy, obstacles):
         Moves the enemy by the given deltas, considering collisions with obstacles.
     collide(self, dx, dy, obstacles):
         Handles collisions with obstacles when the enemy moves.
+    can_see(self, player):
+        Returns whether the enemy has a clear line of sight to the player.
     shoot_arrow(self, player, projectiles):
         Shoots a projectile towards the player.
     take_damage(self, amount):
-        Reduces the enemy's health by the given amount.
-    draw(self, surface):
-        Draws the enemy on the given surface.
-    draw_health_bar(self, surface):
-        Draws the health bar above the enemy.
+        Reduces the enemy's health by the given amount and posts an EnemyKilled event when it dies.
+    publish_state(self):
+        Writes the enemy's position, health and status into the published game state, if there is one.
+    draw(self, sprites):
+        Appends the enemy's sprite and health bar to the frame's render snapshot.
+    draw_health_bar(self, sprites):
+        Appends the quantized health bar above the enemy to the frame's render snapshot.
 """
 
 import pygame
@@ -44,120 +74,126 @@ import random
 import math
 from constants import *
 from projectile import Projectile
-
+from events import DamageTaken, EnemyKilled
+from sprite_atlas import health_bar_key
+from enemy_archetypes import ARCHETYPES, ARCHETYPE_IDS
 
 
 class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y, enemy_type='melee'):
+    def __init__(self, x, y, timers, enemy_type='melee', event_bus=None, crowd=None, auras=None, line_of_sight=None,
+                 shared_state=None):
         super().__init__()
+        self.timers = timers
+        self.event_bus = event_bus
+        self.crowd = crowd
+        self.auras = auras
+        self.line_of_sight = line_of_sight
+        self.shared_state = shared_state
         self.width = 30
         self.height = 30
-        self.type = enemy_type
-        if self.type == 'melee':
-            self.color = RED
-            self.speed = 2
-            self.health = 50
-            self.max_health = 50
-            self.exp_value = 50
-        elif self.type == 'archer':
-            self.color = ORANGE
-            self.speed = 1.5
-            self.health = 30
-            self.max_health = 30
-            self.exp_value = 70
-            self.attack_cooldown = random.randint(60, 120)
-        elif self.type == 'tank':
-            self.color = BROWN
-            self.speed = 1
-            self.health = 100
-            self.max_health = 100
-            self.exp_value = 100
-        elif self.type == 'healer':
-            self.color = GREEN
-            self.speed = 1.5
-            self.health = 40
-            self.max_health = 40
-            self.exp_value = 60
-            self.heal_cooldown = 0
-        elif self.type == 'assassin':
-            self.color = MAGENTA
-            self.speed = 3
-            self.health = 30
-            self.max_health = 30
-            self.exp_value = 80
-        elif self.type == 'boss':
-            self.color = DARK_RED
-            self.speed = 1
-            self.health = 500
-            self.max_health = 500
-            self.exp_value = 500
-            self.attack_cooldown = 0
 
-        self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.attack_cooldown = 0
+        # Stats come from the archetype table; only its index is needed afterwards
+        self.archetype_id = ARCHETYPE_IDS[enemy_type]
+        archetype = self.archetype = ARCHETYPES[self.archetype_id]
+        self.type = archetype.name
+        self.color = archetype.color
+        self.speed = archetype.speed
+        self.stunned = False
+        self.health = archetype.health
+        self.max_health = archetype.health
+        self.exp_value = archetype.exp_value
+        low, high = archetype.first_attack_delay
+        self.attack_ready_tick = timers.now + (low if low == high else random.randint(low, high))
+        self.aura_ready_tick = timers.now + archetype.first_aura_delay
 
-    def update(self, player, obstacles, projectiles):
-        # Calculate distance to player
-        distance = math.hypot(player.rect.centerx - self.rect.centerx, player.rect.centery - self.rect.centery)
-
-        if self.type == 'melee' or self.type == 'tank' or self.type == 'boss':
-            if distance < 200:
-                # Move towards player
-                self.move_towards_player(player, obstacles)
+        self.rect = pygame.Rect(x, y, self.width, self.height)
+        self.sprite_key = ('rect', self.color, self.width, self.height)
 
-                # Collision with player
-                if self.rect.colliderect(player.rect):
-                    if self.attack_cooldown == 0:
-                        damage = 5 if self.type == 'melee' else 10  # Tanks and boss do more damage
-                        player.take_damage(damage)
-                        self.attack_cooldown = 30  # Cooldown frames
+        # AI scheduling state
+        self.ai_state = 'idle'
+        self.player_distance = float('inf')
+        self.net_id = None  # Assigned by the co-op server
 
-            # Update attack cooldown
-            if self.attack_cooldown > 0:
-                self.attack_cooldown -= 1
+    def update(self, player, obstacles, projectiles, dt=1):
+        # Calculate distance to player
+        self.player_distance = math.hypot(player.rect.centerx - self.rect.centerx,
+                                          player.rect.centery - self.rect.centery)
+        if self.stunned:
+            self.ai_state = 'idle'
+            return
+        BEHAVIORS[self.archetype_id](self, player, obstacles, projectiles, dt)
 
-        elif self.type == 'archer':
-            self.archer_behavior(player, obstacles, projectiles)
+    def melee_behavior(self, player, obstacles, projectiles, dt=1):
+        # Chase the player inside the aggro radius and hit it on contact
+        self.ai_state = 'idle'
+        if self.player_distance < self.archetype.aggro_radius:
+            self.ai_state = 'chasing'
+            self.move_towards_player(player, obstacles, dt)
+            if self.rect.colliderect(player.rect):
+                self.ai_state = 'attacking'
+                self.strike(player)
 
-        elif self.type == 'healer':
-            self.healer_behavior()
+    def boss_behavior(self, player, obstacles, projectiles, dt=1):
+        # The boss fights like a melee enemy and damages everything around it while engaged
+        self.melee_behavior(player, obstacles, projectiles, dt)
+        if self.ai_state != 'idle':
+            self.emit_aura('damage', 'player')
 
-        elif self.type == 'assassin':
-            self.assassin_behavior(player, obstacles)
+    def strike(self, player):
+        now = self.timers.now
+        if now >= self.attack_ready_tick:
+            player.take_damage(self.archetype.damage)
+            self.attack_ready_tick = now + self.archetype.roll_attack_cooldown()
 
-    def move_towards_player(self, player, obstacles):
+    def move_towards_player(self, player, obstacles, dt=1):
+        step = self.speed * dt
         dx = dy = 0
         if player.rect.centerx > self.rect.centerx:
-            dx = self.speed
+            dx = step
         if player.rect.centerx < self.rect.centerx:
-            dx = -self.speed
+            dx = -step
         if player.rect.centery > self.rect.centery:
-            dy = self.speed
+            dy = step
         if player.rect.centery < self.rect.centery:
-            dy = -self.speed
+            dy = -step
 
         # Normalize movement to avoid faster diagonal movement
         if dx != 0 and dy != 0:
             dx *= 0.7071  # 1/sqrt(2)
             dy *= 0.7071
 
+        # Steer away from nearby enemies so the crowd spreads around the player
+        if self.crowd:
+            sx, sy = self.crowd.separation(self)
+            if sx or sy:
+                dx += sx * step * SEPARATION_WEIGHT
+                dy += sy * step * SEPARATION_WEIGHT
+                length = math.hypot(dx, dy)
+                if length > step:
+                    dx = dx * step / length
+                    dy = dy * step / length
+
         # Update position with collision
         self.move(dx, dy, obstacles)
 
-    def archer_behavior(self, player, obstacles, projectiles):
-        distance = math.hypot(player.rect.centerx - self.rect.centerx, player.rect.centery - self.rect.centery)
-        if distance < 300:
+    def archer_behavior(self, player, obstacles, projectiles, dt=1):
+        distance = self.player_distance
+        archetype = self.archetype
+        self.ai_state = 'idle'
+        if distance < archetype.aggro_radius:
+            self.ai_state = 'attacking'
             # Move away from player if too close
-            if distance < 150:
+            if distance < archetype.flee_radius:
+                step = self.speed * dt
                 dx = dy = 0
                 if player.rect.centerx > self.rect.centerx:
-                    dx = -self.speed
+                    dx = -step
                 if player.rect.centerx < self.rect.centerx:
-                    dx = self.speed
+                    dx = step
                 if player.rect.centery > self.rect.centery:
-                    dy = -self.speed
+                    dy = -step
                 if player.rect.centery < self.rect.centery:
-                    dy = self.speed
+                    dy = step
 
                 if dx != 0 and dy != 0:
                     dx *= 0.7071
@@ -165,33 +201,39 @@ class Enemy(pygame.sprite.Sprite):
 
                 self.move(dx, dy, obstacles)
 
-            # Attack player
-            if self.attack_cooldown == 0:
+            # Attack player, but don't waste arrows on trees
+            now = self.timers.now
+            if now >= self.attack_ready_tick and self.can_see(player):
                 self.shoot_arrow(player, projectiles)
-                self.attack_cooldown = random.randint(60, 120)  # Random cooldown between shots
+                self.attack_ready_tick = now + archetype.roll_attack_cooldown()
+
+    def can_see(self, player):
+        if self.line_of_sight is None:
+            return True
+        return self.line_of_sight.is_visible(self.rect.centerx, self.rect.centery,
+                                             player.rect.centerx, player.rect.centery)
 
-        # Update attack cooldown
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
+    def healer_behavior(self, player, obstacles, projectiles, dt=1):
+        # Healer stays put and heals nearby enemies
+        self.ai_state = 'idle'
+        self.emit_aura('heal', 'enemies')
 
-    def healer_behavior(self):
-        # Healer heals nearby enemies
-        if self.heal_cooldown == 0:
-            # Logic to heal nearby enemies
-            self.heal_cooldown = 120  # Cooldown before next heal
-        else:
-            self.heal_cooldown -= 1
+    def emit_aura(self, kind, target_type):
+        now = self.timers.now
+        if now >= self.aura_ready_tick:
+            archetype = self.archetype
+            if self.auras:
+                self.auras.emit(self.rect.centerx, self.rect.centery, archetype.aura_radius,
+                                archetype.aura_amount, kind, target_type, exclude=self)
+            self.aura_ready_tick = now + archetype.aura_cooldown
 
-    def assassin_behavior(self, player, obstacles):
+    def assassin_behavior(self, player, obstacles, projectiles, dt=1):
         # Assassin moves quickly towards the player and attacks
-        self.move_towards_player(player, obstacles)
+        self.ai_state = 'chasing'
+        self.move_towards_player(player, obstacles, dt)
         if self.rect.colliderect(player.rect):
-            if self.attack_cooldown == 0:
-                damage = 15  # High damage
-                player.take_damage(damage)
-                self.attack_cooldown = 60  # Cooldown frames
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
+            self.ai_state = 'attacking'
+            self.strike(player)
 
     def move(self, dx, dy, obstacles):
         if dx != 0:
@@ -202,6 +244,7 @@ class Enemy(pygame.sprite.Sprite):
             self.collide(0, dy, obstacles)
         # Prevent enemy from moving out of bounds
         self.rect.clamp_ip(pygame.Rect(10, HUD_HEIGHT + 10, WIDTH - 20, HEIGHT - HUD_HEIGHT - 20))
+        self.publish_state()
 
     def collide(self, dx, dy, obstacles):
         for obstacle in obstacles:
@@ -223,19 +266,40 @@ class Enemy(pygame.sprite.Sprite):
         if norm != 0:
             dx /= norm
             dy /= norm
-        arrow = Projectile(self.rect.centerx, self.rect.centery, dx, dy, 10, color=DARK_RED, target_type='player')
+        arrow = Projectile(self.rect.centerx, self.rect.centery, dx, dy, self.archetype.damage, color=DARK_RED,
+                           target_type='player')
         projectiles.append(arrow)
 
     def take_damage(self, amount):
+        was_alive = self.health > 0
         self.health -= amount
+        self.publish_state()
+        if self.event_bus:
+            self.event_bus.post(DamageTaken(self, amount))
+            if was_alive and self.health <= 0:
+                self.event_bus.post(EnemyKilled(self))
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
+    def publish_state(self):
+        """Write the enemy's state into the published game state, if there is one."""
+        if self.shared_state is not None:
+            self.shared_state.write(self)
+
+    def draw(self, sprites):
+        sprites.append((self.sprite_key, self.rect.x, self.rect.y))
         # Draw health bar above enemy
-        self.draw_health_bar(surface)
+        self.draw_health_bar(sprites)
 
-    def draw_health_bar(self, surface):
-        pygame.draw.rect(surface, RED, (self.rect.x, self.rect.y - 10, self.rect.width, 5))
+    def draw_health_bar(self, sprites):
         health_ratio = self.health / self.max_health
-        pygame.draw.rect(surface, GREEN, (self.rect.x, self.rect.y - 10, self.rect.width * health_ratio, 5))
+        sprites.append((health_bar_key(health_ratio), self.rect.x, self.rect.y - 10))
+
 
+# Behavior of each archetype, indexed by archetype_id
+BEHAVIOR_FUNCTIONS = {
+    'melee': Enemy.melee_behavior,
+    'archer': Enemy.archer_behavior,
+    'healer': Enemy.healer_behavior,
+    'assassin': Enemy.assassin_behavior,
+    'boss': Enemy.boss_behavior,
+}
+BEHAVIORS = [BEHAVIOR_FUNCTIONS[archetype.behavior] for archetype in ARCHETYPES]
@@ -0,0 +1,88 @@
+"""
+This module loads the enemy archetypes from enemy_archetypes.json into an indexed table.
+Each archetype describes one kind of enemy: its stats, color, behavior, damage, cooldowns and
+aggro radius. The table is loaded once at import time; an enemy only keeps the integer index
+of its archetype (archetype_id), and Enemy dispatches its behavior through a function table
+indexed the same way, so no strings are compared while the game runs.
+New enemy kinds are added by adding an entry to the JSON file with one of the existing behaviors.
+Archetype fields:
+    name (str): Name of the enemy type, as passed to Enemy and spawn_enemy.
+    behavior (str): 'melee', 'archer', 'healer', 'assassin' or 'boss'.
+    color (str or list): Name of a color in constants.py, or an [r, g, b] list.
+    speed, health, exp_value (number): Movement per frame, health and experience awarded on death.
+    damage (int): Damage of a melee hit or an arrow.
+    attack_cooldown (int or [min, max]): Frames between attacks, drawn again after every attack.
+    first_attack_delay (int or [min, max]): Frames before the first attack. Defaults to 0.
+    aggro_radius (int): Distance at which the enemy engages the player.
+    flee_radius (int): Distance under which an archer backs away from the player.
+    aura_radius, aura_amount, aura_cooldown (int): Heal aura of healers, damage pulse of bosses.
+    first_aura_delay (int): Frames before the first aura. Defaults to 0.
+    spawn (bool): Whether the enemy appears in the regular respawns.
+Classes:
+    Archetype: One enemy archetype.
+Archetype Methods:
+    __init__(archetype_id, data): Reads an archetype from its JSON object.
+    roll_attack_cooldown(): Returns the frames until the next attack.
+Functions:
+    load_archetypes(path=ARCHETYPES_PATH): Returns the list of archetypes in a JSON file.
+Module attributes:
+    ARCHETYPES (list): The archetypes, indexed by archetype_id.
+    ARCHETYPE_IDS (dict): Archetype name -> archetype_id.
+    SPAWN_ARCHETYPES (list): Names of the archetypes used for regular respawns.
+"""
+
+import json
+import os
+import random
+import constants
+
+ARCHETYPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'enemy_archetypes.json')
+
+
+def frame_range(value):
+    """Return a (min, max) pair of frames from an int or a [min, max] list."""
+    if isinstance(value, (list, tuple)):
+        return int(value[0]), int(value[1])
+    return int(value), int(value)
+
+
+class Archetype:
+    __slots__ = ('archetype_id', 'name', 'behavior', 'color', 'speed', 'health', 'exp_value', 'damage',
+                 'attack_cooldown', 'first_attack_delay', 'aggro_radius', 'flee_radius',
+                 'aura_radius', 'aura_amount', 'aura_cooldown', 'first_aura_delay', 'spawn')
+
+    def __init__(self, archetype_id, data):
+        self.archetype_id = archetype_id
+        self.name = data['name']
+        self.behavior = data['behavior']
+        color = data['color']
+        self.color = getattr(constants, color) if isinstance(color, str) else tuple(color)
+        self.speed = data['speed']
+        self.health = data['health']
+        self.exp_value = data['exp_value']
+        self.damage = data.get('damage', 0)
+        self.attack_cooldown = frame_range(data.get('attack_cooldown', 0))
+        self.first_attack_delay = frame_range(data.get('first_attack_delay', 0))
+        self.aggro_radius = data.get('aggro_radius', 0)
+        self.flee_radius = data.get('flee_radius', 0)
+        self.aura_radius = data.get('aura_radius', 0)
+        self.aura_amount = data.get('aura_amount', 0)
+        self.aura_cooldown = data.get('aura_cooldown', 0)
+        self.first_aura_delay = data.get('first_aura_delay', 0)
+        self.spawn = data.get('spawn', True)
+
+    def roll_attack_cooldown(self):
+        """Return the frames until the next attack, drawing from the range if there is one."""
+        low, high = self.attack_cooldown
+        return low if low == high else random.randint(low, high)
+
+
+def load_archetypes(path=ARCHETYPES_PATH):
+    """Load the archetypes from a JSON file, in file order."""
+    with open(path) as f:
+        return [Archetype(archetype_id, data) for archetype_id, data in enumerate(json.load(f))]
+
+
+ARCHETYPES = load_archetypes()
+ARCHETYPE_IDS = {archetype.name: archetype.archetype_id for archetype in ARCHETYPES}
+SPAWN_ARCHETYPES = [archetype.name for archetype in ARCHETYPES if archetype.spawn]
@@ -0,0 +1,106 @@
+"""
+This module defines the game event types and the EventBus used to deliver them.
+Subsystems post events when something happens instead of other subsystems polling for it
+every frame. Events are queued and delivered when the GameManager calls dispatch() at
+fixed points in the tick, so handlers never run in the middle of an entity update.
+Classes:
+    GameEvent: Base class for all game events.
+    EnemyKilled: Posted when an enemy's health drops to zero.
+    DamageTaken: Posted when the player or an enemy takes damage.
+    ItemPicked: Posted when the player picks up a coin or a potion.
+    LevelUp: Posted when the player has gained enough experience to level up.
+    ProjectileHit: Posted when a projectile hits its target or an obstacle.
+    SpellCast: Posted when a player casts a spell.
+    EventBus: Queues events and delivers them to subscribed handlers.
+EventBus Methods:
+    subscribe(event_type, handler): Registers a handler for an event type.
+    unsubscribe(event_type, handler): Removes a previously registered handler.
+    post(event): Queues an event for the next dispatch.
+    dispatch(): Delivers all queued events, including those posted by handlers.
+    clear(): Drops all queued events.
+"""
+
+
+class GameEvent:
+    __slots__ = ()
+
+
+class EnemyKilled(GameEvent):
+    __slots__ = ('enemy',)
+
+    def __init__(self, enemy):
+        self.enemy = enemy
+
+
+class DamageTaken(GameEvent):
+    __slots__ = ('target', 'amount')
+
+    def __init__(self, target, amount):
+        self.target = target
+        self.amount = amount
+
+
+class ItemPicked(GameEvent):
+    __slots__ = ('player', 'item', 'kind')
+
+    def __init__(self, player, item, kind):
+        self.player = player
+        self.item = item
+        self.kind = kind  # 'coin', 'health' or 'mana'
+
+
+class LevelUp(GameEvent):
+    __slots__ = ('player', 'level')
+
+    def __init__(self, player, level):
+        self.player = player
+        self.level = level
+
+
+class ProjectileHit(GameEvent):
+    __slots__ = ('projectile', 'target')
+
+    def __init__(self, projectile, target):
+        self.projectile = projectile
+        self.target = target  # None when an obstacle was hit
+
+
+class SpellCast(GameEvent):
+    __slots__ = ('player', 'projectile')
+
+    def __init__(self, player, projectile):
+        self.player = player
+        self.projectile = projectile
+
+
+class EventBus:
+    def __init__(self):
+        self.handlers = {}
+        self.queue = []
+
+    def subscribe(self, event_type, handler):
+        """Register a handler to be called with every event of the given type."""
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type, handler):
+        """Remove a previously registered handler."""
+        handlers = self.handlers.get(event_type)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+
+    def post(self, event):
+        """Queue an event for the next dispatch."""
+        self.queue.append(event)
+
+    def dispatch(self):
+        """Deliver all queued events, including any posted by the handlers themselves."""
+        while self.queue:
+            queue = self.queue
+            self.queue = []
+            for event in queue:
+                for handler in self.handlers.get(type(event), ()):
+                    handler(event)
+
+    def clear(self):
+        """Drop all queued events."""
+        self.queue.clear()
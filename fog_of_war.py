@@ -0,0 +1,239 @@
+"""
+This module defines the fog of war: only the parts of the arena the players can see are shown,
+and enemies outside their view are neither drawn nor targeted by spells.
+Visibility is computed on the ObstacleGrid's tile grid by recursive shadowcasting: each of the
+eight octants around the player's cell is scanned row by row outwards, and the slopes of the
+shadows cast by blocked cells (trees and walls) narrow the part of the next rows still seen.
+Blocked cells themselves are visible, so the trees at the edge of the view are shown.
+The cells visible from a cell only depend on the obstacles, so they are cached per cell and the
+cache is emptied when the obstacle grid's version changes. Visibility is only looked up again
+when a player moves to another cell; between cell changes update() does nothing, and the same
+set is handed to every snapshot. The FogLayer draws the fog into its own surface when that set
+changes and otherwise blits the cached surface.
+Classes:
+    FogOfWar: Tracks the cells the players see.
+    FogLayer: Render layer that darkens the cells outside the snapshot's visible cells.
+FogOfWar Methods:
+    __init__(obstacle_grid, radius=FOG_VIEW_RADIUS): Sees radius cells far through the grid's blocked cells.
+    update(players): Updates the visible cells if a player changed cell or the obstacles changed.
+    visible_from(cell): Returns the cells visible from a cell, from the cache when possible.
+    is_visible(x, y): Returns whether a point is visible, always True when the fog is off.
+    toggle(): Turns the fog on or off.
+FogOfWar Attributes:
+    enabled (bool): Whether the fog of war is on.
+    visible (frozenset): Cells the players see.
+    computed (int): Number of visibility computations, as opposed to cache hits.
+Functions:
+    shadowcast(origin, radius, blocked): Returns the cells visible from origin.
+    fog_of_war_enabled(): Returns whether the game starts with the fog of war on.
+Usage:
+    Press V while playing, or set TDA_FOG_OF_WAR=1, to turn the fog on. Run this module directly to
+    measure a visibility computation and the cost of the cache along a walk through the arena:
+        python fog_of_war.py [ticks]
+"""
+
+import os
+import pygame
+from constants import *
+from render_pipeline import RenderLayer
+from sprite_atlas import COLORKEY
+
+# (xx, xy, yx, yy): maps octant coordinates to grid offsets for each of the eight octants
+OCTANTS = ((1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+
+def fog_of_war_enabled():
+    """Return whether TDA_FOG_OF_WAR turns the fog on from the start."""
+    return os.environ.get('TDA_FOG_OF_WAR', '0') not in ('', '0')
+
+
+def shadowcast(origin, radius, blocked):
+    """Return the frozenset of cells within radius of origin that are not hidden by blocked cells."""
+    ox, oy = origin
+    visible = {origin}
+    radius_sq = radius * radius
+
+    def scan(row, start, end, xx, xy, yx, yy):
+        # Slopes run from start (high) to end (low) across each row of the octant
+        if start < end:
+            return
+        next_start = start
+        for distance in range(row, radius + 1):
+            dy = -distance
+            in_shadow = False
+            for dx in range(-distance, 1):
+                left = (dx - 0.5) / (dy + 0.5)
+                right = (dx + 0.5) / (dy - 0.5)
+                if start < right:
+                    continue
+                if end > left:
+                    break
+                cell = (ox + dx * xx + dy * xy, oy + dx * yx + dy * yy)
+                if dx * dx + dy * dy <= radius_sq:
+                    visible.add(cell)
+                if in_shadow:
+                    if cell in blocked:
+                        next_start = right
+                        continue
+                    in_shadow = False
+                    start = next_start
+                elif cell in blocked and distance < radius:
+                    # The blocked cell splits the view: scan the part before it, continue after it
+                    in_shadow = True
+                    scan(distance + 1, start, left, xx, xy, yx, yy)
+                    next_start = right
+            if in_shadow:
+                break
+
+    for octant in OCTANTS:
+        scan(1, 1.0, 0.0, *octant)
+    return frozenset(visible)
+
+
+class FogOfWar:
+    def __init__(self, obstacle_grid, radius=FOG_VIEW_RADIUS):
+        self.obstacle_grid = obstacle_grid
+        self.radius = radius
+        self.enabled = fog_of_war_enabled()
+        self.cache = {}  # Cell -> cells visible from it
+        self.version = None  # Obstacle grid version the cache was filled for
+        self.cells = ()  # Cells of the players the visible cells were found for
+        self.visible = frozenset()
+        self.computed = 0
+
+    def update(self, players):
+        """Recompute the visible cells if a player changed cell or the obstacles changed."""
+        if not self.enabled:
+            return
+        grid = self.obstacle_grid
+        if self.version != grid.version:
+            self.cache.clear()
+            self.version = grid.version
+            self.cells = ()
+        cells = tuple(grid.cell_of(*player.rect.center) for player in players if player.health > 0)
+        if cells == self.cells:
+            return
+        self.cells = cells
+        if len(cells) == 1:
+            self.visible = self.visible_from(cells[0])
+        else:
+            # Co-op players share what they see
+            self.visible = frozenset().union(*[self.visible_from(cell) for cell in cells])
+
+    def visible_from(self, cell):
+        """Return the cells visible from cell."""
+        visible = self.cache.get(cell)
+        if visible is None:
+            visible = self.cache[cell] = shadowcast(cell, self.radius, self.obstacle_grid.blocked)
+            self.computed += 1
+        return visible
+
+    def is_visible(self, x, y):
+        """Return whether the point (x, y) is in a visible cell."""
+        if not self.enabled:
+            return True
+        return self.obstacle_grid.cell_of(x, y) in self.visible
+
+    def toggle(self):
+        """Turn the fog of war on or off."""
+        self.enabled = not self.enabled
+        self.cells = ()  # Visibility is not tracked while the fog is off
+
+
+class FogLayer(RenderLayer):
+    """A render layer that darkens every cell outside the snapshot's visible cells.
+
+    The fog is drawn into its own surface, below the HUD, only when the visible cells change.
+    Seen cells are filled with the colorkey, which RLE-encodes well, and the rest with the fog.
+    """
+
+    def __init__(self, cell_size=TILE_SIZE, size=(WIDTH, HEIGHT - HUD_HEIGHT), top=HUD_HEIGHT):
+        self.cell_size = cell_size
+        self.size = size
+        self.top = top
+        self.surface = None
+        self.visible = None
+        self.redraws = 0
+
+    def render(self, draw_list, snapshot):
+        """Redraw the fog if the visible cells changed, then queue its blit."""
+        visible = snapshot.fog
+        if visible is None:
+            return
+        if self.surface is None or visible is not self.visible:
+            self.draw(visible)
+            self.visible = visible
+            self.redrawn = True
+            self.redraws += 1
+        draw_list.append((self.surface, (0, self.top)))
+
+    def draw(self, visible):
+        """Fill the fog surface, leaving the visible cells clear."""
+        surface = self.surface
+        if surface is None:
+            surface = self.surface = pygame.Surface(self.size)
+            surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            if FOG_ALPHA < 255:
+                surface.set_alpha(FOG_ALPHA, pygame.RLEACCEL)
+        surface.fill(BLACK)
+        size = self.cell_size
+        top = self.top
+        # One fill per run of visible cells in a row
+        rows = {}
+        for cx, cy in visible:
+            rows.setdefault(cy, []).append(cx)
+        for cy, columns in rows.items():
+            columns.sort()
+            first = previous = columns[0]
+            for cx in columns[1:]:
+                if cx != previous + 1:
+                    surface.fill(COLORKEY, (first * size, cy * size - top, (previous - first + 1) * size, size))
+                    first = cx
+                previous = cx
+            surface.fill(COLORKEY, (first * size, cy * size - top, (previous - first + 1) * size, size))
+
+    def invalidate(self):
+        """Recreate the surface on the next render."""
+        self.surface = None
+
+
+if __name__ == "__main__":
+    # Cost of one shadowcast, and of update() along a walk across the arena.
+    import random
+    import sys
+    import time
+    from arena_generator import ArenaGenerator
+    from obstacle_grid import ObstacleGrid
+
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    grid = ObstacleGrid()
+    grid.build(ArenaGenerator(seed=1).generate(), version=1)
+    start = (WIDTH // 2 // TILE_SIZE, (HUD_HEIGHT + HEIGHT) // 2 // TILE_SIZE)
+    began = time.perf_counter()
+    for _ in range(100):
+        cells = shadowcast(start, FOG_VIEW_RADIUS, grid.blocked)
+    print(f"shadowcast radius {FOG_VIEW_RADIUS}: {len(cells)} cells visible, "
+          f"{(time.perf_counter() - began) * 10:.3f} ms")
+
+    class Walker:
+        health = 1
+
+        def __init__(self):
+            self.rect = pygame.Rect(WIDTH // 2, (HUD_HEIGHT + HEIGHT) // 2, 30, 30)
+
+    random.seed(1)
+    fog = FogOfWar(grid)
+    fog.enabled = True
+    walker = Walker()
+    dx, dy = 3, 0
+    began = time.perf_counter()
+    for tick in range(ticks):
+        if tick % 60 == 0:
+            dx, dy = random.choice(((3, 0), (-3, 0), (0, 3), (0, -3), (2, 2), (-2, -2)))
+        walker.rect.move_ip(dx, dy)
+        walker.rect.clamp_ip(pygame.Rect(20, HUD_HEIGHT + 20, WIDTH - 40, HEIGHT - HUD_HEIGHT - 40))
+        fog.update([walker])
+    elapsed = time.perf_counter() - began
+    print(f"{ticks} ticks walking: {fog.computed} computations, {len(fog.cache)} cells cached, "
+          f"{elapsed * 1e6 / ticks:.1f} us per tick on average")
@@ -0,0 +1,65 @@
+"""
+This module loads the game's fonts.
+pygame.font.SysFont scans every system font (through fc-list on Linux) each time it is called,
+which can take hundreds of milliseconds. Instead the font file is resolved once and the path
+is kept in an on-disk cache, so later launches load the file directly. If the font is not
+installed, pygame's bundled default font is used, as SysFont would do.
+Attributes:
+    FONT (pygame.font.Font): The default font for the game, set by load_fonts().
+    FONT_LARGE (pygame.font.Font): The large font for the game, set by load_fonts().
+    FONT_CACHE_PATH (str): Location of the on-disk font path cache.
+Functions:
+    resolve_font_path(name): Returns the font file for a family name, using the cache.
+    load_fonts(): Initializes the font subsystem and creates FONT and FONT_LARGE.
+"""
+
+import json
+import os
+import pygame
+from constants import *
+
+FONT = None
+FONT_LARGE = None
+
+FONT_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'topdownadventure', 'fonts.json')
+
+
+def load_cache():
+    try:
+        with open(FONT_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        with open(FONT_CACHE_PATH, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # A read-only home only costs the scan on the next launch
+
+
+def resolve_font_path(name):
+    """Return the font file for a family name, or None for pygame's bundled default font."""
+    cache = load_cache()
+    if name in cache:
+        path = cache[name]
+        if path is None or os.path.exists(path):
+            return path
+    path = pygame.font.match_font(name)  # Slow: scans the system fonts
+    cache[name] = path
+    save_cache(cache)
+    return path
+
+
+def load_fonts():
+    """Initialize the font subsystem and create the game fonts."""
+    global FONT, FONT_LARGE
+    pygame.font.init()
+    path = resolve_font_path(FONT_NAME)
+    FONT = pygame.font.Font(path, FONT_SIZE)
+    FONT_LARGE = pygame.font.Font(path, FONT_LARGE_SIZE)
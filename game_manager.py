@@ -4,46 +4,184 @@ This module contains the GameManager class, which is responsible for managing th
 Classes:
     GameManager: Manages the overall game state and game entities.
 GameManager Methods:
-    __init__: Initializes the game manager and sets up initial game entities and state.
-    setup_obstacles: Sets up game obstacles like walls and trees.
-    add_random_tree: Adds a tree obstacle at a random location.
+    __init__: Opens the window, loads fonts, starts telemetry, and sets up initial game entities and state.
+        With headless=True nothing is displayed, for the co-op server. render_backend is the name
+        of a render backend ('surface' or 'texture'), by default from TDA_RENDER_BACKEND, or an
+        already open backend to keep using. telemetry is an already running Telemetry to keep using.
+    reset: Starts a new game in place: the managers, caches and window are reused, the entity lists
+        and timers are emptied, and the arena the ArenaGenerator prepared during the game is swapped in.
+    add_player, remove_player: Add or remove a player controlled by its own InputManager (co-op).
+    finish_startup: Runs the non-critical setup that is deferred until after the first frame.
+    setup_obstacles: Puts an arena from the ArenaGenerator in place and builds the obstacle grid.
+    toggle_fog_of_war: Turns the fog of war on or off (V while playing).
+    schedule_spawns: Schedules the enemy, potion and coin spawn timers of a new game.
     update: Updates the game state, including player, enemies, and other objects.
+    simulate: Advances the world by one tick, starting with the TimerWheel that drives cooldowns and spawns
+        and the particle effects, and ending with the status effects of spells and power-ups.
+        The fog of war then follows the players, and the new state is published in shared memory
+        when shared_state_name() is set.
     handle_level_up: Handles the level-up state where the player chooses a stat to increase.
-    update_enemies: Updates all enemies and handles respawns and deaths.
-    spawn_enemy: Spawns an enemy at a random location.
-    spawn_boss: Spawns the boss enemy.
-    update_potions: Handles potions spawning and player picking up potions.
-    update_coins: Handles coins spawning and player collecting coins.
-    update_projectiles: Updates all projectiles.
-    draw: Draws all game entities and the HUD.
+    level_up: Raises a player's chosen stat and lets the player level up again.
+    update_enemies: Updates enemies through the AI scheduler and spawns the boss.
+    spawn_enemy: Spawns an enemy at a random location; also the enemy respawn timer's callback.
+    spawn_boss: Spawns the boss enemy and stops the enemy respawns.
+    spawn_potion: Spawns a potion; scheduled 300-600 frames after the last potion is picked up.
+    spawn_coin: Spawns a coin, unless COIN_MAX are out, and schedules the next one 200-400 frames later.
+    expire_coin: Removes a coin nobody picked up within COIN_LIFETIME frames.
+    collect_pickups: Posts ItemPicked events for the potions and coins the player touches.
+    update_projectiles: Updates all projectiles, posts ProjectileHit events on impact and emits splash damage.
+    resolve_auras: Resolves the heal and damage auras emitted during the tick in one batched pass.
+    on_enemy_killed, on_damage_taken, on_item_picked, on_level_up: Event bus handlers.
+    setup_render_pipeline: Builds the render layers and the layers shown in each state.
+    snapshot: Captures everything the current frame shows in an immutable RenderSnapshot.
+    present: Renders a snapshot through the render pipeline and presents the frame with the render backend.
+    draw: Renders the current state through the render pipeline.
+    draw_world: Draws the background and obstacles into the cached world layer.
     draw_title_screen: Draws the title screen.
-    show_help_menu: Displays the help menu.
+    show_help_menu: Switches to the help menu state.
+    draw_help_menu: Draws the help menu.
+    wait_for_events: Blocks until input arrives or MENU_IDLE_TIMEOUT_MS pass.
     save_game: Saves the current game state.
     load_game: Loads a saved game state.
-    run: Main game loop.
+    run: Main game loop. Menus block on pygame.event.wait and only redraw on input.
+        The work time of each simulated frame goes to the telemetry frame-time summaries.
+        State changes are published in shared memory too, so readers see the menus.
+        A GCPolicy freezes the startup objects after the first frame, keeps automatic garbage
+        collection off while playing and collects in the slack at the end of each frame instead.
+        Frames are rendered on a RenderThread when render_thread_enabled() allows it and the render
+        backend is thread safe, overlapping the next simulation tick; otherwise they are rendered serially.
 """
 
 import pygame
 import sys
+import time
 import random
 from constants import *
 from player import Player
 from enemy import Enemy
-from obstacle import Obstacle
+from enemy_archetypes import SPAWN_ARCHETYPES
+from arena_generator import ArenaGenerator
 from potion import Potion
 from coin import Coin
 from projectile import Projectile
-from input_manager import InputManager
+from input_manager import InputManager, PAUSE, HELP
 from hud_manager import HUDManager
+from ai_scheduler import AIScheduler
+from crowd import CrowdSeparation
+from obstacle_grid import ObstacleGrid
+from line_of_sight import LineOfSight
+from aura import AuraSystem
+from fog_of_war import FogOfWar, FogLayer
+from status_effects import StatusEffects
+from timer_wheel import TimerWheel
+from events import EventBus, EnemyKilled, DamageTaken, ItemPicked, LevelUp, ProjectileHit
+from render_pipeline import RenderPipeline, RenderSnapshot, SpriteLayer, CachedLayer
+from render_thread import RenderThread, render_thread_enabled
+from sprite_atlas import SpriteAtlas
 from helpers import draw_text
+from startup import startup_timer
+from render_backend import create_backend
+from particles import ParticleSystem, ParticleLayer, particles_enabled
+from gc_policy import GCPolicy
+from shared_state import SharedStatePublisher, shared_state_name
+from telemetry import Telemetry, FrameStats, telemetry_enabled, SPAWN, LEVEL_UP, GAME_OVER, LEVEL_UP_STATS
+import fonts
 import pickle  # For save/load functionality
 
+PLAYER_START = (WIDTH // 2, HUD_HEIGHT + (HEIGHT - HUD_HEIGHT) // 2)
+
+# States in which the simulation runs and the loop ticks at FPS; all others are idle menus
+SIMULATION_STATES = ('playing',)
+# States that show the game world and therefore need its sprites in the render snapshot
+WORLD_STATES = ('playing', 'paused')
+# Keys of the level-up menu and the stat each one increases
+LEVEL_UP_KEYS = {pygame.K_1: 'max_mana', pygame.K_2: 'magic_damage', pygame.K_3: 'max_health',
+                 pygame.K_4: 'sword_damage'}
+
+HELP_LINES = [
+    "Controls:",
+    "- Move: Arrow Keys/WASD or Left Stick",
+    "- Melee Attack: Spacebar or R1",
+    "- Magic Attack: F or L1 (Hold to charge)",
+    "- Cycle Magic: Q/E or L2/R2",
+    "- Pause: P or Options button",
+    "- Fog of War: V",
+    "",
+    "Game Mechanics:",
+    "- Defeat enemies to gain experience and level up.",
+    "- Collect coins for score and experience.",
+    "- Use potions to restore health or mana.",
+    "- Mana regenerates over time.",
+    "- Be strategic with magic usage to manage mana.",
+    "",
+    "Level Up Choices:",
+    "- On leveling up, choose a stat to increase.",
+    "- Options: Max Mana, Magic Damage, Max Health, Sword Damage.",
+]
 
 
 class GameManager:
-    def __init__(self):
-        # Initialize player
-        self.player = Player(WIDTH // 2, HUD_HEIGHT + (HEIGHT - HUD_HEIGHT) // 2)
+    def __init__(self, headless=False, render_backend=None, telemetry=None):
+        self.headless = headless
+        self.render_backend = None
+        if not headless:
+            # Only the display and font subsystems are needed to show the first frame
+            if render_backend is None or isinstance(render_backend, str):
+                render_backend = create_backend(render_backend)
+            self.render_backend = render_backend
+            startup_timer.mark('display')
+            fonts.load_fonts()
+            startup_timer.mark('fonts')
+        self.clock = pygame.time.Clock()
+
+        # Event bus shared by all subsystems
+        self.event_bus = EventBus()
+        self.event_bus.subscribe(EnemyKilled, self.on_enemy_killed)
+        self.event_bus.subscribe(DamageTaken, self.on_damage_taken)
+        self.event_bus.subscribe(ItemPicked, self.on_item_picked)
+        self.event_bus.subscribe(LevelUp, self.on_level_up)
+
+        # Gameplay telemetry, which outlives restarts like the window does
+        if telemetry is None and not headless and telemetry_enabled():
+            telemetry = Telemetry(lambda: self.timers.now)
+            telemetry.start()
+        self.telemetry = telemetry
+        if telemetry is not None:
+            telemetry.subscribe(self.event_bus)
+
+        # Live game state for external tools, published every tick
+        self.shared_state = None
+        name = shared_state_name()
+        if name is not None:
+            try:
+                self.shared_state = SharedStatePublisher(name)
+                self.shared_state.subscribe(self.event_bus)
+            except FileExistsError as error:
+                print(f"Shared state disabled: {error}")
+
+        # Game clock: cooldowns, regeneration and spawns are scheduled on it in ticks
+        self.timers = TimerWheel()
+
+        # Particle effects on spell casts, projectile impacts and deaths; nothing to show when headless
+        self.particles = None
+        if not headless and particles_enabled():
+            self.particles = ParticleSystem()
+            self.particles.subscribe(self.event_bus)
+
+        # Burn, slow, stun and chain lightning of spells, and the players' power-ups
+        self.status_effects = StatusEffects()
+        self.status_effects.subscribe(self.event_bus)
+
+        # Obstacle grid and the queries built on it; filled in by setup_obstacles
+        self.obstacles_version = 0  # Bumped whenever obstacles change, to invalidate caches
+        self.obstacle_grid = ObstacleGrid()
+        self.line_of_sight = LineOfSight(self.obstacle_grid)
+        self.fog_of_war = FogOfWar(self.obstacle_grid)
+
+        # Initialize player. Co-op games add more players, each with its own InputManager.
+        self.player = Player(*PLAYER_START, self.timers, event_bus=self.event_bus, line_of_sight=self.line_of_sight,
+                             status_effects=self.status_effects, fog_of_war=self.fog_of_war)
+        self.players = [self.player]
 
         # Initialize other game entities
         self.enemies = []
@@ -53,83 +191,124 @@ class GameManager:
         self.projectiles = []  # Initialize an empty list for projectiles
 
         # Game state
-        self.enemy_respawn_timer = 0
         self.enemies_defeated = 0
         self.boss_spawned = False
-        self.potion_spawn_timer = 0
-        self.coin_spawn_timer = 0
+        self.schedule_spawns()
 
         # Managers
         self.input_manager = InputManager()
+        self.player_inputs = {self.player: self.input_manager}
         self.hud_manager = HUDManager(self.player)
+        self.ai_scheduler = AIScheduler()
+        self.crowd = CrowdSeparation()
+        self.auras = AuraSystem()
+        # Shared services handed to every enemy
+        self.enemy_services = {
+            'timers': self.timers,
+            'event_bus': self.event_bus,
+            'crowd': self.crowd,
+            'auras': self.auras,
+            'line_of_sight': self.line_of_sight,
+            'shared_state': self.shared_state.enemies if self.shared_state is not None else None,
+        }
 
-        # Set up obstacles
-        self.setup_obstacles()
+        # Set up obstacles. The arena of the next game is generated on a worker thread during this one.
+        self.arena_generator = ArenaGenerator(start=PLAYER_START, seed=random.getrandbits(64))
+        self.setup_obstacles(self.arena_generator.generate())
+        if not headless:
+            self.timers.schedule(ARENA_PREFETCH_DELAY, self.arena_generator.prefetch)
+        startup_timer.mark('game state')
+
+        # Rendering
+        self.frame = 0
+        self.world = ()
+        self.world_version = None
+        self.render_thread = None  # Set by run when frames are rendered on their own thread
+        self.gc_policy = None  # Set by run
+        if not headless:
+            self.setup_render_pipeline()
+            startup_timer.mark('render pipeline')
 
         # Game state management
-        self.state = 'title'  # Possible states: 'title', 'playing', 'paused', 'game_over', 'level_up'
+        self.state = 'title'  # Possible states: 'title', 'playing', 'paused', 'game_over', 'level_up', 'help'
         self.previous_state = None  # To keep track of the state before menus
 
-    def setup_obstacles(self):
-        """Set up game obstacles like walls and trees."""
-        self.walls = [
-            Obstacle(0, HUD_HEIGHT, WIDTH, 10, DARK_GREEN),  # Top wall
-            Obstacle(0, HEIGHT - 10, WIDTH, 10, DARK_GREEN),  # Bottom wall
-            Obstacle(0, HUD_HEIGHT, 10, HEIGHT - HUD_HEIGHT, DARK_GREEN),  # Left wall
-            Obstacle(WIDTH - 10, HUD_HEIGHT, 10, HEIGHT - HUD_HEIGHT, DARK_GREEN)  # Right wall
-        ]
-        self.obstacles.extend(self.walls)
-        # Add trees to obstacles
-        for _ in range(20):
-            self.add_random_tree()
-
-    def add_random_tree(self):
-        """Add a tree obstacle at a random location."""
-        while True:
-            x = random.randint(50, WIDTH - 50)
-            y = random.randint(HUD_HEIGHT + 50, HEIGHT - 50)
-            tree = Obstacle(x, y, TILE_SIZE, TILE_SIZE)
-            if not any(tree.rect.colliderect(ob.rect) for ob in self.obstacles):
-                self.obstacles.append(tree)
-                break
+    def reset(self):
+        """Start a new game in place, reusing the managers, their caches and the window."""
+        self.timers.clear()
+        self.event_bus.clear()
+        for player in self.players[1:]:
+            self.remove_player(player)
+        self.player.reset(*PLAYER_START)
+
+        self.enemies.clear()
+        self.potions.clear()
+        self.coins.clear()
+        self.projectiles.clear()
+        if self.particles is not None:
+            self.particles.clear()
+        self.ai_scheduler.clear()
+        self.auras.clear()
+        self.status_effects.clear()
+        if self.shared_state is not None:
+            self.shared_state.clear()
+
+        self.enemies_defeated = 0
+        self.boss_spawned = False
+        self.schedule_spawns()
+
+        self.setup_obstacles(self.arena_generator.take())
+        # Started once the game is under way, so that it does not delay the first frames
+        self.timers.schedule(ARENA_PREFETCH_DELAY, self.arena_generator.prefetch)
+        self.previous_state = None
+
+    def setup_obstacles(self, arena):
+        """Put an arena in place and build the obstacle grid."""
+        self.obstacles[:] = arena
+        self.obstacles_version += 1
+        self.obstacle_grid.build(self.obstacles, self.obstacles_version)
+        self.fog_of_war.update(self.players)
+
+    def toggle_fog_of_war(self):
+        """Turn the fog of war on or off."""
+        self.fog_of_war.toggle()
+        self.fog_of_war.update(self.players)
+
+    def schedule_spawns(self):
+        """Schedule the spawn timers; each interval is drawn once, when the spawn is scheduled."""
+        self.enemy_respawn_timer = self.timers.every(180, self.spawn_enemy)
+        self.potion_spawn_timer = self.timers.schedule(random.randint(300, 600), self.spawn_potion)
+        self.coin_spawn_timer = self.timers.schedule(random.randint(200, 400), self.spawn_coin)
 
     def update(self, events):
         """Update the game state, including player, enemies, and other objects."""
         self.input_manager.handle_input(events)
-        actions = self.input_manager.get_actions()
 
         if self.state == 'playing':
-            if actions["pause"]:
+            if self.input_manager.was_pressed(PAUSE):
                 self.state = 'paused'
                 return
 
-            if actions["help"]:
+            if self.input_manager.was_pressed(HELP):
                 self.show_help_menu(previous_state='playing')
                 return
 
-            # Update entities
-            self.player.update(self.input_manager, self.obstacles, self.enemies, self.coins, self.projectiles)
-            self.update_enemies()
-            self.update_potions()
-            self.update_coins()
-            self.update_projectiles()
-
-            # Check for level up
-            if self.player.level_up_pending:
-                self.state = 'level_up'
+            for event in events:
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_v:
+                    self.toggle_fog_of_war()
 
-            # Check for game over
-            if self.player.health <= 0:
-                self.state = 'game_over'
+            self.simulate()
 
         elif self.state == 'paused':
+            if self.input_manager.was_pressed(PAUSE):
+                self.state = 'playing'
+                return
+            if self.input_manager.was_pressed(HELP):
+                self.show_help_menu(previous_state='paused')
+                return
             for event in events:
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_p or self.input_manager.actions.get("pause"):
-                        self.state = 'playing'
-                    elif event.key == pygame.K_h or self.input_manager.actions.get("help"):
-                        self.show_help_menu(previous_state='paused')
-                    elif event.key == pygame.K_s:
+                    if event.key == pygame.K_s:
                         self.save_game()
                     elif event.key == pygame.K_l:
                         self.load_game()
@@ -137,6 +316,11 @@ class GameManager:
         elif self.state == 'level_up':
             self.handle_level_up(events)
 
+        elif self.state == 'help':
+            for event in events:
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    self.state = self.previous_state
+
         elif self.state == 'title':
             # Handle input in the title menu
             for event in events:
@@ -158,222 +342,331 @@ class GameManager:
                     sys.exit()
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_RETURN:
-                        self.__init__()  # Restart the game
+                        # Restart the game, once the render thread is done with the old one
+                        if self.render_thread is not None:
+                            self.render_thread.sync()
+                        self.reset()
+                        if self.gc_policy is not None:
+                            self.gc_policy.freeze()  # The new game's obstacles live until the next restart
                         self.state = 'playing'
                     elif event.key == pygame.K_ESCAPE:
                         pygame.quit()
                         sys.exit()
 
+    def simulate(self):
+        """Advance the world by one tick, delivering queued events after each phase."""
+        self.timers.advance()
+        if self.particles is not None:
+            self.particles.update()
+        for player in self.players:
+            if player.health > 0:
+                player.update(self.player_inputs[player], self.obstacles, self.enemies, self.projectiles)
+        self.event_bus.dispatch()
+        self.update_enemies()
+        self.event_bus.dispatch()
+        self.update_projectiles()
+        self.resolve_auras()
+        self.status_effects.update(self.crowd.grid)
+        self.collect_pickups()
+        self.event_bus.dispatch()
+        self.fog_of_war.update(self.players)
+        if self.shared_state is not None:
+            self.shared_state.publish(self)
+
+    def add_player(self, input_manager):
+        """Add a co-op player controlled by the given InputManager and return it."""
+        offset = 40 * len(self.players)
+        player = Player(WIDTH // 2 + offset, HUD_HEIGHT + (HEIGHT - HUD_HEIGHT) // 2, self.timers,
+                        event_bus=self.event_bus, line_of_sight=self.line_of_sight,
+                        status_effects=self.status_effects, fog_of_war=self.fog_of_war)
+        self.players.append(player)
+        self.player_inputs[player] = input_manager
+        return player
+
+    def remove_player(self, player):
+        """Remove a co-op player."""
+        self.players.remove(player)
+        del self.player_inputs[player]
+        player.cancel_timers()
+
     def handle_level_up(self, events):
         """Handle the level-up state where the player chooses a stat to increase."""
-        self.draw()
-        self.hud_manager.draw_level_up_menu(SCREEN)
-        pygame.display.flip()
         for event in events:
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_1:
-                    self.player.increase_stat('max_mana')
-                    self.state = 'playing'
-                    self.player.level_up_pending = False
-                elif event.key == pygame.K_2:
-                    self.player.increase_stat('magic_damage')
-                    self.state = 'playing'
-                    self.player.level_up_pending = False
-                elif event.key == pygame.K_3:
-                    self.player.increase_stat('max_health')
-                    self.state = 'playing'
-                    self.player.level_up_pending = False
-                elif event.key == pygame.K_4:
-                    self.player.increase_stat('sword_damage')
-                    self.state = 'playing'
-                    self.player.level_up_pending = False
+            if event.type == pygame.KEYDOWN and event.key in LEVEL_UP_KEYS:
+                self.level_up(self.player, LEVEL_UP_KEYS[event.key])
+                self.state = 'playing'
+
+    def level_up(self, player, stat):
+        """Increase the chosen stat of a player and clear its pending level up."""
+        player.increase_stat(stat)
+        player.level_up_pending = False
+        if self.telemetry is not None:
+            self.telemetry.record(LEVEL_UP, player.level, LEVEL_UP_STATS.index(stat))
 
     def update_enemies(self):
-        """Update all enemies and handle respawns and deaths."""
-        for enemy in self.enemies[:]:
-            enemy.update(self.player, self.obstacles, self.projectiles)
-            if enemy.health <= 0:
-                self.enemies.remove(enemy)
-                self.enemies_defeated += 1
-                self.player.increase_score(enemy.exp_value)
+        """Update all enemies and spawn the boss once enough enemies are defeated."""
+        # The AI scheduler decides which enemies run their logic this frame.
+        # Deaths are handled by on_enemy_killed.
+        # Enemies chase the nearest living player
+        targets = [player for player in self.players if player.health > 0] or self.players
+        self.line_of_sight.track_targets([player.rect.center for player in targets])
+        self.crowd.rebuild(self.enemies)
+        self.ai_scheduler.update(targets, self.obstacles, self.projectiles)
 
         # Boss spawn logic
         if self.enemies_defeated >= 20 and not self.boss_spawned:
             self.spawn_boss()
-            self.boss_spawned = True
-
-        # Respawn logic if necessary
-        if not self.boss_spawned:
-            self.enemy_respawn_timer += 1
-            if self.enemy_respawn_timer >= 180:
-                self.enemy_respawn_timer = 0
-                self.spawn_enemy()
 
     def spawn_enemy(self):
         """Spawn an enemy at a random location."""
         while True:
             x = random.randint(50, WIDTH - 50)
             y = random.randint(HUD_HEIGHT + 50, HEIGHT - 50)
-            enemy_type = random.choice(['melee', 'archer', 'tank', 'healer', 'assassin'])
-            enemy = Enemy(x, y, enemy_type=enemy_type)
+            enemy_type = random.choice(SPAWN_ARCHETYPES)
+            enemy = Enemy(x, y, enemy_type=enemy_type, **self.enemy_services)
             collision = False
             for obstacle in self.obstacles:
                 if enemy.rect.colliderect(obstacle.rect):
                     collision = True
                     break
-            if not collision and not enemy.rect.colliderect(self.player.rect):
+            if not collision and enemy.rect.collidelist(self.players) == -1:
                 self.enemies.append(enemy)
+                self.ai_scheduler.add(enemy)
+                enemy.publish_state()
+                if self.telemetry is not None:
+                    self.telemetry.record(SPAWN, enemy.archetype_id, x, y)
                 break
 
     def spawn_boss(self):
-        """Spawn the boss enemy."""
-        boss = Enemy(WIDTH // 2, HEIGHT // 2, enemy_type='boss')
+        """Spawn the boss enemy. No more enemies respawn once it is out."""
+        boss = Enemy(WIDTH // 2, HEIGHT // 2, enemy_type='boss', **self.enemy_services)
         self.enemies.append(boss)
+        self.ai_scheduler.add(boss)
+        boss.publish_state()
+        if self.telemetry is not None:
+            self.telemetry.record(SPAWN, boss.archetype_id, boss.rect.x, boss.rect.y)
+        self.boss_spawned = True
+        self.timers.cancel(self.enemy_respawn_timer)
+
+    def spawn_potion(self):
+        """Spawn a potion. The next one is scheduled once this one has been picked up."""
+        self.potion_spawn_timer = None
+        while True:
+            x = random.randint(50, WIDTH - 50)
+            y = random.randint(HUD_HEIGHT + 50, HEIGHT - 50)
+            potion_type = random.choice(['health', 'mana'])
+            potion = Potion(x, y, potion_type)
+            collision = False
+            if potion.rect.collidelist(self.players) != -1:
+                collision = True
+            for obstacle in self.obstacles:
+                if potion.rect.colliderect(obstacle.rect):
+                    collision = True
+                    break
+            if not collision:
+                self.potions.append(potion)
+                break
 
-    def update_potions(self):
-        """Handle potions spawning and player picking up potions."""
-        if not self.potions:
-            self.potion_spawn_timer += 1
-            if self.potion_spawn_timer >= random.randint(300, 600):
-                self.potion_spawn_timer = 0
-                while True:
-                    x = random.randint(50, WIDTH - 50)
-                    y = random.randint(HUD_HEIGHT + 50, HEIGHT - 50)
-                    potion_type = random.choice(['health', 'mana'])
-                    potion = Potion(x, y, potion_type)
-                    collision = False
-                    if potion.rect.colliderect(self.player.rect):
-                        collision = True
-                    for obstacle in self.obstacles:
-                        if potion.rect.colliderect(obstacle.rect):
-                            collision = True
-                            break
-                    if not collision:
-                        self.potions.append(potion)
-                        break
-        else:
-            for potion in self.potions[:]:
-                if self.player.rect.colliderect(potion.rect):
-                    if potion.potion_type == 'health':
-                        self.player.health += 30
-                        if self.player.health > self.player.max_health:
-                            self.player.health = self.player.max_health
-                    else:
-                        self.player.mana += 50
-                        if self.player.mana > self.player.max_mana:
-                            self.player.mana = self.player.max_mana
-                    self.potions.remove(potion)
-
-    def update_coins(self):
-        """Handle coins spawning and player collecting coins."""
-        self.coin_spawn_timer += 1
-        if self.coin_spawn_timer >= random.randint(200, 400):
-            self.coin_spawn_timer = 0
-            while True:
-                x = random.randint(50, WIDTH - 50)
-                y = random.randint(HUD_HEIGHT + 50, HEIGHT - 50)
-                coin = Coin(x, y)
-                collision = False
-                if coin.rect.colliderect(self.player.rect):
+    def spawn_coin(self):
+        """Spawn a coin and schedule the next one."""
+        while len(self.coins) < COIN_MAX:
+            x = random.randint(50, WIDTH - 50)
+            y = random.randint(HUD_HEIGHT + 50, HEIGHT - 50)
+            coin = Coin(x, y)
+            collision = False
+            if coin.rect.collidelist(self.players) != -1:
+                collision = True
+            for obstacle in self.obstacles:
+                if coin.rect.colliderect(obstacle.rect):
                     collision = True
-                for obstacle in self.obstacles:
-                    if coin.rect.colliderect(obstacle.rect):
-                        collision = True
-                        break
-                if not collision:
-                    self.coins.append(coin)
                     break
+            if not collision:
+                self.coins.append(coin)
+                self.timers.schedule(COIN_LIFETIME, self.expire_coin, coin)
+                break
+        self.coin_spawn_timer = self.timers.schedule(random.randint(200, 400), self.spawn_coin)
+
+    def expire_coin(self, coin):
+        """Remove a coin that was not picked up in time."""
+        if coin in self.coins:
+            self.coins.remove(coin)
+
+    def collect_pickups(self):
+        """Post an ItemPicked event for every potion and coin a player is touching."""
+        for player in self.players:
+            if player.health <= 0:
+                continue
+            rect = player.rect
+            for index in rect.collidelistall(self.potions):
+                potion = self.potions[index]
+                self.event_bus.post(ItemPicked(player, potion, potion.potion_type))
+            for index in rect.collidelistall(self.coins):
+                self.event_bus.post(ItemPicked(player, self.coins[index], 'coin'))
 
     def update_projectiles(self):
         """Update all projectiles."""
         for projectile in self.projectiles[:]:
-            remove = projectile.update(self.obstacles, self.player, self.enemies)
+            remove = projectile.update(self.obstacle_grid, self.players, self.enemies)
             if remove:
                 self.projectiles.remove(projectile)
-
-    def draw(self):
-        """Draw all game entities and the HUD."""
-        if self.state == 'title':
-            self.draw_title_screen()
-        elif self.state == 'playing' or self.state == 'level_up':
-            SCREEN.fill(BLACK)
-            for obstacle in self.obstacles:
-                obstacle.draw(SCREEN)
-            for potion in self.potions:
-                potion.draw(SCREEN)
-            for coin in self.coins:
-                coin.draw(SCREEN)
-            for enemy in self.enemies:
-                enemy.draw(SCREEN)
-            self.player.draw(SCREEN)
-            self.hud_manager.draw_hud(SCREEN)  # HUD is drawn through the HUDManager
-            for projectile in self.projectiles:
-                projectile.draw(SCREEN)
-        elif self.state == 'paused':
-            # Draw the game screen behind the pause message
-            SCREEN.fill(BLACK)
-            for obstacle in self.obstacles:
-                obstacle.draw(SCREEN)
+                if projectile.impacted:
+                    self.event_bus.post(ProjectileHit(projectile, projectile.hit_target))
+                    if projectile.splash_radius:
+                        x, y = projectile.rect.center
+                        self.auras.emit(x, y, projectile.splash_radius, projectile.damage * SPELL_SPLASH_FACTOR,
+                                        'damage', projectile.target_type, exclude=projectile.hit_target)
+
+    def resolve_auras(self):
+        """Apply this tick's auras using the enemy grid built for crowd separation."""
+        self.auras.resolve(self.crowd.grid, self.players)
+
+    def on_enemy_killed(self, event):
+        """Remove a dead enemy and award its score to every player."""
+        enemy = event.enemy
+        if enemy in self.enemies:
+            self.enemies.remove(enemy)
+            self.ai_scheduler.remove(enemy)
+            self.enemies_defeated += 1
+            for player in self.players:
+                player.increase_score(enemy.exp_value)
+
+    def on_damage_taken(self, event):
+        """End the game when every player is out of health."""
+        if event.target in self.player_inputs and all(player.health <= 0 for player in self.players):
+            if self.telemetry is not None and self.state != 'game_over':
+                self.telemetry.record(GAME_OVER, int(self.player.score), self.enemies_defeated)
+            self.state = 'game_over'
+
+    def on_item_picked(self, event):
+        """Apply the effect of a picked up potion or coin."""
+        player = event.player
+        if event.kind == 'coin':
+            if event.item in self.coins:
+                self.coins.remove(event.item)
+                player.increase_score(10)
+                player.gain_experience(5)
+        elif event.item in self.potions:
+            self.potions.remove(event.item)
+            if event.kind == 'health':
+                player.health = min(player.health + 30, player.max_health)
+            else:
+                player.mana = min(player.mana + 50, player.max_mana)
+            if not self.potions and self.potion_spawn_timer is None:
+                self.potion_spawn_timer = self.timers.schedule(random.randint(300, 600), self.spawn_potion)
+
+    def on_level_up(self, event):
+        """Switch to the level-up menu for the local player.
+
+        A headless co-op server keeps simulating and remote players have no menu, so their stats
+        are raised in turn instead.
+        """
+        player = event.player
+        if player is self.player and not self.headless:
+            if self.state == 'playing':
+                self.state = 'level_up'
+            return
+        self.level_up(player, LEVEL_UP_STATS[player.level % len(LEVEL_UP_STATS)])
+
+    def setup_render_pipeline(self):
+        """Build the render layers and the layers shown in each state."""
+        hud = self.hud_manager
+        self.sprite_atlas = SpriteAtlas()
+        self.render_pipeline = RenderPipeline()
+        # Layers only read the snapshot they are given, never the live game objects
+        self.render_pipeline.add_layer('world', CachedLayer(self.draw_world, key=lambda s: s.world_version, opaque=True))
+        self.render_pipeline.add_layer('pickups', SpriteLayer(self.sprite_atlas, 'pickups'))
+        self.render_pipeline.add_layer('actors', SpriteLayer(self.sprite_atlas, 'actors'))
+        self.render_pipeline.add_layer('projectiles', SpriteLayer(self.sprite_atlas, 'projectiles'))
+        self.render_pipeline.add_layer('particles', ParticleLayer())
+        self.render_pipeline.add_layer('fog', FogLayer())
+        self.render_pipeline.add_layer('hud', CachedLayer(
+            lambda surface, s: hud.draw_hud(surface, s.hud), key=lambda s: s.hud, size=(WIDTH, HUD_HEIGHT), opaque=True))
+        self.render_pipeline.add_layer('pause', CachedLayer(lambda surface, s: hud.draw_pause(surface), key=lambda s: None))
+        self.render_pipeline.add_layer('level_up', CachedLayer(
+            lambda surface, s: hud.draw_level_up_menu(surface), key=lambda s: None, opaque=True))
+        self.render_pipeline.add_layer('game_over', CachedLayer(
+            lambda surface, s: hud.draw_game_over(surface, s.enemies_defeated, s.score),
+            key=lambda s: (s.enemies_defeated, s.score), opaque=True))
+        self.render_pipeline.add_layer('title', CachedLayer(self.draw_title_screen, key=lambda s: None, opaque=True))
+        self.render_pipeline.add_layer('help', CachedLayer(
+            lambda surface, s: self.draw_help_menu(surface), key=lambda s: None, opaque=True))
+
+        world = ['world', 'pickups', 'actors', 'projectiles', 'particles', 'fog', 'hud']
+        self.render_pipeline.compose('playing', world)
+        self.render_pipeline.compose('paused', world + ['pause'])
+        self.render_pipeline.compose('level_up', ['level_up'])
+        self.render_pipeline.compose('game_over', ['game_over'])
+        self.render_pipeline.compose('title', ['title'])
+        self.render_pipeline.compose('help', ['help'])
+
+    def snapshot(self):
+        """Capture everything the current frame shows in an immutable RenderSnapshot."""
+        if self.world_version != self.obstacles_version:
+            self.world = tuple(self.obstacles)
+            self.world_version = self.obstacles_version
+        pickups = []
+        actors = []
+        projectiles = []
+        particles = None
+        fog = None
+        if self.state in WORLD_STATES:
+            if self.particles is not None:
+                particles = self.particles.snapshot()
+            fog_of_war = self.fog_of_war
+            if fog_of_war.enabled:
+                fog = fog_of_war.visible
             for potion in self.potions:
-                potion.draw(SCREEN)
+                potion.draw(pickups)
             for coin in self.coins:
-                coin.draw(SCREEN)
+                coin.draw(pickups)
             for enemy in self.enemies:
-                enemy.draw(SCREEN)
-            self.player.draw(SCREEN)
-            self.hud_manager.draw_hud(SCREEN)
+                # Enemies in the fog are not shown at all
+                if fog is None or fog_of_war.is_visible(*enemy.rect.center):
+                    enemy.draw(actors)
+            for player in self.players:
+                player.draw(actors)
             for projectile in self.projectiles:
-                projectile.draw(SCREEN)
-            self.hud_manager.draw_pause(SCREEN)
-        elif self.state == 'game_over':
-            SCREEN.fill(BLACK)
-            self.hud_manager.draw_game_over(SCREEN, self.enemies_defeated, self.player.score)
+                projectile.draw(projectiles)
+        self.frame += 1
+        return RenderSnapshot(
+            self.frame, self.state, self.world_version, self.world,
+            tuple(pickups), tuple(actors), tuple(projectiles), particles, fog,
+            self.hud_manager.get_hud_key(), self.player.score, self.enemies_defeated)
+
+    def present(self, snapshot):
+        """Render a snapshot and present the frame. Runs on the render thread when there is one."""
+        self.render_pipeline.render(self.render_backend, snapshot)
+        self.render_backend.present()
+
+    def draw(self):
+        """Render the current state. The caller presents the frame."""
+        self.render_pipeline.render(self.render_backend, self.snapshot())
 
-    def draw_title_screen(self):
+    def draw_world(self, surface, snapshot):
+        """Draw the background and obstacles."""
+        surface.fill(BLACK)
+        for obstacle in snapshot.world:
+            obstacle.draw(surface)
+
+    def draw_title_screen(self, surface, snapshot):
         """Draw the title screen."""
-        SCREEN.fill(BLACK)
-        draw_text(SCREEN, "Top-Down Adventure", (WIDTH // 2 - 150, HEIGHT // 2 - 100), WHITE, FONT_LARGE)
-        draw_text(SCREEN, "Press ENTER to Start", (WIDTH // 2 - 100, HEIGHT // 2), WHITE)
-        draw_text(SCREEN, "Press H for Help", (WIDTH // 2 - 80, HEIGHT // 2 + 50), WHITE)
+        surface.fill(BLACK)
+        draw_text(surface, "Top-Down Adventure", (WIDTH // 2 - 150, HEIGHT // 2 - 100), WHITE, fonts.FONT_LARGE)
+        draw_text(surface, "Press ENTER to Start", (WIDTH // 2 - 100, HEIGHT // 2), WHITE)
+        draw_text(surface, "Press H for Help", (WIDTH // 2 - 80, HEIGHT // 2 + 50), WHITE)
 
     def show_help_menu(self, previous_state):
-        """Display the help menu."""
+        """Switch to the help menu, returning to previous_state when it is closed."""
         self.previous_state = previous_state
-        help_lines = [
-            "Controls:",
-            "- Move: Arrow Keys/WASD or Left Stick",
-            "- Melee Attack: Spacebar or R1",
-            "- Magic Attack: F or L1 (Hold to charge)",
-            "- Cycle Magic: Q/E or L2/R2",
-            "- Pause: P or Options button",
-            "",
-            "Game Mechanics:",
-            "- Defeat enemies to gain experience and level up.",
-            "- Collect coins for score and experience.",
-            "- Use potions to restore health or mana.",
-            "- Mana regenerates over time.",
-            "- Be strategic with magic usage to manage mana.",
-            "",
-            "Level Up Choices:",
-            "- On leveling up, choose a stat to increase.",
-            "- Options: Max Mana, Magic Damage, Max Health, Sword Damage.",
-        ]
-        in_help = True
-        while in_help:
-            SCREEN.fill(BLACK)
-            draw_text(SCREEN, "Help", (WIDTH // 2 - 50, 100), WHITE, FONT_LARGE)
-            for i, line in enumerate(help_lines):
-                draw_text(SCREEN, line, (WIDTH // 2 - 300, 200 + i * 25), WHITE)
-            draw_text(SCREEN, "Press ESC to Return", (WIDTH // 2 - 100, HEIGHT - 100), YELLOW)
-            pygame.display.flip()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        in_help = False
-                        self.state = self.previous_state
+        self.state = 'help'
+
+    def draw_help_menu(self, surface):
+        """Draw the help menu."""
+        surface.fill(BLACK)
+        draw_text(surface, "Help", (WIDTH // 2 - 50, 100), WHITE, fonts.FONT_LARGE)
+        for i, line in enumerate(HELP_LINES):
+            draw_text(surface, line, (WIDTH // 2 - 300, 200 + i * 25), WHITE)
+        draw_text(surface, "Press ESC to Return", (WIDTH // 2 - 100, HEIGHT - 100), YELLOW)
 
     def save_game(self):
         """Save the current game state."""
@@ -400,18 +693,77 @@ class GameManager:
         except FileNotFoundError:
             print("No saved game found.")
 
+    def wait_for_events(self):
+        """Block until input arrives or MENU_IDLE_TIMEOUT_MS pass.
+
+        Returns the events and whether the screen needs to be redrawn.
+        """
+        event = pygame.event.wait(MENU_IDLE_TIMEOUT_MS)
+        if event.type == pygame.NOEVENT:
+            # Timed out: menus are static, so there is nothing new to show
+            return [], False
+        return [event] + pygame.event.get(), True
+
+    def finish_startup(self):
+        """Run the setup that the first frame does not need."""
+        self.input_manager.init_joystick()
+        startup_timer.mark('joystick')
+        startup_timer.finish()
+
     def run(self):
         """Main game loop."""
+        if render_thread_enabled() and self.render_backend.thread_safe:
+            self.render_thread = RenderThread(self.present)
+            self.render_thread.start()
+        frame_stats = FrameStats(self.telemetry) if self.telemetry is not None else None
+        self.gc_policy = GCPolicy(frame_stats)
         running = True
+        redraw = True
+        first_frame = True
         while running:
-            clock.tick(FPS)
-            events = pygame.event.get()
+            frame_start = None
+            if self.state in SIMULATION_STATES:
+                self.clock.tick(FPS)
+                frame_start = time.perf_counter()
+                events = pygame.event.get()
+                redraw = True
+            else:
+                # Nothing is simulated in menus, so sleep until there is something to do
+                events, redraw = self.wait_for_events()
             for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+            previous_state = self.state
             self.update(events)
-            self.draw()
-            pygame.display.flip()
+            if redraw or self.state != previous_state:
+                # Rendering this frame overlaps the next tick when there is a render thread
+                snapshot = self.snapshot()
+                if self.render_thread is not None:
+                    self.render_thread.submit(snapshot)
+                else:
+                    self.present(snapshot)
+            if frame_stats is not None and frame_start is not None:
+                frame_stats.add(time.perf_counter() - frame_start)
+            if first_frame:
+                first_frame = False
+                if self.render_thread is not None:
+                    self.render_thread.sync()
+                startup_timer.mark('first frame')
+                self.finish_startup()
+                self.gc_policy.freeze()
+            if self.state != previous_state:
+                self.gc_policy.set_state(self.state)
+                if self.shared_state is not None:
+                    self.shared_state.publish(self)
+            elif frame_start is not None:
+                self.gc_policy.use_slack(frame_start + 1 / FPS)
+        if self.render_thread is not None:
+            self.render_thread.stop()
+        self.gc_policy.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.shared_state is not None:
+            self.shared_state.close()
         pygame.quit()
         sys.exit()
 
@@ -0,0 +1,131 @@
+"""
+This module manages Python's cyclic garbage collector so that its pauses do not land in the
+middle of a frame. Automatic collection runs whenever enough objects have been allocated, so
+during play a generation 2 collection walks the whole heap (obstacles, sprites, fonts, render
+layers) at an arbitrary point of some frame. The policy instead:
+    - freezes the objects that live for the whole game once startup is done, so collections
+      never walk them again,
+    - disables automatic collection in the playing state and collects the young generations
+      itself, in the slack left at the end of a frame,
+    - collects everything in the menus (paused, level up, game over), where a pause is not seen.
+Every collection, scheduled or not, is timed through gc.callbacks and added to the frame stats,
+so the GC pauses appear in the telemetry next to the frame times.
+Classes:
+    GCPolicy: Decides when the garbage collector runs.
+GCPolicy Methods:
+    __init__(frame_stats=None): Starts timing collections; their pauses go to frame_stats.
+    freeze(): Collects, then freezes every object alive, such as the obstacles and fonts.
+    set_state(state): Switches between automatic collection and collecting in frame slack.
+    use_slack(deadline): Collects the young generations if the frame ends early enough before deadline.
+    close(): Stops timing collections and turns automatic collection back on.
+GCPolicy Attributes:
+    collections (int): Number of collections timed.
+    total_pause (float): Time spent in collections, in seconds.
+    max_pause (float): Longest collection, in seconds.
+Usage:
+    Run this module directly to compare frame times with automatic collection and with the policy:
+        python gc_policy.py [frames] [enemies]
+"""
+
+import gc
+import time
+from constants import *
+
+SLACK_STATES = ('playing',)  # States in which the policy collects instead of the interpreter
+
+
+class GCPolicy:
+    def __init__(self, frame_stats=None):
+        self.frame_stats = frame_stats
+        self.collections = 0
+        self.total_pause = 0.0
+        self.max_pause = 0.0
+        self.pause_start = 0.0
+        gc.callbacks.append(self.on_collection)
+
+    def on_collection(self, phase, info):
+        """Time each collection, whoever started it."""
+        if phase == 'start':
+            self.pause_start = time.perf_counter()
+            return
+        pause = time.perf_counter() - self.pause_start
+        self.collections += 1
+        self.total_pause += pause
+        if pause > self.max_pause:
+            self.max_pause = pause
+        if self.frame_stats is not None:
+            self.frame_stats.add_gc(pause)
+
+    def freeze(self):
+        """Collect, then move every object alive to the permanent generation."""
+        gc.unfreeze()  # A restart leaves the previous game's objects frozen
+        gc.collect()
+        gc.freeze()
+
+    def set_state(self, state):
+        """Collect in frame slack while playing and automatically in the menus."""
+        if state in SLACK_STATES:
+            gc.disable()
+        else:
+            gc.enable()
+            if state != 'title':
+                gc.collect()  # Nothing moves while a menu is shown, so the pause is not seen
+
+    def use_slack(self, deadline):
+        """Collect the young generations if the frame leaves enough time before deadline."""
+        if gc.isenabled():
+            return
+        young, middle, _ = gc.get_count()
+        slack = (deadline - time.perf_counter()) * 1000
+        if young >= GC_FORCE_COUNT:
+            gc.collect(0)  # Waiting longer would only make the eventual pause longer
+        elif middle >= GC_MIDDLE_COUNT and slack >= GC_FULL_SLACK_MS:
+            gc.collect(1)
+        elif young >= GC_YOUNG_COUNT and slack >= GC_MIN_SLACK_MS:
+            gc.collect(0)
+
+    def close(self):
+        """Stop timing collections and turn automatic collection back on."""
+        if self.on_collection in gc.callbacks:
+            gc.callbacks.remove(self.on_collection)
+        gc.enable()
+
+
+if __name__ == "__main__":
+    # Frame times of a headless game with automatic collection and with the policy.
+    # Each frame allocates like the real loop does: a tick, then a render snapshot.
+    import random
+    import sys
+    from game_manager import GameManager
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    enemy_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    budget = 1 / FPS
+    print(f"{frames} frames, {enemy_count} enemies, {budget * 1000:.1f} ms budget")
+    for name in ('automatic', 'policy'):
+        random.seed(1)
+        game = GameManager(headless=True)
+        game.state = 'playing'
+        game.player.health = game.player.max_health = 10 ** 9
+        for _ in range(enemy_count):
+            game.spawn_enemy()
+        if name == 'policy':
+            gc.collect()
+            gc.freeze()  # As GCPolicy.freeze, before timing starts so only the frames' collections count
+        policy = GCPolicy()
+        if name == 'policy':
+            policy.set_state('playing')
+        times = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            game.simulate()
+            game.snapshot()
+            times.append(time.perf_counter() - start)
+            if name == 'policy':
+                policy.use_slack(start + budget)
+        policy.close()
+        gc.unfreeze()
+        times.sort()
+        print(f"  {name:<10} frame p50 {times[frames // 2] * 1000:6.2f} ms"
+              f"  p99 {times[frames * 99 // 100] * 1000:6.2f} ms  max {times[-1] * 1000:6.2f} ms"
+              f"  | {policy.collections} collections, max pause {policy.max_pause * 1000:.2f} ms")
@@ -1,20 +1,27 @@
 """
 This module provides helper functions for the TopDownAdventure game.
 Functions:
-    draw_text(surface, text, pos, color=WHITE, font=FONT):
+    draw_text(surface, text, pos, color=WHITE, font=None):
         Renders and draws text on the given surface at the specified position.
+    nearest(entity, candidates):
+        Returns the candidate whose rect center is closest to the entity's.
 Constants:
     WHITE: Default color for the text.
-    FONT: Default font for rendering the text.
+    fonts.FONT: Default font for rendering the text, used when no font is given.
 """
 
 import sys
 import pygame
 from constants import *
+import fonts
 
-def draw_text(surface, text, pos, color=WHITE, font=FONT):
-    img = font.render(text, True, color)
+def draw_text(surface, text, pos, color=WHITE, font=None):
+    img = (font or fonts.FONT).render(text, True, color)
     surface.blit(img, pos)
 
+def nearest(entity, candidates):
+    x, y = entity.rect.center
+    return min(candidates, key=lambda c: (c.rect.centerx - x) ** 2 + (c.rect.centery - y) ** 2)
+
 # The help_menu function is now integrated into GameManager.show_help_menu()
 # This file should be depreciated and integrated somewhere else. 
@@ -5,8 +5,10 @@ Attributes:
 Methods:
     __init__(player):
         Initializes the HUDManager with the player object.
-    draw_hud(surface):
-        Draws the HUD elements on the given surface, including health bar, mana bar, experience bar, and various text elements.
+    draw_hud(surface, hud):
+        Draws the HUD elements from the values returned by get_hud_key, including health bar, mana bar, experience bar, and various text elements.
+    get_hud_key():
+        Returns a tuple of everything the HUD shows. It is captured in the render snapshot, and an unchanged HUD is reused.
     draw_game_over(surface, enemies_defeated, score):
         Draws the Game Over screen with the number of enemies defeated and the player's score.
     draw_pause(surface):
@@ -18,52 +20,72 @@ Methods:
 import pygame
 from constants import *
 from helpers import draw_text
+import fonts
+
+BAR_WIDTH = 200
+BAR_HEIGHT = 15
+
 
 class HUDManager:
     def __init__(self, player):
         self.player = player
 
-    def draw_hud(self, surface):
+    def get_hud_key(self):
+        """Return everything the HUD shows, with bars in whole pixels."""
+        player = self.player
+        return (
+            int(BAR_WIDTH * player.health / player.max_health),
+            int(BAR_WIDTH * player.mana / player.max_mana),
+            int(BAR_WIDTH * player.experience / player.next_level_exp),
+            int(player.health),
+            int(player.mana),
+            player.level,
+            player.score,
+            player.current_spell,
+            player.score_multiplier,
+        )
+
+    def draw_hud(self, surface, hud):
+        # The HUD is drawn from the snapshot of the player's values, never from the live player
+        health_width, mana_width, exp_width, health, mana, level, score, current_spell, score_multiplier = hud
+
         # Draw HUD background
         pygame.draw.rect(surface, BLACK, (0, 0, WIDTH, HUD_HEIGHT))
 
         # Health Bar
-        bar_width = 200
-        bar_height = 15
+        bar_width = BAR_WIDTH
+        bar_height = BAR_HEIGHT
         pygame.draw.rect(surface, RED, (10, 10, bar_width, bar_height))
-        health_ratio = self.player.health / self.player.max_health
-        pygame.draw.rect(surface, GREEN, (10, 10, bar_width * health_ratio, bar_height))
+        pygame.draw.rect(surface, GREEN, (10, 10, health_width, bar_height))
 
         # Mana Bar
         pygame.draw.rect(surface, DARK_RED, (10, 40, bar_width, bar_height))
-        mana_ratio = self.player.mana / self.player.max_mana
-        pygame.draw.rect(surface, BLUE, (10, 40, bar_width * mana_ratio, bar_height))
+        pygame.draw.rect(surface, BLUE, (10, 40, mana_width, bar_height))
 
         # Experience Bar
         pygame.draw.rect(surface, GRAY, (10, 70, bar_width, bar_height))
-        exp_ratio = self.player.experience / self.player.next_level_exp
-        pygame.draw.rect(surface, YELLOW, (10, 70, bar_width * exp_ratio, bar_height))
+        pygame.draw.rect(surface, YELLOW, (10, 70, exp_width, bar_height))
 
         # Text for Health, Mana, and Level
-        surface.blit(FONT.render(f"Health: {int(self.player.health)}", True, WHITE), (220, 10))  # Health Text
-        surface.blit(FONT.render(f"Mana: {int(self.player.mana)}", True, WHITE), (220, 40))  # Mana Text
-        surface.blit(FONT.render(f"Level: {self.player.level}", True, WHITE), (220, 70))  # Level Text
+        surface.blit(fonts.FONT.render(f"Health: {health}", True, WHITE), (220, 10))  # Health Text
+        surface.blit(fonts.FONT.render(f"Mana: {mana}", True, WHITE), (220, 40))  # Mana Text
+        surface.blit(fonts.FONT.render(f"Level: {level}", True, WHITE), (220, 70))  # Level Text
 
         # Draw Score
-        surface.blit(FONT.render(f"Score: {self.player.score}", True, WHITE), (WIDTH - 200, 10))  # Score Text
+        surface.blit(fonts.FONT.render(f"Score: {score}", True, WHITE), (WIDTH - 200, 10))  # Score Text
 
         # Display current spell
-        spell_text = f"Spell: {self.player.current_spell}"
-        surface.blit(FONT.render(spell_text, True, WHITE), (WIDTH - 200, 40))
+        spell_text = f"Spell: {current_spell}"
+        surface.blit(fonts.FONT.render(spell_text, True, WHITE), (WIDTH - 200, 40))
 
         # Display score multiplier
-        multiplier_text = f"Multiplier: x{self.player.score_multiplier}"
-        surface.blit(FONT.render(multiplier_text, True, WHITE), (WIDTH - 200, 70))
+        multiplier_text = f"Multiplier: x{score_multiplier}"
+        surface.blit(fonts.FONT.render(multiplier_text, True, WHITE), (WIDTH - 200, 70))
 
     def draw_game_over(self, surface, enemies_defeated, score):
         # Draw Game Over screen
         surface.fill(BLACK)
-        draw_text(surface, "Game Over", (WIDTH // 2 - 80, HEIGHT // 2 - 100), RED, FONT_LARGE)
+        draw_text(surface, "Game Over", (WIDTH // 2 - 80, HEIGHT // 2 - 100), RED, fonts.FONT_LARGE)
         draw_text(surface, f"Enemies Defeated: {enemies_defeated}", (WIDTH // 2 - 100, HEIGHT // 2 - 50), WHITE)
         draw_text(surface, f"Score: {score}", (WIDTH // 2 - 50, HEIGHT // 2 - 20), WHITE)
         draw_text(surface, "Press ENTER to Play Again", (WIDTH // 2 - 120, HEIGHT // 2 + 20), WHITE)
@@ -71,7 +93,7 @@ class HUDManager:
 
     def draw_pause(self, surface):
         # Draw Pause screen
-        draw_text(surface, "Paused", (WIDTH // 2 - 50, HEIGHT // 2 - 100), WHITE, FONT_LARGE)
+        draw_text(surface, "Paused", (WIDTH // 2 - 50, HEIGHT // 2 - 100), WHITE, fonts.FONT_LARGE)
         draw_text(surface, "Press P to Resume", (WIDTH // 2 - 100, HEIGHT // 2), WHITE)
         draw_text(surface, "Press H for Help", (WIDTH // 2 - 90, HEIGHT // 2 + 50), WHITE)
         draw_text(surface, "Press S to Save", (WIDTH // 2 - 80, HEIGHT // 2 + 100), WHITE)
@@ -80,7 +102,7 @@ class HUDManager:
     def draw_level_up_menu(self, surface):
         # Draw Level Up menu
         surface.fill(BLACK)
-        draw_text(surface, "Level Up!", (WIDTH // 2 - 80, HEIGHT // 2 - 150), YELLOW, FONT_LARGE)
+        draw_text(surface, "Level Up!", (WIDTH // 2 - 80, HEIGHT // 2 - 150), YELLOW, fonts.FONT_LARGE)
         draw_text(surface, "Choose a stat to increase:", (WIDTH // 2 - 150, HEIGHT // 2 - 100), WHITE)
         draw_text(surface, "1. Increase Max Mana", (WIDTH // 2 - 100, HEIGHT // 2 - 50), WHITE)
         draw_text(surface, "2. Increase Magic Damage", (WIDTH // 2 - 100, HEIGHT // 2), WHITE)
@@ -1,109 +1,272 @@
 """
 InputManager class to handle keyboard and joystick inputs for a game.
+Input is event-driven: KEYDOWN/KEYUP and JOY* events are folded into an integer bitmask of
+held actions, so quick taps that start and end between two frames are never lost.
+Actions:
+    MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN, ATTACK, MAGIC, PAUSE, NEXT_SPELL,
+    PREVIOUS_SPELL, HELP: One bit per action.
+    ACTIONS (dict): Maps action names to their bits, for rebinding by name.
 Attributes:
     joystick (pygame.joystick.Joystick): The joystick object if a joystick is connected.
-    actions (dict): Dictionary to store the current state of actions.
-    previous_actions (dict): Dictionary to store the previous state of actions.
+    key_bindings (dict): Maps keyboard keys to action bits.
+    button_bindings (dict): Maps joystick buttons to action bits.
+    held (int): Bitmask of the actions currently held.
+    pressed (int): Bitmask of the actions pressed since the last frame.
+    released (int): Bitmask of the actions released since the last frame.
+    press_counts (list): Number of presses of each action since the last frame.
+    release_counts (list): Number of releases of each action since the last frame.
+    buffer (collections.deque): Recent presses as (timestamp_ms, action) pairs.
+    clock (callable): Returns the current time in milliseconds, used to timestamp presses.
 Methods:
-    __init__():
-        Initializes the InputManager, setting up the joystick and action dictionaries.
+    __init__(key_bindings=None, button_bindings=None, clock=pygame.time.get_ticks):
+        Initializes the InputManager and its bindings.
+        A headless server passes a clock driven by its tick counter instead of SDL's timer.
+    init_joystick():
+        Initializes the joystick subsystem and opens the first joystick; deferred until after the first frame.
     handle_input(events):
-        Updates the actions dictionary based on the current key states and joystick inputs.
-    get_actions():
-        Returns the current action states.
+        Starts a new frame and applies the frame's input events.
+    apply_actions(actions):
+        Starts a new frame from a bitmask of held actions, e.g. one received from a co-op client.
+    is_held(action):
+        Checks if an action is currently held.
     was_pressed(action):
-        Checks if an action was just pressed.
+        Checks if an action was pressed since the last frame.
+    was_released(action):
+        Checks if an action was released since the last frame.
+    consume_buffered(action, window_ms=INPUT_BUFFER_MS):
+        Removes and reports a press of the action made within the last window_ms.
+    bind_key(key, action), unbind_key(key), bind_button(button, action), unbind_button(button):
+        Edit the binding tables.
+    release_all():
+        Releases every held action, e.g. when the window loses focus.
 """
 
+import collections
 import pygame
+from constants import *
+
+MOVE_LEFT = 1 << 0
+MOVE_RIGHT = 1 << 1
+MOVE_UP = 1 << 2
+MOVE_DOWN = 1 << 3
+ATTACK = 1 << 4
+MAGIC = 1 << 5
+PAUSE = 1 << 6
+NEXT_SPELL = 1 << 7
+PREVIOUS_SPELL = 1 << 8
+HELP = 1 << 9
+
+ACTIONS = {
+    "move_left": MOVE_LEFT,
+    "move_right": MOVE_RIGHT,
+    "move_up": MOVE_UP,
+    "move_down": MOVE_DOWN,
+    "attack": ATTACK,
+    "magic": MAGIC,
+    "pause": PAUSE,
+    "next_spell": NEXT_SPELL,
+    "previous_spell": PREVIOUS_SPELL,
+    "help": HELP,
+}
+ACTION_COUNT = len(ACTIONS)
+
+DEFAULT_KEY_BINDINGS = {
+    pygame.K_LEFT: MOVE_LEFT,
+    pygame.K_a: MOVE_LEFT,
+    pygame.K_RIGHT: MOVE_RIGHT,
+    pygame.K_d: MOVE_RIGHT,
+    pygame.K_UP: MOVE_UP,
+    pygame.K_w: MOVE_UP,
+    pygame.K_DOWN: MOVE_DOWN,
+    pygame.K_s: MOVE_DOWN,
+    pygame.K_SPACE: ATTACK,
+    pygame.K_f: MAGIC,
+    pygame.K_p: PAUSE,
+    pygame.K_e: NEXT_SPELL,
+    pygame.K_q: PREVIOUS_SPELL,
+    pygame.K_h: HELP,
+}
+
+DEFAULT_BUTTON_BINDINGS = {
+    5: ATTACK,  # R1
+    4: MAGIC,  # L1
+    6: PREVIOUS_SPELL,  # L2
+    7: NEXT_SPELL,  # R2
+    9: PAUSE,  # Options button on PS5 controller
+}
+
+# Left stick: (axis, direction) -> action
+AXIS_BINDINGS = {
+    (0, -1): MOVE_LEFT,
+    (0, 1): MOVE_RIGHT,
+    (1, -1): MOVE_UP,
+    (1, 1): MOVE_DOWN,
+}
+
+
+def action_index(action):
+    """Return the index of an action bit in the per-action counter lists."""
+    return action.bit_length() - 1
 
 
 class InputManager:
-    def __init__(self):
-        # Initialize joystick
-        pygame.joystick.init()
+    def __init__(self, key_bindings=None, button_bindings=None, clock=pygame.time.get_ticks):
+        self.clock = clock
+
+        # The joystick is opened by init_joystick once the first frame is on screen
         self.joystick = None
-        if pygame.joystick.get_count() > 0:
+
+        # Binding tables, editable at runtime
+        self.key_bindings = dict(DEFAULT_KEY_BINDINGS if key_bindings is None else key_bindings)
+        self.button_bindings = dict(DEFAULT_BUTTON_BINDINGS if button_bindings is None else button_bindings)
+
+        # Action state
+        self.held = 0
+        self.pressed = 0
+        self.released = 0
+        self.press_counts = [0] * ACTION_COUNT
+        self.release_counts = [0] * ACTION_COUNT
+        self.buffer = collections.deque(maxlen=INPUT_BUFFER_SIZE)
+
+        # Number of bound inputs holding each action, so two keys on one action behave
+        self.source_counts = [0] * ACTION_COUNT
+        # Inputs currently down, mapped to the action they were pressed as
+        self.down_sources = {}
+
+    def init_joystick(self):
+        """Initialize the joystick subsystem and open the first joystick, if any."""
+        pygame.joystick.init()
+        if self.joystick is None and pygame.joystick.get_count() > 0:
             self.joystick = pygame.joystick.Joystick(0)
             self.joystick.init()
 
-        # Dictionary to store the current actions
-        self.actions = {
-            "move_left": False,
-            "move_right": False,
-            "move_up": False,
-            "move_down": False,
-            "attack": False,
-            "magic": False,
-            "pause": False,
-            "next_spell": False,
-            "previous_spell": False,
-            "help": False,
-        }
-        # Store previous actions to detect key presses
-        self.previous_actions = self.actions.copy()
-
     def handle_input(self, events):
-        """Update the actions dictionary based on the current key states."""
-        self.previous_actions = self.actions.copy()
-        keys = pygame.key.get_pressed()
-        self.actions["move_left"] = keys[pygame.K_LEFT] or keys[pygame.K_a]
-        self.actions["move_right"] = keys[pygame.K_RIGHT] or keys[pygame.K_d]
-        self.actions["move_up"] = keys[pygame.K_UP] or keys[pygame.K_w]
-        self.actions["move_down"] = keys[pygame.K_DOWN] or keys[pygame.K_s]
-        self.actions["attack"] = keys[pygame.K_SPACE]
-        self.actions["magic"] = keys[pygame.K_f]
-
-        # Reset triggers for cycling spells
-        self.actions["next_spell"] = False
-        self.actions["previous_spell"] = False
-
-        # Cycling spells with Q and E
-        if keys[pygame.K_q]:
-            self.actions["previous_spell"] = True
-        if keys[pygame.K_e]:
-            self.actions["next_spell"] = True
-
-        # Controller input
-        if self.joystick:
-            # Left stick for movement
-            axis_x = self.joystick.get_axis(0)
-            axis_y = self.joystick.get_axis(1)
-            deadzone = 0.1
-            self.actions["move_left"] = axis_x < -deadzone
-            self.actions["move_right"] = axis_x > deadzone
-            self.actions["move_up"] = axis_y < -deadzone
-            self.actions["move_down"] = axis_y > deadzone
-
-            # R1 for sword attack
-            self.actions["attack"] = self.joystick.get_button(5)  # Button index for R1
-
-            # L1 for magic
-            self.actions["magic"] = self.joystick.get_button(4)  # Button index for L1
-
-            # L2 and R2 for cycling magic spells
-            if self.joystick.get_button(6):  # L2 button
-                self.actions["previous_spell"] = True
-            if self.joystick.get_button(7):  # R2 button
-                self.actions["next_spell"] = True
-
-            # Pause button (Options button on PS5 controller)
-            if self.joystick.get_button(9):
-                self.actions["pause"] = True
-
-        # For actions like pause and help, we need to detect key presses
+        """Start a new frame and apply this frame's input events."""
+        self._new_frame()
+
         for event in events:
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p:
-                    self.actions["pause"] = True
-                elif event.key == pygame.K_h:
-                    self.actions["help"] = True  # New action for help menu
+                action = self.key_bindings.get(event.key)
+                if action:
+                    self._source_down(('key', event.key), action)
+            elif event.type == pygame.KEYUP:
+                self._source_up(('key', event.key))
+            elif event.type == pygame.JOYBUTTONDOWN:
+                action = self.button_bindings.get(event.button)
+                if action:
+                    self._source_down(('button', event.button), action)
+            elif event.type == pygame.JOYBUTTONUP:
+                self._source_up(('button', event.button))
+            elif event.type == pygame.JOYAXISMOTION:
+                self._axis_motion(event.axis, event.value)
+            elif event.type == pygame.JOYDEVICEADDED and self.joystick is None:
+                self.joystick = pygame.joystick.Joystick(event.device_index)
+                self.joystick.init()
+            elif event.type == pygame.JOYDEVICEREMOVED:
+                if self.joystick and self.joystick.get_instance_id() == event.instance_id:
+                    self.joystick = None
+                    self.release_all()
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                # Key releases are not delivered while unfocused, so drop held actions
+                self.release_all()
 
-    def get_actions(self):
-        """Return the current action states."""
-        return self.actions
+    def apply_actions(self, actions):
+        """Start a new frame in which exactly the actions in the bitmask are held."""
+        self._new_frame()
+        pressed = actions & ~self.held
+        released = self.held & ~actions
+        self.held = actions
+        self.pressed = pressed
+        self.released = released
+        for index in range(ACTION_COUNT):
+            action = 1 << index
+            if pressed & action:
+                self.press_counts[index] += 1
+                self.buffer.append((self.clock(), action))
+            elif released & action:
+                self.release_counts[index] += 1
+
+    def is_held(self, action):
+        """Check if an action is currently held."""
+        return self.held & action != 0
 
     def was_pressed(self, action):
-        """Check if an action was just pressed."""
-        return not self.previous_actions.get(action, False) and self.actions.get(action, False)
+        """Check if an action was pressed since the last frame."""
+        return self.pressed & action != 0
+
+    def was_released(self, action):
+        """Check if an action was released since the last frame."""
+        return self.released & action != 0
+
+    def consume_buffered(self, action, window_ms=INPUT_BUFFER_MS):
+        """Remove and report a press of the action made within the last window_ms."""
+        if not self.buffer:
+            return False
+        oldest = self.clock() - window_ms
+        for entry in self.buffer:
+            if entry[1] == action and entry[0] >= oldest:
+                self.buffer.remove(entry)
+                return True
+        return False
+
+    def bind_key(self, key, action):
+        """Bind a keyboard key to an action, replacing any previous binding for the key."""
+        self.key_bindings[key] = action
+
+    def unbind_key(self, key):
+        """Remove the binding of a keyboard key."""
+        self.key_bindings.pop(key, None)
+
+    def bind_button(self, button, action):
+        """Bind a joystick button to an action, replacing any previous binding for the button."""
+        self.button_bindings[button] = action
+
+    def unbind_button(self, button):
+        """Remove the binding of a joystick button."""
+        self.button_bindings.pop(button, None)
+
+    def release_all(self):
+        """Release every held action."""
+        for source in list(self.down_sources):
+            self._source_up(source)
+
+    def _new_frame(self):
+        if self.pressed or self.released:
+            self.pressed = 0
+            self.released = 0
+            self.press_counts = [0] * ACTION_COUNT
+            self.release_counts = [0] * ACTION_COUNT
+
+    def _source_down(self, source, action):
+        if source in self.down_sources:
+            return
+        self.down_sources[source] = action
+        index = action_index(action)
+        self.source_counts[index] += 1
+        if self.source_counts[index] == 1:
+            self.held |= action
+            self.pressed |= action
+            self.press_counts[index] += 1
+            self.buffer.append((self.clock(), action))
+
+    def _source_up(self, source):
+        action = self.down_sources.pop(source, None)
+        if action is None:
+            return
+        index = action_index(action)
+        self.source_counts[index] -= 1
+        if self.source_counts[index] == 0:
+            self.held &= ~action
+            self.released |= action
+            self.release_counts[index] += 1
 
+    def _axis_motion(self, axis, value):
+        for direction in (-1, 1):
+            action = AXIS_BINDINGS.get((axis, direction))
+            if action is None:
+                continue
+            source = ('axis', axis, direction)
+            if value * direction > JOY_DEADZONE:
+                self._source_down(source, action)
+            else:
+                self._source_up(source)
@@ -0,0 +1,56 @@
+"""
+This module defines the LineOfSight service used by archers and spell targeting.
+Rays are traced through the ObstacleGrid, and results are cached per (source cell,
+target cell) pair. The cache is dropped when the obstacles change (the grid version moves)
+or when a tracked target (a player) leaves its cell, so repeated queries from enemies
+standing in the same cells cost a dictionary lookup.
+Classes:
+    LineOfSight: Cached line-of-sight queries over the obstacle grid.
+LineOfSight Methods:
+    __init__(obstacle_grid): Initializes the service with an empty cache.
+    track_target(x, y): Drops the cache when the tracked target changes cell.
+    track_targets(points): Drops the cache when any of several tracked targets changes cell.
+    is_visible(x0, y0, x1, y1): Returns whether there is a clear line between two points.
+    invalidate(): Drops every cached result.
+"""
+
+
+class LineOfSight:
+    def __init__(self, obstacle_grid):
+        self.obstacle_grid = obstacle_grid
+        self.cache = {}
+        self.version = obstacle_grid.version
+        self.target_cells = None
+        self.hits = 0
+        self.misses = 0
+
+    def track_target(self, x, y):
+        """Drop the cached results when the tracked target moves to another cell."""
+        self.track_targets(((x, y),))
+
+    def track_targets(self, points):
+        """Drop the cached results when any tracked target moves to another cell."""
+        cells = tuple(self.obstacle_grid.cell_of(x, y) for x, y in points)
+        if cells != self.target_cells:
+            self.target_cells = cells
+            self.cache.clear()
+
+    def is_visible(self, x0, y0, x1, y1):
+        """Return whether no obstacle blocks the line from (x0, y0) to (x1, y1)."""
+        grid = self.obstacle_grid
+        if grid.version != self.version:
+            self.version = grid.version
+            self.cache.clear()
+        key = (grid.cell_of(x0, y0), grid.cell_of(x1, y1))
+        visible = self.cache.get(key)
+        if visible is None:
+            self.misses += 1
+            visible = not grid.segment_blocked(x0, y0, x1, y1)
+            self.cache[key] = visible
+        else:
+            self.hits += 1
+        return visible
+
+    def invalidate(self):
+        """Drop every cached result."""
+        self.cache.clear()
@@ -4,6 +4,7 @@ It imports the GameManager class from the game_manager module and initializes
 an instance of GameManager to start the game.
 Usage:
     Run this script directly to start the game.
+    Pass --startup-timing (or set TDA_STARTUP_TIMING=1) to print a startup timing breakdown.
 Classes:
     GameManager: Manages the game state and controls the game loop.
 Functions:
@@ -12,7 +13,10 @@ Attributes:
     None
 """
 
+from startup import startup_timer
+startup_timer.mark('python startup')
 from game_manager import GameManager
+startup_timer.mark('import game modules')
 
 if __name__ == "__main__":
     # Start the game by initializing the GameManager
@@ -0,0 +1,132 @@
+"""
+This module defines the ObstacleGrid class, a tile grid over the obstacles used for swept
+collision and ray queries.
+Every obstacle is registered in each TILE_SIZE cell its rect (grown by a small margin)
+overlaps. Rays walk the grid cell by cell with a DDA traversal (Amanatides & Woo), so a query
+only tests the obstacles in the cells the ray actually crosses instead of every obstacle.
+Classes:
+    ObstacleGrid: Buckets obstacles by tile and answers ray queries.
+ObstacleGrid Methods:
+    __init__(cell_size=TILE_SIZE, margin=OBSTACLE_GRID_MARGIN): Initializes an empty grid.
+    build(obstacles, version=0): Rebuilds the grid from a list of obstacles.
+    cell_of(x, y): Returns the cell containing a point.
+    traverse(x0, y0, x1, y1): Yields the cells crossed by a segment, in order.
+    raycast(x0, y0, x1, y1, padding=0): Returns the first obstacle hit by a segment and where.
+    segment_blocked(x0, y0, x1, y1, padding=0): Returns whether any obstacle crosses a segment.
+"""
+
+import math
+from constants import *
+
+
+class ObstacleGrid:
+    def __init__(self, cell_size=TILE_SIZE, margin=OBSTACLE_GRID_MARGIN):
+        self.cell_size = cell_size
+        self.margin = margin  # Largest padding a ray query may use
+        self.cells = {}
+        self.blocked = set()  # Cells overlapped by an obstacle (without margin)
+        self.version = 0
+
+    def build(self, obstacles, version=0):
+        """Rebuild the grid from a list of obstacles."""
+        self.cells.clear()
+        self.blocked.clear()
+        self.version = version
+        size = self.cell_size
+        margin = self.margin
+        for obstacle in obstacles:
+            rect = obstacle.rect
+            for cx in range((rect.left - margin) // size, (rect.right - 1 + margin) // size + 1):
+                for cy in range((rect.top - margin) // size, (rect.bottom - 1 + margin) // size + 1):
+                    self.cells.setdefault((cx, cy), []).append(obstacle)
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                    self.blocked.add((cx, cy))
+
+    def cell_of(self, x, y):
+        """Return the cell containing a point."""
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def traverse(self, x0, y0, x1, y1):
+        """Yield (cx, cy, t_exit) for each cell crossed from (x0, y0) to (x1, y1).
+
+        t_exit is the fraction of the segment at which the ray leaves the cell.
+        """
+        size = self.cell_size
+        cx, cy = int(x0 // size), int(y0 // size)
+        end_x, end_y = int(x1 // size), int(y1 // size)
+        dx = x1 - x0
+        dy = y1 - y0
+
+        if dx > 0:
+            step_x, t_delta_x = 1, size / dx
+            t_max_x = ((cx + 1) * size - x0) / dx
+        elif dx < 0:
+            step_x, t_delta_x = -1, size / -dx
+            t_max_x = (cx * size - x0) / dx
+        else:
+            step_x, t_delta_x, t_max_x = 0, math.inf, math.inf
+        if dy > 0:
+            step_y, t_delta_y = 1, size / dy
+            t_max_y = ((cy + 1) * size - y0) / dy
+        elif dy < 0:
+            step_y, t_delta_y = -1, size / -dy
+            t_max_y = (cy * size - y0) / dy
+        else:
+            step_y, t_delta_y, t_max_y = 0, math.inf, math.inf
+
+        remaining = abs(end_x - cx) + abs(end_y - cy)
+        while True:
+            t_exit = min(t_max_x, t_max_y, 1.0)
+            yield cx, cy, t_exit
+            if remaining <= 0:
+                return
+            remaining -= 1
+            if t_max_x < t_max_y:
+                cx += step_x
+                t_max_x += t_delta_x
+            else:
+                cy += step_y
+                t_max_y += t_delta_y
+
+    def raycast(self, x0, y0, x1, y1, padding=0):
+        """Return (obstacle, x, y) for the first obstacle the segment hits, or None.
+
+        padding grows every obstacle, which turns the test into a sweep of a square of
+        half-size padding along the segment. It must not exceed the grid margin.
+        """
+        length_sq = (x1 - x0) ** 2 + (y1 - y0) ** 2
+        best = None
+        best_t = math.inf
+        checked = []
+        for cx, cy, t_exit in self.traverse(x0, y0, x1, y1):
+            for obstacle in self.cells.get((cx, cy), ()):
+                if obstacle in checked:
+                    continue
+                checked.append(obstacle)
+                rect = obstacle.rect.inflate(padding * 2, padding * 2) if padding else obstacle.rect
+                clipped = rect.clipline(x0, y0, x1, y1)
+                if not clipped:
+                    continue
+                hx, hy = clipped[0]
+                t = ((hx - x0) ** 2 + (hy - y0) ** 2) / length_sq if length_sq else 0
+                if t < best_t:
+                    best = (obstacle, hx, hy)
+                    best_t = t
+            # Later cells can only hold hits further along the ray
+            if best is not None and best_t <= t_exit * t_exit:
+                break
+        return best
+
+    def segment_blocked(self, x0, y0, x1, y1, padding=0):
+        """Return whether any obstacle crosses the segment."""
+        checked = []
+        for cx, cy, _ in self.traverse(x0, y0, x1, y1):
+            for obstacle in self.cells.get((cx, cy), ()):
+                if obstacle in checked:
+                    continue
+                checked.append(obstacle)
+                rect = obstacle.rect.inflate(padding * 2, padding * 2) if padding else obstacle.rect
+                if rect.clipline(x0, y0, x1, y1):
+                    return True
+        return False
@@ -0,0 +1,267 @@
+"""
+This module defines the particle effects: sparks when a spell is cast, when a projectile hits,
+and when an enemy dies.
+Particles live in preallocated NumPy arrays (position, velocity, remaining and total lifetime,
+color index) holding at most PARTICLE_CAP particles. The live particles are always the first
+count entries, so a tick moves, slows and ages all of them with a few array operations. The
+dead ones are dropped by moving the survivors from the end of the live range into their slots,
+which costs in proportion to the deaths rather than to the live count. Bursts past the cap are
+cut short, so a flood of effects never grows the arrays or the work per tick.
+Each frame's RenderSnapshot holds a copy of the live particles' pixel positions and colors.
+The ParticleLayer writes them straight into the pixels of a colorkeyed layer surface through
+pygame.surfarray, and queues a batch of blits covering only the rows of PARTICLE_TILE-pixel
+tiles that hold particles, so scattered bursts do not blit the whole arena. Particles fade out
+as they age through PARTICLE_SHADES darker shades of their color.
+NumPy is optional: without it particles_enabled() returns False and the game has no particles.
+Classes:
+    ParticleSystem: Holds, emits and updates the particles.
+    ParticleLayer: Render layer that draws the snapshot's particles.
+ParticleSystem Methods:
+    __init__(capacity=PARTICLE_CAP, seed=None): Allocates the arrays.
+    subscribe(event_bus): Emits bursts on SpellCast, ProjectileHit and EnemyKilled events.
+    emit(x, y, color, count, speed, life): Emits a burst of particles in every direction.
+    update(): Moves and ages the particles by one tick and drops the dead ones.
+    snapshot(): Returns the live particles as (positions, color codes, palette) for a RenderSnapshot.
+    clear(): Removes every particle.
+ParticleSystem Attributes:
+    count (int): Number of live particles.
+    dropped (int): Number of particles not emitted because the cap was reached.
+Functions:
+    particles_enabled(): Returns whether particles can and should be shown.
+Usage:
+    Set TDA_PARTICLES=0 to turn particles off. Run this module directly to measure the cost of
+    a full particle system per tick and per frame:
+        python particles.py [particles] [frames]
+"""
+
+import math
+import os
+import pygame
+from constants import *
+from events import EnemyKilled, ProjectileHit, SpellCast
+from render_pipeline import RenderLayer
+from sprite_atlas import COLORKEY
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PARTICLE_SIZE = 2  # Particles are squares of this many pixels
+PARTICLE_TILE = 64  # Side of the tiles the layer surface is cleared and blitted by
+
+
+def particles_enabled():
+    """Return whether NumPy is available and particles have not been turned off."""
+    return numpy is not None and os.environ.get('TDA_PARTICLES') not in ('0',)
+
+
+class ParticleSystem:
+    def __init__(self, capacity=PARTICLE_CAP, seed=None):
+        self.capacity = capacity
+        self.position = numpy.zeros((capacity, 2), numpy.float32)
+        self.velocity = numpy.zeros((capacity, 2), numpy.float32)
+        self.life = numpy.zeros(capacity, numpy.int16)
+        self.fade = numpy.zeros(capacity, numpy.float32)  # PARTICLE_SHADES / lifetime, to find the shade
+        self.color = numpy.zeros(capacity, numpy.int32)  # Index of the color's darkest shade
+        self.count = 0
+        self.dropped = 0
+        self.palette = ()  # Colors by index; replaced, never modified, as snapshots share it
+        self.color_index = {}
+        self.rng = numpy.random.default_rng(seed)  # Effects do not draw from the game's random
+
+    def subscribe(self, event_bus):
+        """Emit bursts when spells are cast, projectiles hit and enemies die."""
+        event_bus.subscribe(SpellCast, self.on_spell_cast)
+        event_bus.subscribe(ProjectileHit, self.on_projectile_hit)
+        event_bus.subscribe(EnemyKilled, self.on_enemy_killed)
+
+    def on_spell_cast(self, event):
+        x, y = event.player.rect.center
+        self.emit(x, y, event.projectile.color, 16, 1.5, 20)
+
+    def on_projectile_hit(self, event):
+        x, y = event.projectile.rect.center
+        self.emit(x, y, event.projectile.color, 24, 3.0, 25)
+
+    def on_enemy_killed(self, event):
+        x, y = event.enemy.rect.center
+        self.emit(x, y, event.enemy.color, 60, 4.0, 45)
+
+    def emit(self, x, y, color, count, speed, life):
+        """Emit count particles from (x, y) in random directions, living up to life ticks."""
+        start = self.count
+        n = min(count, self.capacity - start)
+        self.dropped += count - n
+        if n <= 0:
+            return
+        index = self.color_index.get(color)
+        if index is None:
+            index = self.color_index[color] = len(self.palette)
+            self.palette = self.palette + (color,)
+        end = start + n
+        rng = self.rng
+        angle = rng.random(n, numpy.float32) * numpy.float32(2 * math.pi)
+        magnitude = rng.uniform(0.2 * speed, speed, n).astype(numpy.float32)
+        self.position[start:end] = (x, y)
+        self.velocity[start:end, 0] = numpy.cos(angle) * magnitude
+        self.velocity[start:end, 1] = numpy.sin(angle) * magnitude
+        lives = rng.integers(max(life // 2, 1), life + 1, n, numpy.int16)
+        self.life[start:end] = lives
+        self.fade[start:end] = PARTICLE_SHADES / lives
+        self.color[start:end] = index * PARTICLE_SHADES
+        self.count = end
+
+    def update(self):
+        """Move and age every particle by one tick, then drop the dead ones."""
+        n = self.count
+        if not n:
+            return
+        position = self.position[:n]
+        velocity = self.velocity[:n]
+        life = self.life[:n]
+        position += velocity
+        velocity *= numpy.float32(PARTICLE_DRAG)
+        life -= 1
+        dead = numpy.flatnonzero(life <= 0)
+        if len(dead):
+            # Survivors past the new end of the live range fill the slots of the dead before it
+            alive_count = n - len(dead)
+            holes = dead[dead < alive_count]
+            if len(holes):
+                movers = numpy.flatnonzero(life[alive_count:] > 0) + alive_count
+                for array in (self.position, self.velocity, self.life, self.fade, self.color):
+                    array[holes] = array[movers]
+            self.count = alive_count
+
+    def snapshot(self):
+        """Return (positions, color codes, palette) of the live particles, or None if there are none."""
+        n = self.count
+        if not n:
+            return None
+        positions = self.position[:n].astype(numpy.int32)
+        shade = (self.life[:n] * self.fade[:n]).astype(numpy.int32)
+        numpy.minimum(shade, PARTICLE_SHADES - 1, out=shade)
+        return positions, self.color[:n] + shade, self.palette
+
+    def clear(self):
+        """Remove every particle."""
+        self.count = 0
+
+
+class ParticleLayer(RenderLayer):
+    """A render layer that writes the snapshot's particles into the pixels of its own surface.
+
+    The surface is queued through a new subsurface every frame, so the layer never reports it
+    as redrawn.
+    """
+
+    def __init__(self, size=(WIDTH, HEIGHT)):
+        self.size = size
+        self.surface = None
+        self.areas = []  # Parts of the surface the last particles were written to
+        self.palette = ()
+        self.colors = None  # Pixel value of every color code
+
+    def render(self, draw_list, snapshot):
+        """Write the particles into the layer surface and queue blits of the tiles they cover."""
+        surface = self.surface
+        if surface is None:
+            surface = self.surface = pygame.Surface(self.size)
+            surface.fill(COLORKEY)
+            surface.set_colorkey(COLORKEY)
+        for area in self.areas:
+            surface.fill(COLORKEY, area)
+        self.areas = []
+        particles = snapshot.particles
+        if particles is None:
+            return
+        positions, codes, palette = particles
+        if palette is not self.palette:
+            self.map_palette(surface, palette)
+        width, height = self.size
+        xs = positions[:, 0]
+        ys = positions[:, 1]
+        inside = (xs >= 0) & (xs <= width - PARTICLE_SIZE) & (ys >= HUD_HEIGHT) & (ys <= height - PARTICLE_SIZE)
+        if not inside.all():
+            xs = xs[inside]
+            ys = ys[inside]
+            codes = codes[inside]
+            if not len(xs):
+                return
+        colors = self.colors[codes]
+        pixels = pygame.surfarray.pixels2d(surface)
+        for dx in range(PARTICLE_SIZE):
+            for dy in range(PARTICLE_SIZE):
+                pixels[xs + dx, ys + dy] = colors
+        del pixels  # Unlocks the surface
+
+        # One blit per run of occupied tiles in each row of tiles
+        tile = PARTICLE_TILE
+        cols = -(-width // tile)
+        rows = -(-height // tile)
+        occupied = (numpy.bincount(ys // tile * cols + xs // tile, minlength=rows * cols) > 0).reshape(rows, cols)
+        bounds = surface.get_rect()
+        for row in numpy.flatnonzero(occupied.any(axis=1)):
+            flags = numpy.concatenate(([False], occupied[row], [False]))
+            edges = numpy.flatnonzero(flags[1:] != flags[:-1])
+            for first, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                # Particles reach PARTICLE_SIZE - 1 pixels past the tile they start in
+                area = pygame.Rect(first * tile, int(row) * tile, (end - first) * tile + PARTICLE_SIZE,
+                                   tile + PARTICLE_SIZE).clip(bounds)
+                self.areas.append(area)
+                draw_list.append((surface.subsurface(area), area.topleft))
+
+    def map_palette(self, surface, palette):
+        """Compute the pixel value of every shade of every palette color."""
+        colors = numpy.zeros(len(palette) * PARTICLE_SHADES, numpy.uint32)
+        for index, color in enumerate(palette):
+            for shade in range(PARTICLE_SHADES):
+                scale = (shade + 1) / PARTICLE_SHADES
+                colors[index * PARTICLE_SHADES + shade] = surface.map_rgb(
+                    [int(channel * scale) for channel in color[:3]])
+        self.palette = palette
+        self.colors = colors
+
+    def invalidate(self):
+        """Recreate the surface on the next render."""
+        self.surface = None
+        self.areas = []
+
+
+if __name__ == "__main__":
+    # Cost of a full particle system: simulation (update and snapshot) and rendering.
+    import sys
+    import time
+    from render_backend import SurfaceBackend
+    from render_pipeline import RenderSnapshot
+
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else PARTICLE_CAP
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    backend = SurfaceBackend()
+    system = ParticleSystem(seed=1)
+    layer = ParticleLayer()
+    colors = list(SPELL_COLORS.values()) + [GREEN, PURPLE]
+    simulate = render = 0.0
+    live = 0
+    for frame in range(frames):
+        # Keep the system near the target with fresh bursts all over the arena
+        while system.count < target and system.dropped == 0:
+            system.emit(100 + (frame * 37 + system.count) % (WIDTH - 200),
+                        HUD_HEIGHT + 100 + (frame * 53 + system.count) % (HEIGHT - HUD_HEIGHT - 200),
+                        colors[system.count % len(colors)], 60, 4.0, 45)
+        system.dropped = 0
+        start = time.perf_counter()
+        system.update()
+        particles = system.snapshot()
+        simulate += time.perf_counter() - start
+        live += system.count
+        snapshot = RenderSnapshot(frame, 'playing', 0, (), (), (), (), particles, None, (), 0, 0)
+        start = time.perf_counter()
+        draw_list = []
+        layer.render(draw_list, snapshot)
+        backend.draw(draw_list, ())
+        render += time.perf_counter() - start
+    print(f"{live / frames:.0f} live particles (cap {system.capacity}): "
+          f"update + snapshot {simulate * 1000 / frames:.3f} ms/tick, "
+          f"render {render * 1000 / frames:.3f} ms/frame")
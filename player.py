@@ -4,9 +4,14 @@ Classes:
     Player: Represents the player character in the game.
 Player class:
     Methods:
-        __init__(self, x, y):
+        __init__(self, x, y, timers, event_bus=None, line_of_sight=None, status_effects=None, fog_of_war=None):
             Initializes the player with position (x, y) and various attributes.
-        update(self, input_manager, obstacles, enemies, coins, projectiles):
+            Cooldowns are ticks of the shared TimerWheel, and health regeneration is scheduled on it.
+            Power-ups are effects of the shared StatusEffects. In fog-of-war mode only the enemies
+            the FogOfWar shows can be targeted.
+        reset(self, x, y):
+            Puts the player back at (x, y) with the stats of a new game, reusing the object on restart.
+        update(self, input_manager, obstacles, enemies, projectiles):
             Updates the player's state based on input actions and interactions with the game world.
         move(self, dx, dy, obstacles):
             Moves the player by dx and dy while handling collisions with obstacles.
@@ -17,42 +22,69 @@ Player class:
         get_attack_rect(self):
             Returns the attack area based on the player's facing direction.
         cast_magic(self, projectiles, enemies):
-            Handles the magic attack logic, creating a projectile targeting the nearest enemy.
+            Handles the magic attack logic, creating a projectile targeting the nearest visible enemy,
+            or the nearest enemy if none is visible. Enemies hidden by the fog of war are never targeted. The projectile carries the current spell,
+            whose status effect it applies on impact. Posts a SpellCast event.
         take_damage(self, amount):
             Reduces the player's health by the specified amount, considering active power-ups.
+            Posts a DamageTaken event.
+        gain_experience(self, amount):
+            Adds experience and posts a LevelUp event when the next level is reached.
         increase_score(self, amount):
             Increases the player's score with a multiplier and handles combo logic.
         reset_multiplier(self):
             Resets the score multiplier and combo counter.
-        draw(self, surface):
-            Draws the player and its attack area if attacking.
+        draw(self, sprites):
+            Appends the player and its attack area, if attacking, to the frame's render snapshot.
         increase_stat(self, stat):
             Increases the specified stat upon leveling up.
         get_state(self):
             Returns the current state of the player for saving.
         set_state(self, state):
             Sets the player's state from a saved state.
-        update_power_ups(self):
-            Updates power-up timers and effects.
+        regenerate_health(self):
+            Restores one health point; called by the TimerWheel every 3 seconds.
+        activate_power_up(self, power, duration):
+            Activates a power-up for duration frames as a status effect, which sets its power_ups flag.
+        cancel_timers(self):
+            Cancels the player's scheduled timers and power-ups when it leaves the game.
 """
 
 import pygame
 import math
 from constants import *
 from projectile import Projectile
+from events import DamageTaken, LevelUp, SpellCast
+from status_effects import POWER_UPS
+from input_manager import MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN, ATTACK, MAGIC, NEXT_SPELL, PREVIOUS_SPELL
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, timers, event_bus=None, line_of_sight=None, status_effects=None, fog_of_war=None):
         super().__init__()
+        self.timers = timers
+        self.event_bus = event_bus
+        self.line_of_sight = line_of_sight
+        self.status_effects = status_effects
+        self.fog_of_war = fog_of_war
         self.width = 30
         self.height = 30
         self.color = BLUE
         self.rect = pygame.Rect(x, y, self.width, self.height)
+        self.sprite_key = ('rect', self.color, self.width, self.height)
+        self.net_id = None  # Assigned by the co-op server
+        self.spells = MAGIC_SPELLS
+        self.health_regen_timer = None
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """Put the player at (x, y) with the stats of a new game."""
+        self.cancel_timers()
+        self.rect.topleft = (x, y)
         self.base_speed = 3
         self.speed = self.base_speed
         self.direction = 'down'  # Default facing down
         self.attacking = False
-        self.attack_cooldown = 0
+        self.attack_ready_tick = 0  # Tick from which the sword can be swung again
         self.health = 100
         self.max_health = 100
         self.mana = 100
@@ -65,7 +97,7 @@ class Player(pygame.sprite.Sprite):
         self.magic_hold_time = 0
         self.magic_charge_level = 0
         self.mana_recharge_cooldown = 0  # Cooldown before mana starts regenerating
-        self.magic_attack_cooldown = 0  # New variable for magic attack cooldown
+        self.magic_ready_tick = 0  # Tick at which the magic attack cooldown ends
 
         # Experience and Leveling
         self.level = 1
@@ -83,10 +115,9 @@ class Player(pygame.sprite.Sprite):
         self.combo_counter = 0
 
         # Health regeneration
-        self.health_regen_timer = 0
+        self.health_regen_timer = self.timers.every(180, self.regenerate_health)
 
         # Spells
-        self.spells = MAGIC_SPELLS
         self.current_spell_index = 0
         self.current_spell = self.spells[self.current_spell_index]
 
@@ -96,98 +127,64 @@ class Player(pygame.sprite.Sprite):
             'damage': False,
             'shield': False,
         }
-        self.power_up_timers = {
-            'speed': 0,
-            'damage': 0,
-            'shield': 0,
-        }
 
-    def update(self, input_manager, obstacles, enemies, coins, projectiles):
+    def update(self, input_manager, obstacles, enemies, projectiles):
         """Update player based on input actions passed by the InputManager."""
-        actions = input_manager.get_actions()
+        held = input_manager.held
         dx = dy = 0
 
         # Movement logic based on actions from InputManager
-        if actions["move_left"]:
+        if held & MOVE_LEFT:
             dx -= self.speed
             self.direction = 'left'
-        if actions["move_right"]:
+        if held & MOVE_RIGHT:
             dx += self.speed
             self.direction = 'right'
-        if actions["move_up"]:
+        if held & MOVE_UP:
             dy -= self.speed
             self.direction = 'up'
-        if actions["move_down"]:
+        if held & MOVE_DOWN:
             dy += self.speed
             self.direction = 'down'
 
-        # Handle attacking
-        if actions["attack"]:
-            if self.attack_cooldown == 0:
-                self.attacking = True
-                self.attack_cooldown = 20
-                self.attack(enemies)
-        else:
+        # Handle attacking; a tap made during the cooldown is buffered briefly
+        now = self.timers.now
+        if now >= self.attack_ready_tick and (input_manager.consume_buffered(ATTACK) or held & ATTACK):
+            self.attacking = True
+            self.attack_ready_tick = now + 20
+            self.attack(enemies)
+        elif not held & ATTACK:
             self.attacking = False
 
-        # Update attack cooldown
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-
         # Move player and handle collisions
         self.move(dx, dy, obstacles)
 
-        # Handle magic
-        if actions["magic"]:
+        # Handle magic; a tap shorter than a frame still charges for one frame
+        if held & MAGIC or input_manager.was_pressed(MAGIC):
             if self.mana > 0:
                 self.magic_hold_time += 1
                 self.mana -= 0.5  # Consumes mana when magic is used
-                self.magic_attack_cooldown = 10
+                self.magic_ready_tick = now + 10
         else:
             # If magic key was released
             if self.magic_hold_time > 0:
                 self.cast_magic(projectiles, enemies)
                 self.magic_hold_time = 0
 
-        # Update magic attack cooldown
-        if self.magic_attack_cooldown > 0:
-            self.magic_attack_cooldown -= 1
-
         # Mana regeneration
         if self.mana < self.max_mana:
             self.mana += self.mana_recharge_rate
             if self.mana > self.max_mana:
                 self.mana = self.max_mana
 
-        # Health regeneration (every 3 seconds)
-        self.health_regen_timer += 1
-        if self.health_regen_timer >= 180:
-            self.health_regen_timer = 0
-            if self.health < self.max_health:
-                self.health += 1
-
-        # Check collisions with coins
-        for coin in coins[:]:
-            if self.rect.colliderect(coin.rect):
-                self.increase_score(10)
-                self.experience += 5
-                coins.remove(coin)
-
-        # Level up if enough experience
-        if self.experience >= self.next_level_exp:
-            self.level_up_pending = True
-
         # Handle spell cycling
-        if input_manager.was_pressed("next_spell"):
+        if input_manager.was_pressed(NEXT_SPELL):
             self.current_spell_index = (self.current_spell_index + 1) % len(self.spells)
             self.current_spell = self.spells[self.current_spell_index]
-        if input_manager.was_pressed("previous_spell"):
+        if input_manager.was_pressed(PREVIOUS_SPELL):
             self.current_spell_index = (self.current_spell_index - 1) % len(self.spells)
             self.current_spell = self.spells[self.current_spell_index]
 
-        # Update power-up timers
-        self.update_power_ups()
-
     def move(self, dx, dy, obstacles):
         """Move the player by dx and dy while handling collisions."""
         if dx != 0:
@@ -247,21 +244,39 @@ class Player(pygame.sprite.Sprite):
         elif self.direction == 'right':
             dx, dy = 1, 0
 
-        # Find nearest enemy to target
+        # Find nearest enemy to target, preferring enemies that are not behind obstacles
         target = None
         min_distance = float('inf')
+        visible_target = None
+        min_visible_distance = float('inf')
+        x, y = self.rect.center
+        fog_of_war = self.fog_of_war if self.fog_of_war is not None and self.fog_of_war.enabled else None
         for enemy in enemies:
-            distance = math.hypot(enemy.rect.centerx - self.rect.centerx, enemy.rect.centery - self.rect.centery)
+            if fog_of_war is not None and not fog_of_war.is_visible(*enemy.rect.center):
+                continue
+            distance = math.hypot(enemy.rect.centerx - x, enemy.rect.centery - y)
             if distance < min_distance:
                 min_distance = distance
                 target = enemy
+            if distance < min_visible_distance and (
+                    self.line_of_sight is None or
+                    self.line_of_sight.is_visible(x, y, enemy.rect.centerx, enemy.rect.centery)):
+                min_visible_distance = distance
+                visible_target = enemy
+        if visible_target is not None:
+            target = visible_target
 
         # Create a projectile
         magic_damage = self.magic_damage
         spell_color = SPELL_COLORS.get(self.current_spell, PURPLE)
-        projectile = Projectile(self.rect.centerx, self.rect.centery, dx, dy, magic_damage, color=spell_color, target_type='enemies', target=target)
+        splash_radius = SPELL_SPLASH_RADIUS.get(self.current_spell, 0)
+        projectile = Projectile(self.rect.centerx, self.rect.centery, dx, dy, magic_damage, color=spell_color,
+                                target_type='enemies', target=target, splash_radius=splash_radius,
+                                spell=self.current_spell)
         # Append to projectiles list
         projectiles.append(projectile)
+        if self.event_bus is not None:
+            self.event_bus.post(SpellCast(self, projectile))
         # Sound effect can be played here if available
 
     def take_damage(self, amount):
@@ -272,8 +287,18 @@ class Player(pygame.sprite.Sprite):
         if self.health < 0:
             self.health = 0
         self.reset_multiplier()
+        if self.event_bus:
+            self.event_bus.post(DamageTaken(self, amount))
         # Sound effect can be played here if available
 
+    def gain_experience(self, amount):
+        """Add experience and announce a level up once enough has been gained."""
+        self.experience += amount
+        if self.experience >= self.next_level_exp and not self.level_up_pending:
+            self.level_up_pending = True
+            if self.event_bus:
+                self.event_bus.post(LevelUp(self, self.level + 1))
+
     def increase_score(self, amount):
         """Increase player's score with multiplier and handle combo."""
         self.score += amount * self.score_multiplier
@@ -286,12 +311,12 @@ class Player(pygame.sprite.Sprite):
         self.score_multiplier = 1
         self.combo_counter = 0
 
-    def draw(self, surface):
+    def draw(self, sprites):
         """Draw the player and its attack area if attacking."""
-        pygame.draw.rect(surface, self.color, self.rect)
+        sprites.append((self.sprite_key, self.rect.x, self.rect.y))
         if self.attacking:
             attack_rect = self.get_attack_rect()
-            pygame.draw.rect(surface, YELLOW, attack_rect)
+            sprites.append((('rect', YELLOW, attack_rect.width, attack_rect.height), attack_rect.x, attack_rect.y))
 
     def increase_stat(self, stat):
         """Increase the specified stat upon leveling up."""
@@ -339,13 +364,20 @@ class Player(pygame.sprite.Sprite):
         self.sword_damage = state.get('sword_damage', self.sword_damage)
         # Restore other necessary player attributes
 
-    def update_power_ups(self):
-        """Update power-up timers and effects."""
-        for power, active in self.power_ups.items():
-            if active:
-                self.power_up_timers[power] -= 1
-                if self.power_up_timers[power] <= 0:
-                    self.power_ups[power] = False
-                    if power == 'speed':
-                        self.speed = self.base_speed
+    def regenerate_health(self):
+        """Restore one health point; scheduled every 3 seconds."""
+        if 0 < self.health < self.max_health:
+            self.health += 1
+
+    def activate_power_up(self, power, duration):
+        """Activate a power-up for duration frames."""
+        if self.status_effects is not None:
+            magnitude = POWER_UP_SPEED_FACTOR if power == 'speed' else 1.0
+            self.status_effects.apply(self, POWER_UPS[power], duration, magnitude)
+
+    def cancel_timers(self):
+        """Cancel the player's scheduled timers and power-ups when it leaves the game."""
+        self.timers.cancel(self.health_regen_timer)
+        if self.status_effects is not None:
+            self.status_effects.remove_target(self)
 
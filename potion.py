@@ -13,10 +13,10 @@ Class Potion:
             x (int): The x-coordinate of the potion.
             y (int): The y-coordinate of the potion.
             potion_type (str): The type of the potion ('health' or 'mana').
-    draw(self, surface):
-        Draws the potion on the given surface.
+    draw(self, sprites):
+        Appends the potion's sprite to the frame's render snapshot.
         Parameters:
-            surface (pygame.Surface): The surface to draw the potion on.
+            sprites (list): The (sprite_key, x, y) entries of the snapshot being built.
 """
 
 import pygame
@@ -30,7 +30,8 @@ class Potion(pygame.sprite.Sprite):
         self.potion_type = potion_type  # 'health' or 'mana'
         self.color = RED if potion_type == 'health' else BLUE
         self.rect = pygame.Rect(x, y, self.width, self.height)
+        self.sprite_key = ('outlined_rect', self.color, self.width, self.height)
+        self.net_id = None  # Assigned by the co-op server
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
-        pygame.draw.rect(surface, WHITE, self.rect, 2)
+    def draw(self, sprites):
+        sprites.append((self.sprite_key, self.rect.x, self.rect.y))
@@ -4,19 +4,29 @@ Attributes:
     radius (int): Radius of the projectile.
     color (tuple): Color of the projectile.
     rect (pygame.Rect): Rect object representing the projectile's position and size.
+    x (float): Exact x-coordinate of the projectile's center; rect follows it rounded.
+    y (float): Exact y-coordinate of the projectile's center; rect follows it rounded.
     dx (float): Change in x-direction per update.
     dy (float): Change in y-direction per update.
     speed (int): Speed of the projectile.
     damage (int): Damage dealt by the projectile.
     target_type (str): Type of target ('enemies' or 'player').
     target (pygame.sprite.Sprite): Specific target sprite.
+    hit_target (pygame.sprite.Sprite): The sprite this projectile hit, if any.
+    splash_radius (int): Radius of the splash damage dealt on impact, 0 for none.
+    spell (str): Name of the spell the projectile carries, whose status effect it applies on impact, or None.
+    impacted (bool): Whether the projectile was removed by hitting an obstacle or a target.
 Methods:
-    __init__(x, y, dx, dy, damage, color=CYAN, target_type='enemies', target=None):
+    __init__(x, y, dx, dy, damage, color=CYAN, target_type='enemies', target=None, splash_radius=0, spell=None):
         Initializes the projectile with given parameters.
-    update(obstacles, player, enemies):
+    update(obstacle_grid, players, enemies):
         Updates the projectile's position and checks for collisions.
-    draw(surface):
-        Draws the projectile on the given surface.
+        The move is swept through the ObstacleGrid and against the targets, and the nearest hit
+        along it wins, so fast projectiles can neither tunnel through walls nor fly past targets.
+    sweep(targets, x0, y0, x1, y1):
+        Returns (target, x, y) for the first target the move from (x0, y0) to (x1, y1) hits, or None.
+    draw(sprites):
+        Appends the projectile's sprite to the frame's render snapshot.
 """
 
 import pygame
@@ -24,24 +34,33 @@ import math
 from constants import *
 
 class Projectile(pygame.sprite.Sprite):
-    def __init__(self, x, y, dx, dy, damage, color=CYAN, target_type='enemies', target=None):
+    def __init__(self, x, y, dx, dy, damage, color=CYAN, target_type='enemies', target=None, splash_radius=0,
+                 spell=None):
         super().__init__()
         self.radius = 5
         self.color = color
         self.rect = pygame.Rect(x, y, self.radius * 2, self.radius * 2)
+        self.x = float(self.rect.centerx)
+        self.y = float(self.rect.centery)
         self.dx = dx
         self.dy = dy
-        self.speed = 5
+        self.speed = PROJECTILE_SPEED
         self.damage = damage
         self.target_type = target_type  # 'enemies' or 'player'
         self.target = target
+        self.hit_target = None
+        self.splash_radius = splash_radius
+        self.spell = spell
+        self.impacted = False
+        self.sprite_key = ('circle', self.color, self.radius)
+        self.net_id = None  # Assigned by the co-op server
 
-    def update(self, obstacles, player, enemies):
+    def update(self, obstacle_grid, players, enemies):
         if self.target_type == 'enemies':
             if self.target and self.target.health > 0:
                 # Adjust direction towards the target
-                dx = self.target.rect.centerx - self.rect.centerx
-                dy = self.target.rect.centery - self.rect.centery
+                dx = self.target.rect.centerx - self.x
+                dy = self.target.rect.centery - self.y
                 distance = math.hypot(dx, dy)
                 if distance != 0:
                     self.dx = dx / distance
@@ -50,24 +69,29 @@ class Projectile(pygame.sprite.Sprite):
                 # Continue in last known direction
                 pass
 
-        self.rect.x += self.dx * self.speed
-        self.rect.y += self.dy * self.speed
+        # Move in float coordinates and sweep the path against the obstacle grid
+        x0, y0 = self.x, self.y
+        self.x += self.dx * self.speed
+        self.y += self.dy * self.speed
+        hit = obstacle_grid.raycast(x0, y0, self.x, self.y, padding=self.radius)
+        if hit:
+            _, self.x, self.y = hit
+            self.impacted = True
 
-        # Check collision with obstacles
-        for obstacle in obstacles:
-            if self.rect.colliderect(obstacle.rect):
-                return True  # Remove projectile
-
-        # Check collision with targets
+        # Then sweep the path, up to the obstacle hit, against the targets
         if self.target_type == 'enemies':
-            for enemy in enemies:
-                if self.rect.colliderect(enemy.rect):
-                    enemy.take_damage(self.damage)
-                    return True  # Remove projectile
-        elif self.target_type == 'player':
-            if self.rect.colliderect(player.rect):
-                player.take_damage(self.damage)
-                return True  # Remove projectile
+            targets = enemies
+        else:
+            targets = [player for player in players if player.health > 0]
+        target_hit = self.sweep(targets, x0, y0, self.x, self.y)
+        if target_hit:
+            target, self.x, self.y = target_hit
+            target.take_damage(self.damage)
+            self.hit_target = target
+            self.impacted = True
+        self.rect.center = (round(self.x), round(self.y))
+        if self.impacted:
+            return True  # Remove projectile
 
         # Remove projectile if it goes off-screen
         if (self.rect.right < 0 or self.rect.left > WIDTH or
@@ -76,6 +100,25 @@ class Projectile(pygame.sprite.Sprite):
 
         return False
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, self.rect.center, self.radius)
+    def sweep(self, targets, x0, y0, x1, y1):
+        """Return (target, x, y) for the first target the move hits, or None."""
+        # Targets grown by the radius turn the test into a sweep of the projectile's square
+        padding = self.radius * 2
+        path = pygame.Rect(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1).inflate(padding, padding)
+        best = None
+        best_distance = math.inf
+        for index in path.collidelistall(targets):
+            target = targets[index]
+            clipped = target.rect.inflate(padding, padding).clipline(x0, y0, x1, y1)
+            if not clipped:
+                continue
+            hx, hy = clipped[0]
+            distance = (hx - x0) ** 2 + (hy - y0) ** 2
+            if distance < best_distance:
+                best = (target, hx, hy)
+                best_distance = distance
+        return best
+
+    def draw(self, sprites):
+        sprites.append((self.sprite_key, self.rect.x, self.rect.y))
 
@@ -0,0 +1,137 @@
+"""
+This module defines the render backends that put the RenderPipeline's draw list on screen.
+The pipeline hands a backend the frame as a batch of (surface, position) pairs, plus the
+surfaces whose contents were redrawn since they were last drawn (cached layers such as the
+world and the HUD). Entities and menus never draw through a backend directly: entities
+describe themselves with sprite keys, and menus draw into cached layer surfaces, so both
+work unchanged on every backend.
+    - SurfaceBackend blits the batch onto the display surface from set_mode in one
+      Surface.blits call and flips it. This is the default.
+    - TextureBackend draws through pygame._sdl2.video. Each sprite and cached layer surface
+      is uploaded once as a Texture and re-uploaded only when its layer redraws, so a frame
+      is a list of texture copies followed by a present. SDL picks the render driver and
+      falls back to its software renderer when there is no GPU; set SDL_RENDER_DRIVER=software
+      to force it.
+Classes:
+    SurfaceBackend: Software blits onto the display surface.
+    TextureBackend: Texture copies through an SDL Renderer.
+Backend Methods:
+    draw(draw_list, dirty): Draws the batch; dirty lists the surfaces that were redrawn.
+    present(): Shows the frame.
+Backend Attributes:
+    thread_safe (bool): Whether draw and present may run on the render thread.
+Functions:
+    create_backend(name=None): Opens the game window with the named backend.
+Usage:
+    Set TDA_RENDER_BACKEND=texture to play with the texture backend. Run this module directly
+    to compare both backends on the playing state:
+        python render_backend.py [frames] [enemies]
+"""
+
+import os
+import weakref
+import pygame
+from constants import *
+from startup import init_display
+
+RENDER_BACKENDS = ('surface', 'texture')
+
+
+class SurfaceBackend:
+    thread_safe = True
+
+    def __init__(self):
+        self.screen = init_display()
+
+    def draw(self, draw_list, dirty):
+        """Blit the batch onto the display surface."""
+        self.screen.blits(draw_list, False)
+
+    def present(self):
+        """Flip the display surface."""
+        pygame.display.flip()
+
+
+class TextureBackend:
+    thread_safe = False  # An SDL renderer may only be used from the thread that created it
+
+    def __init__(self):
+        from pygame._sdl2.video import Window, Renderer, Texture
+        self.Texture = Texture
+        pygame.display.init()
+        self.window = Window("Top-Down Adventure", size=(WIDTH, HEIGHT))
+        self.renderer = Renderer(self.window)
+        # Textures die with their surface, so invalidated cached layers free theirs
+        self.textures = weakref.WeakKeyDictionary()
+        self.uploads = 0
+
+    def texture(self, surface):
+        """Return the texture of a surface, uploading it the first time it is drawn."""
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = self.Texture.from_surface(self.renderer, surface)
+            self.textures[surface] = texture
+            self.uploads += 1
+        return texture
+
+    def draw(self, draw_list, dirty):
+        """Re-upload the redrawn surfaces, then copy every texture of the batch."""
+        textures = self.textures
+        for surface in dirty:
+            texture = textures.get(surface)
+            if texture is not None:
+                texture.update(surface)
+                self.uploads += 1
+        self.renderer.clear()
+        texture_of = self.texture
+        get = textures.get
+        for surface, position in draw_list:
+            (get(surface) or texture_of(surface)).draw(None, position)
+
+    def present(self):
+        """Show the rendered frame."""
+        self.renderer.present()
+
+
+def create_backend(name=None):
+    """Open the game window with the named backend, TDA_RENDER_BACKEND, or the surface backend."""
+    name = name or os.environ.get('TDA_RENDER_BACKEND') or 'surface'
+    if name == 'texture':
+        return TextureBackend()
+    if name != 'surface':
+        print(f"Unknown render backend {name!r}, expected one of {', '.join(RENDER_BACKENDS)}")
+    return SurfaceBackend()
+
+
+if __name__ == "__main__":
+    # Frame cost of the playing state with each backend, simulation excluded.
+    # With SDL_VIDEODRIVER=dummy both present into memory, which measures the software paths.
+    import random
+    import sys
+    import time
+    from game_manager import GameManager
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    enemy_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"video driver {os.environ.get('SDL_VIDEODRIVER') or 'default'}, {frames} frames, "
+          f"{enemy_count} enemies")
+    for name in RENDER_BACKENDS:
+        random.seed(1)
+        game = GameManager(render_backend=name)
+        game.state = 'playing'
+        game.player.health = game.player.max_health = 10 ** 9
+        for _ in range(enemy_count):
+            game.spawn_enemy()
+        snapshots = []
+        for _ in range(frames):
+            game.simulate()
+            snapshots.append(game.snapshot())
+        sprites = sum(len(s.pickups) + len(s.actors) + len(s.projectiles) for s in snapshots) / frames
+        start = time.perf_counter()
+        for snapshot in snapshots:
+            game.present(snapshot)
+        elapsed = time.perf_counter() - start
+        uploads = getattr(game.render_backend, 'uploads', None)
+        detail = f", {uploads} texture uploads" if uploads is not None else ""
+        print(f"  {name:<8}{elapsed * 1000 / frames:7.3f} ms/frame{frames / elapsed:9.0f} frames/s"
+              f"  ({sprites:.0f} sprites per frame{detail})")
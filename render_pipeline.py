@@ -0,0 +1,156 @@
+"""
+This module defines the render pipeline used by the GameManager to draw a frame.
+A frame is built from ordered layers (static world, pickups, actors, projectiles, HUD,
+overlays and menus). Each game state lists the layers it shows. Layers do not draw onto
+the screen themselves; they append (surface, position) pairs to a shared draw list, which
+the pipeline submits as a single batch to a render backend (see render_backend), together
+with the cached surfaces that were redrawn. Presenting the frame is left to the caller, so
+there is exactly one present per frame.
+Layers never read the live game objects. The simulation captures everything a frame shows in
+an immutable RenderSnapshot, so a frame can be rendered on another thread while the next
+tick is being simulated.
+Classes:
+    RenderSnapshot: Immutable copy of everything one frame shows.
+    RenderLayer: A layer that appends fresh blits to the draw list every frame.
+    SpriteLayer: A layer that blits one of the snapshot's sprite lists through the sprite atlas.
+    CachedLayer: A layer that keeps its previous output and only redraws when its key changes.
+    RenderPipeline: Holds the layers and the per-state compositions.
+RenderPipeline Methods:
+    add_layer(name, layer): Registers a layer under a name.
+    compose(state, layer_names): Sets the ordered list of layers shown in a state.
+    render(backend, snapshot): Draws the layers of the snapshot's state through the backend in one batch.
+    invalidate(): Forces every cached layer to redraw on the next frame.
+"""
+
+import pygame
+from constants import *
+
+
+class RenderSnapshot:
+    """Everything one frame shows, captured at the end of a simulation tick.
+
+    Sprite lists are tuples of (sprite_key, x, y) resolved through the SpriteAtlas at render
+    time; particles is the copy returned by ParticleSystem.snapshot, or None; fog is the frozenset
+    of cells the players see in fog-of-war mode, or None; hud is the tuple returned by
+    HUDManager.get_hud_key. Nothing in a snapshot is modified after it is built.
+    """
+    __slots__ = ('frame', 'state', 'world_version', 'world', 'pickups', 'actors', 'projectiles',
+                 'particles', 'fog', 'hud', 'score', 'enemies_defeated')
+
+    def __init__(self, frame, state, world_version, world, pickups, actors, projectiles,
+                 particles, fog, hud, score, enemies_defeated):
+        self.frame = frame
+        self.state = state
+        self.world_version = world_version
+        self.world = world  # Tuple of obstacles, which never change once placed
+        self.pickups = pickups
+        self.actors = actors
+        self.projectiles = projectiles
+        self.particles = particles
+        self.fog = fog
+        self.hud = hud
+        self.score = score
+        self.enemies_defeated = enemies_defeated
+
+
+class RenderLayer:
+    redrawn = False  # Set by cached layers when their surface changed this frame
+
+    def __init__(self, draw):
+        self.draw = draw  # Callable that appends the layer's blits to a draw list
+
+    def render(self, draw_list, snapshot):
+        """Append the layer's blits to the draw list."""
+        self.draw(draw_list, snapshot)
+
+    def invalidate(self):
+        """Uncached layers have nothing to invalidate."""
+        pass
+
+
+class SpriteLayer(RenderLayer):
+    """A layer that blits the sprites of one snapshot field, such as 'actors'."""
+
+    def __init__(self, atlas, field):
+        self.atlas = atlas
+        self.field = field
+
+    def render(self, draw_list, snapshot):
+        """Append a blit for every (sprite_key, x, y) in the snapshot field."""
+        get = self.atlas.get
+        append = draw_list.append
+        for key, x, y in getattr(snapshot, self.field):
+            append((get(key), (x, y)))
+
+
+class CachedLayer(RenderLayer):
+    """A layer drawn into its own surface and reused while key(snapshot) returns the same value.
+
+    Here draw is called with the layer's surface and the snapshot rather than a draw list.
+    Opaque layers must fill their whole surface; the others are drawn onto a transparent one.
+    """
+
+    def __init__(self, draw, key, size=(WIDTH, HEIGHT), opaque=False):
+        super().__init__(draw)
+        self.key = key
+        self.size = size
+        self.opaque = opaque
+        self.surface = None
+        self.last_key = None
+        self.redraws = 0
+        self.reuses = 0
+
+    def render(self, draw_list, snapshot):
+        """Redraw the cached surface if the layer's inputs changed, then queue its blit."""
+        key = self.key(snapshot)
+        if self.surface is None or key != self.last_key:
+            if self.surface is None:
+                flags = 0 if self.opaque else pygame.SRCALPHA
+                self.surface = pygame.Surface(self.size, flags)
+            if not self.opaque:
+                self.surface.fill((0, 0, 0, 0))
+            self.draw(self.surface, snapshot)
+            self.last_key = key
+            self.redrawn = True
+            self.redraws += 1
+        else:
+            self.reuses += 1
+        draw_list.append((self.surface, (0, 0)))
+
+    def invalidate(self):
+        """Force a redraw on the next render."""
+        self.surface = None
+
+
+class RenderPipeline:
+    def __init__(self):
+        self.layers = {}
+        self.compositions = {}
+        self.draw_list = []  # Reused every frame
+        self.dirty = []  # Cached surfaces redrawn this frame
+
+    def add_layer(self, name, layer):
+        """Register a layer under a name."""
+        self.layers[name] = layer
+
+    def compose(self, state, layer_names):
+        """Set the layers shown in a state, from back to front."""
+        self.compositions[state] = [self.layers[name] for name in layer_names]
+
+    def render(self, backend, snapshot):
+        """Draw the layers of the snapshot's state through the render backend in a single batch."""
+        draw_list = self.draw_list
+        draw_list.clear()
+        dirty = self.dirty
+        dirty.clear()
+        for layer in self.compositions.get(snapshot.state, ()):
+            layer.render(draw_list, snapshot)
+            if layer.redrawn:
+                layer.redrawn = False
+                dirty.append(layer.surface)
+        backend.draw(draw_list, dirty)
+
+    def invalidate(self):
+        """Force every cached layer to redraw on the next frame."""
+        for layer in self.layers.values():
+            layer.invalidate()
@@ -0,0 +1,155 @@
+"""
+This module defines the RenderThread, which renders and presents frames on its own thread so
+that drawing frame N overlaps the simulation of tick N + 1.
+The simulation publishes an immutable RenderSnapshot at the end of each tick by storing a
+reference to it and setting an Event; it never waits for the render thread. The render
+thread always picks up the newest snapshot, so at most three snapshots are alive at once:
+the one being rendered, the one published next, and the one the simulation is building.
+A snapshot that is replaced before it was picked up is dropped, never half-drawn.
+Rendering only overlaps the simulation while one of them runs outside the GIL, which is
+always the case on free-threaded CPython builds, and partly the case elsewhere because pygame
+releases the GIL in its blit, fill and flip paths. The thread is therefore only used on
+free-threaded builds unless forced, and the game stays serial otherwise.
+Classes:
+    RenderThread: Renders the latest published snapshot on a background thread.
+RenderThread Methods:
+    __init__(present): Creates the thread around a callable that renders and presents a snapshot.
+    start(): Starts the thread.
+    submit(snapshot): Publishes a snapshot without blocking.
+    sync(): Waits until the last published snapshot has been presented.
+    stop(): Presents nothing more and joins the thread.
+Functions:
+    render_thread_enabled(): Returns whether the game should render on a separate thread.
+Usage:
+    Set TDA_RENDER_THREAD=1 to force the render thread on, or TDA_RENDER_THREAD=0 to force
+    serial rendering. Run this module directly to compare the throughput of both modes:
+        python render_thread.py [frames] [enemies]
+"""
+
+import os
+import sys
+import threading
+
+
+def render_thread_enabled():
+    """Return whether frames should be rendered on a separate thread."""
+    forced = os.environ.get('TDA_RENDER_THREAD')
+    if forced is not None:
+        return forced not in ('', '0')
+    if sys.platform == 'darwin':
+        return False  # The window may only be touched from the main thread there
+    # Without free threading the simulation and rendering mostly take turns on the GIL
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+class RenderThread:
+    def __init__(self, present):
+        self.present = present  # Callable that renders a snapshot and presents the frame
+        self.latest = None  # Most recently published snapshot
+        self.last_presented = None
+        self.error = None  # Exception that stopped the thread, re-raised by submit
+        self.pending = threading.Event()  # Set when a new snapshot has been published
+        self.presented = threading.Event()  # Set after each presented frame
+        self.running = False
+        self.frames = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.loop, name='render', daemon=True)
+
+    def start(self):
+        """Start the render thread."""
+        self.running = True
+        self.thread.start()
+
+    def submit(self, snapshot):
+        """Publish a snapshot for rendering. Never blocks the simulation."""
+        if self.error is not None:
+            raise self.error
+        self.latest = snapshot  # A single reference store, so the render thread sees all or nothing
+        self.pending.set()
+
+    def sync(self):
+        """Wait until the last published snapshot has been presented.
+
+        Only the thread that submits snapshots may call this.
+        """
+        latest = self.latest
+        while self.running and latest is not None and self.last_presented is not latest:
+            self.presented.wait(0.1)
+            self.presented.clear()
+
+    def stop(self):
+        """Stop the render thread once its current frame is done."""
+        self.running = False
+        self.pending.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def loop(self):
+        """Render the newest published snapshot each time one arrives."""
+        last = None
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+            if not self.running:
+                break
+            snapshot = self.latest
+            if snapshot is None or snapshot is last:
+                continue
+            if last is not None and snapshot.frame > last.frame + 1:
+                self.dropped += snapshot.frame - last.frame - 1
+            try:
+                self.present(snapshot)
+            except Exception as error:
+                self.error = error
+                self.running = False
+                self.presented.set()
+                return
+            last = snapshot
+            self.frames += 1
+            self.last_presented = snapshot
+            self.presented.set()
+
+
+if __name__ == "__main__":
+    # Throughput of the playing state with an uncapped frame rate, serial versus threaded.
+    # The threaded run presents every frame: tick N + 1 is simulated while frame N renders,
+    # and is only published once frame N has been presented.
+    import time
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import random
+    from game_manager import GameManager
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    enemy_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}, "
+          f"{frames} frames, {enemy_count} enemies")
+
+    for threaded in (False, True):
+        random.seed(1)
+        game = GameManager()
+        game.state = 'playing'
+        game.player.health = game.player.max_health = 10 ** 9  # Keep the benchmark in the playing state
+        for _ in range(enemy_count):
+            game.spawn_enemy()
+        renderer = RenderThread(game.present) if threaded else None
+        if renderer:
+            renderer.start()
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.update([])
+            game.state = 'playing'
+            snapshot = game.snapshot()
+            if renderer:
+                renderer.sync()
+                renderer.submit(snapshot)
+            else:
+                game.present(snapshot)
+        if renderer:
+            renderer.sync()
+            renderer.stop()
+        elapsed = time.perf_counter() - start
+        mode = 'threaded' if threaded else 'serial'
+        detail = f", {renderer.frames} presented, {renderer.dropped} dropped" if renderer else ""
+        print(f"  {mode:<9}{frames / elapsed:8.1f} ticks/s{detail}")
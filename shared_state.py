@@ -0,0 +1,466 @@
+"""
+This module publishes the live game state in a shared memory block, for external tools such as
+stream overlays, bots and debug visualizers, and provides the reader those tools use.
+The block has a fixed layout, so a reader in any language can find every field:
+    - PREFIX: magic, layout version, the capacity of each array, the PID of the game that
+      publishes the block, and the sequence counter.
+    - STATE_HEADER: tick, enemies defeated, game state, whether the boss is out, and how many
+      players, enemies, projectiles and pickups are in use.
+    - The player columns (PLAYER_COLUMNS), then the enemy, projectile and pickup columns. Each
+      column holds one field of every entity of its kind, is sized for the kind's capacity and
+      starts on an 8-byte boundary. Only the first count entries of a column are valid.
+Numbers are in the machine's byte order. Positions are entity centers in pixels.
+Writes are guarded by a seqlock: the writer makes the sequence odd, copies the new state in,
+then makes it even again. A reader copies the block between two reads of the sequence and keeps
+the copy only if both are the same even number, so it never sees half of a tick. The writer
+never waits for readers.
+The columns are typed views into a staging image of the block, allocated once, which publishing
+copies into the block in a single memcpy rather than packing every entity. Enemies, the only
+entities there are many of, are written into their columns in place when they move, take damage,
+heal, or are stunned or slowed; a removal moves the last enemy into the freed entry. The few
+players, projectiles and pickups are written into their columns at each publish.
+Classes:
+    Layout: Offsets of the columns in a block with given capacities.
+    Columns: Typed views holding one kind of entity in the staging image, one view per field.
+    EnemyColumns: Columns the enemies write themselves into when their state changes.
+    SharedStatePublisher: Creates the block and publishes the game state into it.
+    SharedStateReader: Attaches to a block and reads consistent copies of it.
+    WorldState: One consistent copy of the game state.
+EnemyColumns Methods:
+    write(enemy): Writes an enemy's state into its entry, adding the enemy if there is room.
+    remove(enemy): Frees an enemy's entry.
+    clear(): Frees every entry.
+SharedStatePublisher Methods:
+    __init__(name=SHARED_STATE_NAME): Creates the block, replacing one left behind by a game that
+        is no longer running. Raises FileExistsError when a running game publishes the block.
+    subscribe(event_bus): Frees the entries of enemies that die on EnemyKilled.
+    publish(game): Writes the state of a GameManager into the block.
+    clear(): Frees every entry, for a new game.
+    close(): Removes the block.
+SharedStateReader Methods:
+    __init__(name=SHARED_STATE_NAME): Attaches to the block; raises FileNotFoundError when no game publishes it.
+    read(): Returns the latest WorldState.
+    poll(): Returns the latest WorldState if it is newer than the last one read, otherwise None.
+    close(): Detaches from the block.
+WorldState Attributes:
+    sequence, tick, state, enemies_defeated, boss_spawned: Header fields.
+    players (list): A dict per player, with the PLAYER_FIELDS keys.
+    enemies, projectiles, pickups (list): A tuple per entity, with the ENEMY_FIELDS,
+        PROJECTILE_FIELDS and PICKUP_FIELDS fields.
+Functions:
+    shared_state_name(): Returns the name of the block to publish, or None if publishing is off.
+Usage:
+    Set TDA_SHARED_STATE=1 to publish the state under SHARED_STATE_NAME, or to a name of your
+    own. Run this module directly to print the state of a running game, or to measure publishing:
+        python shared_state.py [name]
+        python shared_state.py --benchmark [enemies] [ticks]
+"""
+
+import atexit
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from constants import *
+from events import EnemyKilled
+
+MAGIC = b'TDAS'
+VERSION = 2
+PREFIX = struct.Struct('<4sHHHHH2xI4xQ')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = PREFIX.size - SEQUENCE.size
+STATE_HEADER = struct.Struct('<IIBBBxHHH2x')
+# (field, struct format) of each column: 'f' float32, 'I' uint32, 'H' uint16, 'B' uint8
+PLAYER_COLUMNS = (('x', 'f'), ('y', 'f'), ('health', 'f'), ('max_health', 'f'), ('mana', 'f'),
+                  ('max_mana', 'f'), ('experience', 'f'), ('next_level_exp', 'f'), ('score', 'I'),
+                  ('level', 'H'), ('spell', 'B'), ('direction', 'B'), ('flags', 'B'))
+ENEMY_COLUMNS = (('x', 'f'), ('y', 'f'), ('health', 'f'), ('max_health', 'f'), ('archetype', 'B'),
+                 ('flags', 'B'))
+PROJECTILE_COLUMNS = (('x', 'f'), ('y', 'f'), ('vx', 'f'), ('vy', 'f'), ('target_type', 'B'), ('spell', 'B'))
+PICKUP_COLUMNS = (('x', 'f'), ('y', 'f'), ('kind', 'B'))
+KIND_COLUMNS = (PLAYER_COLUMNS, ENEMY_COLUMNS, PROJECTILE_COLUMNS, PICKUP_COLUMNS)
+PLAYER_FIELDS = tuple(field for field, _ in PLAYER_COLUMNS)
+ENEMY_FIELDS = tuple(field for field, _ in ENEMY_COLUMNS)
+PROJECTILE_FIELDS = tuple(field for field, _ in PROJECTILE_COLUMNS)
+PICKUP_FIELDS = tuple(field for field, _ in PICKUP_COLUMNS)
+
+STATES = ('title', 'playing', 'paused', 'game_over', 'level_up', 'help')
+STATE_INDEX = {name: index for index, name in enumerate(STATES)}
+DIRECTIONS = ('up', 'down', 'left', 'right')
+DIRECTION_INDEX = {name: index for index, name in enumerate(DIRECTIONS)}
+SPELL_INDEX = {name: index for index, name in enumerate(MAGIC_SPELLS)}
+NO_SPELL = 255
+TARGET_TYPES = ('enemies', 'player')
+PICKUP_KINDS = ('coin', 'health', 'mana')
+
+# Player flags
+ATTACKING = 1
+SPEED_POWER_UP = 2
+DAMAGE_POWER_UP = 4
+SHIELD_POWER_UP = 8
+# Enemy flags
+STUNNED = 1
+SLOWED = 2
+
+
+def shared_state_name():
+    """Return the name to publish the game state under, or None when TDA_SHARED_STATE is off."""
+    name = os.environ.get('TDA_SHARED_STATE', '')
+    if name in ('', '0'):
+        return None
+    return SHARED_STATE_NAME if name == '1' else name
+
+
+def process_running(pid):
+    """Return whether a process with this PID is running."""
+    if os.name == 'nt':
+        # Windows removes a block with its last handle, so an existing one always has a live owner
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Running, under another user
+    return True
+
+
+class Layout:
+    """Offsets of the columns in a block with the given capacities."""
+
+    def __init__(self, players, enemies, projectiles, pickups):
+        self.capacities = (players, enemies, projectiles, pickups)
+        self.columns = []  # Per kind, the offset of each of its columns
+        offset = PREFIX.size + STATE_HEADER.size
+        for columns, capacity in zip(KIND_COLUMNS, self.capacities):
+            offsets = []
+            for _, code in columns:
+                offset = (offset + 7) & ~7
+                offsets.append(offset)
+                offset += capacity * struct.calcsize(code)
+            self.columns.append(offsets)
+        self.size = offset
+
+
+class Columns:
+    """One kind of entity in the staging image: a typed view per field, one entry per entity."""
+
+    def __init__(self, columns, capacity, image, offsets):
+        self.capacity = capacity
+        self.arrays = [image[offset:offset + capacity * struct.calcsize(code)].cast(code)
+                       for (_, code), offset in zip(columns, offsets)]
+        self.count = 0
+
+    def release(self):
+        for column in self.arrays:
+            column.release()
+
+
+class EnemyColumns(Columns):
+    """Enemy columns, written in place by the enemies whenever their state changes."""
+
+    def __init__(self, capacity, image, offsets):
+        super().__init__(ENEMY_COLUMNS, capacity, image, offsets)
+        self.slots = {}  # Enemy -> its entry
+        self.entities = []  # Enemy in each entry
+
+    def write(self, enemy):
+        """Write the state of enemy into its entry, adding it if it has none and there is room."""
+        slot = self.slots.get(enemy)
+        if slot is None:
+            if self.count == self.capacity:
+                return  # Published once an entry frees up and the enemy changes again
+            slot = self.slots[enemy] = self.count
+            self.entities.append(enemy)
+            self.count += 1
+        xs, ys, health, max_health, archetype, flags = self.arrays
+        rect = enemy.rect
+        xs[slot] = rect.centerx
+        ys[slot] = rect.centery
+        health[slot] = enemy.health
+        max_health[slot] = enemy.max_health
+        archetype[slot] = enemy.archetype_id
+        flags[slot] = (STUNNED if enemy.stunned else 0) | (SLOWED if enemy.speed < enemy.archetype.speed else 0)
+
+    def remove(self, enemy):
+        """Free the entry of enemy; the last entry moves into it."""
+        slot = self.slots.pop(enemy, None)
+        if slot is None:
+            return
+        last = self.count - 1
+        if slot != last:
+            for column in self.arrays:
+                column[slot] = column[last]
+            moved = self.entities[slot] = self.entities[last]
+            self.slots[moved] = slot
+        self.entities.pop()
+        self.count = last
+
+    def clear(self):
+        """Free every entry."""
+        self.slots.clear()
+        self.entities.clear()
+        self.count = 0
+
+
+class SharedStatePublisher:
+    def __init__(self, name=SHARED_STATE_NAME):
+        self.layout = layout = Layout(COOP_MAX_PLAYERS, SHARED_STATE_MAX_ENEMIES,
+                                      SHARED_STATE_MAX_PROJECTILES, SHARED_STATE_MAX_PICKUPS)
+        try:
+            self.memory = shared_memory.SharedMemory(name, create=True, size=layout.size)
+        except FileExistsError:
+            existing = shared_memory.SharedMemory(name)
+            magic, version, *_, pid, _ = PREFIX.unpack_from(existing.buf, 0)
+            if magic == MAGIC and version == VERSION and pid and process_running(pid):
+                existing.close()
+                resource_tracker.unregister(existing._name, 'shared_memory')
+                raise FileExistsError(f"{name} is published by a running game (PID {pid})")
+            # Left behind by a game that did not exit cleanly
+            existing.close()
+            existing.unlink()
+            self.memory = shared_memory.SharedMemory(name, create=True, size=layout.size)
+        self.name = name
+        self.sequence = 0
+        # The next state, copied into the block in one go
+        self.image = memoryview(bytearray(layout.size))
+        capacities, offsets = layout.capacities, layout.columns
+        self.players = Columns(PLAYER_COLUMNS, capacities[0], self.image, offsets[0])
+        self.enemies = EnemyColumns(capacities[1], self.image, offsets[1])
+        self.projectiles = Columns(PROJECTILE_COLUMNS, capacities[2], self.image, offsets[2])
+        self.pickups = Columns(PICKUP_COLUMNS, capacities[3], self.image, offsets[3])
+        self.kinds = (self.players, self.enemies, self.projectiles, self.pickups)
+        PREFIX.pack_into(self.memory.buf, 0, MAGIC, VERSION, *layout.capacities, os.getpid(), 0)
+        self.dropped = 0  # Entities left out because an array was full
+        atexit.register(self.close)
+
+    def subscribe(self, event_bus):
+        """Free the entries of the enemies that die."""
+        event_bus.subscribe(EnemyKilled, self.on_enemy_killed)
+
+    def on_enemy_killed(self, event):
+        self.enemies.remove(event.enemy)
+
+    def publish(self, game):
+        """Write the state of game into the block."""
+        layout = self.layout
+
+        players = self.players
+        xs, ys, health, max_health, mana, max_mana, experience, next_level_exp, score, level, spell, direction, \
+            flags = players.arrays
+        count = 0
+        for player in game.players[:players.capacity]:
+            power_ups = player.power_ups
+            xs[count], ys[count] = player.rect.center
+            health[count] = player.health
+            max_health[count] = player.max_health
+            mana[count] = player.mana
+            max_mana[count] = player.max_mana
+            experience[count] = player.experience
+            next_level_exp[count] = player.next_level_exp
+            score[count] = min(int(player.score), 0xFFFFFFFF)
+            level[count] = player.level
+            spell[count] = player.current_spell_index
+            direction[count] = DIRECTION_INDEX[player.direction]
+            flags[count] = ((ATTACKING if player.attacking else 0) | (SPEED_POWER_UP if power_ups['speed'] else 0)
+                            | (DAMAGE_POWER_UP if power_ups['damage'] else 0)
+                            | (SHIELD_POWER_UP if power_ups['shield'] else 0))
+            count += 1
+        players.count = count
+
+        projectiles = self.projectiles
+        xs, ys, vxs, vys, target_types, spells = projectiles.arrays
+        count = 0
+        for projectile in game.projectiles[:projectiles.capacity]:
+            speed = projectile.speed
+            xs[count] = projectile.x
+            ys[count] = projectile.y
+            vxs[count] = projectile.dx * speed
+            vys[count] = projectile.dy * speed
+            target_types[count] = projectile.target_type != 'enemies'
+            spells[count] = SPELL_INDEX.get(projectile.spell, NO_SPELL)
+            count += 1
+        projectiles.count = count
+
+        pickups = self.pickups
+        xs, ys, kinds = pickups.arrays
+        count = 0
+        for coin in game.coins[:pickups.capacity]:
+            xs[count], ys[count] = coin.rect.center
+            kinds[count] = 0
+            count += 1
+        for potion in game.potions[:pickups.capacity - count]:
+            xs[count], ys[count] = potion.rect.center
+            kinds[count] = PICKUP_KINDS.index(potion.potion_type)
+            count += 1
+        pickups.count = count
+
+        # The enemy columns are already up to date
+        enemy_count = self.enemies.count
+        self.dropped += (len(game.players) - players.count + len(game.enemies) - enemy_count
+                         + len(game.projectiles) - projectiles.count
+                         + len(game.coins) + len(game.potions) - pickups.count)
+        STATE_HEADER.pack_into(self.image, PREFIX.size, game.timers.now, game.enemies_defeated,
+                               STATE_INDEX.get(game.state, 255), game.boss_spawned, players.count,
+                               enemy_count, projectiles.count, pickups.count)
+
+        # Seqlock: readers discard any copy taken while the sequence is odd or has changed
+        buf = self.memory.buf
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+        buf[PREFIX.size:layout.size] = self.image[PREFIX.size:]
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+
+    def clear(self):
+        """Free every entry, for a new game."""
+        self.enemies.clear()
+
+    def close(self):
+        """Remove the block. Readers still attached keep their mapping of it."""
+        if self.memory is not None:
+            for columns in self.kinds:
+                columns.release()
+            self.image.release()
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+            atexit.unregister(self.close)
+
+
+class WorldState:
+    __slots__ = ('sequence', 'tick', 'state', 'enemies_defeated', 'boss_spawned',
+                 'players', 'enemies', 'projectiles', 'pickups')
+
+    def __init__(self, sequence, tick, state, enemies_defeated, boss_spawned, players, enemies, projectiles,
+                 pickups):
+        self.sequence = sequence
+        self.tick = tick
+        self.state = state
+        self.enemies_defeated = enemies_defeated
+        self.boss_spawned = boss_spawned
+        self.players = players
+        self.enemies = enemies
+        self.projectiles = projectiles
+        self.pickups = pickups
+
+
+class SharedStateReader:
+    def __init__(self, name=SHARED_STATE_NAME):
+        self.memory = shared_memory.SharedMemory(name)
+        # Only the game may remove the block; the tracker would remove it when this reader exits
+        resource_tracker.unregister(self.memory._name, 'shared_memory')
+        magic, version, *capacities, _, _ = PREFIX.unpack_from(self.memory.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{name} is not a version {VERSION} game state block")
+        self.layout = Layout(*capacities)
+        self.sequence = 0  # Sequence of the last state read
+
+    def read(self):
+        """Return a consistent copy of the latest state, retrying while the game writes it."""
+        buf = self.memory.buf
+        size = self.layout.size
+        while True:
+            (before,) = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)
+            if before & 1:
+                time.sleep(0)  # The game is writing; let it finish
+                continue
+            data = bytes(buf[:size])
+            (after,) = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)
+            if before == after:
+                self.sequence = before
+                return self.parse(before, data)
+
+    def poll(self):
+        """Return the latest state if the game published a newer one since the last read, otherwise None."""
+        (sequence,) = SEQUENCE.unpack_from(self.memory.buf, SEQUENCE_OFFSET)
+        if sequence == self.sequence:
+            return None
+        return self.read()
+
+    def parse(self, sequence, data):
+        layout = self.layout
+        (tick, enemies_defeated, state, boss_spawned, *counts) = STATE_HEADER.unpack_from(data, PREFIX.size)
+        kinds = []
+        for columns, offsets, count in zip(KIND_COLUMNS, layout.columns, counts):
+            arrays = []
+            for (_, code), offset in zip(columns, offsets):
+                arrays.append(memoryview(data)[offset:offset + count * struct.calcsize(code)].cast(code))
+            kinds.append(list(zip(*arrays)))
+        players, enemies, projectiles, pickups = kinds
+        players = [dict(zip(PLAYER_FIELDS, fields)) for fields in players]
+        return WorldState(sequence, tick, STATES[state] if state < len(STATES) else None, enemies_defeated,
+                          bool(boss_spawned), players, enemies, projectiles, pickups)
+
+    def close(self):
+        """Detach from the block."""
+        self.memory.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        # Cost of publishing a tick of a headless game, against the cost of the tick itself.
+        # The enemies' in-place writes happen during the tick and are counted in it.
+        import random
+        from game_manager import GameManager
+
+        enemy_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+        ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 600
+        random.seed(1)
+        os.environ['TDA_SHARED_STATE'] = f'{SHARED_STATE_NAME}_benchmark_{os.getpid()}'
+        game = GameManager(headless=True)
+        game.state = 'playing'
+        game.player.health = game.player.max_health = 10 ** 9
+        for _ in range(enemy_count):
+            game.spawn_enemy()
+        # Published here rather than at the end of simulate(), to time it on its own
+        publisher = game.shared_state
+        game.shared_state = None
+        reader = SharedStateReader(publisher.name)
+        # The reader is in the publisher's process here, so give the block back to the tracker it left
+        resource_tracker.register(publisher.memory._name, 'shared_memory')
+        simulate = publish = read = 0.0
+        for tick in range(ticks):
+            if tick % 10 == 0:
+                game.player.cast_magic(game.projectiles, game.enemies)
+            start = time.perf_counter()
+            game.simulate()
+            middle = time.perf_counter()
+            publisher.publish(game)
+            end = time.perf_counter()
+            state = reader.read()
+            read += time.perf_counter() - end
+            simulate += middle - start
+            publish += end - middle
+        print(f"{len(state.enemies)} enemies, {len(state.projectiles)} projectiles, "
+              f"{publisher.layout.size} byte block")
+        print(f"  simulate {simulate * 1e6 / ticks:8.1f} us/tick")
+        print(f"  publish  {publish * 1e6 / ticks:8.1f} us/tick")
+        print(f"  read     {read * 1e6 / ticks:8.1f} us/tick (reader process side)")
+        published = sorted((x, y, health) for x, y, health, *_ in state.enemies)
+        live = sorted((enemy.rect.centerx, enemy.rect.centery, float(enemy.health)) for enemy in game.enemies)
+        print(f"  published enemies {'match' if published == live else 'DO NOT MATCH'} the game")
+        reader.close()
+        publisher.close()
+    else:
+        # Print a summary of the published state once a second
+        reader = SharedStateReader(sys.argv[1] if len(sys.argv) > 1 else SHARED_STATE_NAME)
+        try:
+            while True:
+                state = reader.read()
+                line = (f"tick {state.tick:7} {state.state or '?':<9} enemies {len(state.enemies):4} "
+                        f"projectiles {len(state.projectiles):4} pickups {len(state.pickups):2} "
+                        f"defeated {state.enemies_defeated:4}")
+                for index, player in enumerate(state.players):
+                    line += (f" | P{index + 1} ({player['x']:.0f}, {player['y']:.0f}) "
+                             f"hp {player['health']:.0f}/{player['max_health']:.0f} "
+                             f"lv {player['level']} score {player['score']}")
+                print(line)
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            reader.close()
@@ -0,0 +1,346 @@
+"""
+This module is the soak-test harness: it plays the game headlessly for a long time with a
+scripted player and fails if anything keeps growing.
+A ScriptedPlayer drives the player through its InputManager like a co-op client would: it chases
+and swings at enemies, charges and casts spells, cycling through them, and picks up potions that
+lie near. With no enemy within ENGAGE_RANGE it goes for the nearest coin, wherever it is, so it
+gains the experience to level up and the headless game raises a stat on every level-up; with
+nothing to do it waits where it is.
+As in the benchmarks the player cannot die, so a game lasts until the boss is beaten, after which
+no more enemies come:
+    - by default a new game then starts in place with GameManager.reset, so the restart path is
+      soaked too and a leak across games shows up as steady growth,
+    - with --no-reset the one game goes on for the whole run, for growth within a game, such as
+      the player's stats after many level-ups.
+With --mortal the player can die, and a lost game always starts a new one.
+The entity lists and the caches and queues of the subsystems are counted every COUNT_EVERY ticks
+and averaged over each interval, so a sample does not depend on the phase of the game at one tick.
+At the end of every interval the harness also samples:
+    - the resident set size of the process,
+    - the memory held by each source line, through tracemalloc,
+    - the mean time per tick of each subsystem, timed by wrapping the methods simulate() calls.
+After the run, a least-squares line is fitted to every series, leaving out the first
+WARMUP_SAMPLES samples while the caches fill. A series fails when the line rises by more than
+GROWTH_THRESHOLD of its starting value and by more than the series' absolute floor, so noise in
+small values does not fail the run. The report lists the failing series first, then the source
+lines whose allocations grew the most since the warm-up. An immortal run of at least
+MIN_LEVEL_UP_TICKS ticks also fails without a level-up, as the level-up path would have gone
+untested; a mortal player dies too soon to collect the coins for one.
+Classes:
+    ScriptedPlayer: Chooses the player's actions each tick.
+    SoakTest: Runs the game, samples it and reports the trends.
+SoakTest Methods:
+    __init__(ticks, interval=SAMPLE_INTERVAL, seed=1, trace=True, reset=True, mortal=False):
+        Sets up a headless game.
+    run(): Plays ticks ticks, counting every COUNT_EVERY ticks and sampling every interval ticks.
+    trends(): Returns (name, start, end, growth, failed) for every sampled series.
+    report(): Returns the report as text.
+    untested(): Returns True if an immortal run of MIN_LEVEL_UP_TICKS or more never leveled up.
+    failed(): Returns True if a series grows or the run is untested.
+Functions:
+    rss_bytes(): Returns the resident set size of the process.
+Usage:
+    Soak for a million ticks (about four and a half hours of play) and exit with status 1 on growth:
+        python soak_test.py [ticks] [--interval N] [--seed N] [--no-trace] [--no-reset] [--mortal]
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from constants import *
+from input_manager import MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN, ATTACK, MAGIC, NEXT_SPELL
+
+SAMPLE_INTERVAL = 10000  # Ticks between samples
+COUNT_EVERY = 100  # Ticks between counts, averaged over each interval
+WARMUP_SAMPLES = 2  # Samples left out of the trends while the caches fill
+PICKUP_RANGE = 200  # Distance within which the scripted player goes for a potion
+ENGAGE_RANGE = 150  # Distance within which the scripted player fights an enemy rather than fetch a coin
+MIN_LEVEL_UP_TICKS = 20000  # Immortal runs at least this long fail without a level-up
+GROWTH_THRESHOLD = 0.25  # Largest rise of a series over the run, relative to its start
+TOP_ALLOCATORS = 8  # Source lines listed in the report
+
+# Sampled counts: name -> function of the game
+COUNTERS = {
+    'enemies': lambda game: len(game.enemies),
+    'coins': lambda game: len(game.coins),
+    'potions': lambda game: len(game.potions),
+    'projectiles': lambda game: len(game.projectiles),
+    'obstacles': lambda game: len(game.obstacles),
+    'timers': lambda game: sum(len(slot) for level in game.timers.levels for slot in level)
+    + len(game.timers.overflow),
+    'event_queue': lambda game: len(game.event_bus.queue),
+    'event_handlers': lambda game: sum(len(handlers) for handlers in game.event_bus.handlers.values()),
+    'ai_scheduled': lambda game: sum(len(phase) for phases in game.ai_scheduler.buckets.values()
+                                     for phase in phases) + len(game.ai_scheduler.deferred),
+    'status_effects': lambda game: game.status_effects.count,
+    'line_of_sight_cache': lambda game: len(game.line_of_sight.cache),
+    'fog_cache': lambda game: len(game.fog_of_war.cache),
+    'gc_objects': lambda game: len(gc.get_objects()),
+}
+# Subsystems timed per tick: name -> (function returning the owner, method name)
+SUBSYSTEMS = {
+    'timers': (lambda game: game.timers, 'advance'),
+    'player': (lambda game: game.player, 'update'),
+    'events': (lambda game: game.event_bus, 'dispatch'),
+    'enemies': (lambda game: game, 'update_enemies'),
+    'projectiles': (lambda game: game, 'update_projectiles'),
+    'auras': (lambda game: game, 'resolve_auras'),
+    'status_effects': (lambda game: game.status_effects, 'update'),
+    'pickups': (lambda game: game, 'collect_pickups'),
+    'fog_of_war': (lambda game: game.fog_of_war, 'update'),
+}
+# Smallest rise that can fail a series, so noise in small values does not
+FLOORS = {'count': 5, 'rss': 16 * 1024 * 1024, 'ms': 0.05}
+
+
+def rss_bytes():
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current size where /proc is missing; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ScriptedPlayer:
+    def __init__(self, game, rng):
+        self.game = game
+        self.rng = rng
+        self.now = 0  # Ticks played; the timer wheel restarts with every game
+        self.wander = 0  # Actions held until this tick while getting unstuck
+        self.wander_actions = 0
+        self.last_position = None
+        self.still_ticks = 0
+        self.casting = 0  # Ticks left charging a spell
+
+    def actions(self):
+        """Return the bitmask of actions the player holds this tick."""
+        game = self.game
+        player = game.player
+        self.now = now = self.now + 1
+        x, y = player.rect.center
+        if player.rect.center == self.last_position:
+            self.still_ticks += 1
+        else:
+            self.still_ticks = 0
+        self.last_position = player.rect.center
+        if self.still_ticks > 30 and now >= self.wander and game.enemies:
+            # Stuck against a tree: walk somewhere else for a while
+            self.wander = now + self.rng.randint(20, 60)
+            self.wander_actions = self.rng.choice((MOVE_LEFT, MOVE_RIGHT, MOVE_UP, MOVE_DOWN)) | self.rng.choice(
+                (0, MOVE_UP, MOVE_DOWN))
+        if now < self.wander:
+            return self.wander_actions
+
+        def distance(sprite):
+            return abs(sprite.rect.centerx - x) + abs(sprite.rect.centery - y)
+
+        enemy = min(game.enemies, key=distance, default=None)
+        coin = min(game.coins, key=distance, default=None)
+        potion = min(game.potions, key=distance, default=None)
+        actions = 0
+        target = enemy.rect.center if enemy is not None else None
+        if coin is not None and (enemy is None or distance(enemy) > ENGAGE_RANGE):
+            target = coin.rect.center
+        if potion is not None and (distance(potion) < PICKUP_RANGE or player.health < player.max_health // 2):
+            target = potion.rect.center
+        if target is None:
+            return 0
+        dx = target[0] - x
+        dy = target[1] - y
+        if abs(dy) > 4:
+            actions |= MOVE_DOWN if dy > 0 else MOVE_UP
+        if abs(dx) > 4:
+            actions |= MOVE_RIGHT if dx > 0 else MOVE_LEFT
+        if abs(dx) > abs(dy) and abs(dy) < 20:
+            # Vertical moves set the facing last, so drop them to face a target beside the player
+            actions &= ~(MOVE_UP | MOVE_DOWN)
+        if enemy is not None and distance(enemy) < 100:
+            actions |= ATTACK
+        # Charge a spell for a few ticks, then release it to cast, cycling through the spells
+        if self.casting:
+            self.casting -= 1
+            actions |= MAGIC
+        elif enemy is not None and player.mana > 40 and now % 120 == 0:
+            self.casting = self.rng.randint(1, 15)
+            actions |= MAGIC | NEXT_SPELL
+        return actions
+
+
+class SoakTest:
+    def __init__(self, ticks, interval=SAMPLE_INTERVAL, seed=1, trace=True, reset=True, mortal=False):
+        from events import LevelUp
+        from game_manager import GameManager
+        random.seed(seed)
+        self.ticks = ticks
+        self.interval = interval
+        self.trace = trace
+        self.reset = reset
+        self.mortal = mortal
+        self.game = GameManager(headless=True)
+        self.game.state = 'playing'
+        self.bot = ScriptedPlayer(self.game, random.Random(seed))
+        self.counts = dict.fromkeys(COUNTERS, 0)  # Sums of the counts of the current interval
+        self.samples = []  # One dict of series name -> value per interval
+        self.snapshots = []  # tracemalloc snapshots: after the warm-up and at the end
+        self.games = 1
+        self.level_ups = 0
+        self.game.event_bus.subscribe(LevelUp, self.on_level_up)
+        self.elapsed = 0.0
+        self.times = {name: 0.0 for name in SUBSYSTEMS}
+        for name, (owner, method) in SUBSYSTEMS.items():
+            self.time_method(name, owner(self.game), method)
+
+    def time_method(self, name, owner, method):
+        """Replace owner.method with a wrapper adding its run time to the subsystem's total."""
+        function = getattr(owner, method)
+        times = self.times
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = function(*args)
+            times[name] += clock() - start
+            return result
+
+        setattr(owner, method, timed)
+
+    def on_level_up(self, event):
+        self.level_ups += 1
+
+    def start_game(self):
+        """Start a new game in place, with an immortal player unless the run is mortal."""
+        game = self.game
+        game.reset()
+        game.state = 'playing'
+        if not self.mortal:
+            game.player.health = game.player.max_health = 10 ** 9
+        self.games += 1
+
+    def run(self):
+        """Play the game for self.ticks ticks, sampling every self.interval ticks."""
+        game = self.game
+        inputs = game.input_manager
+        if not self.mortal:
+            game.player.health = game.player.max_health = 10 ** 9
+        if self.trace:
+            tracemalloc.start()
+        began = time.perf_counter()
+        for tick in range(1, self.ticks + 1):
+            inputs.apply_actions(self.bot.actions())
+            game.simulate()
+            if game.state == 'game_over' or (self.reset and game.boss_spawned and not game.enemies):
+                self.start_game()
+            if tick % COUNT_EVERY == 0:
+                self.count()
+            if tick % self.interval == 0:
+                self.sample()
+        self.elapsed = time.perf_counter() - began
+        if self.trace:
+            tracemalloc.stop()
+
+    def count(self):
+        """Add the current counts to the sums of the interval."""
+        game = self.game
+        counts = self.counts
+        for name, count in COUNTERS.items():
+            counts[name] += count(game)
+
+    def sample(self):
+        """Record the mean counts of the interval and the current value of the other series."""
+        counted = self.interval // COUNT_EVERY or 1
+        values = {name: total / counted for name, total in self.counts.items()}
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        values['rss'] = rss_bytes()
+        for name in SUBSYSTEMS:
+            values[f'{name}_ms'] = self.times[name] * 1000 / self.interval
+            self.times[name] = 0.0
+        self.samples.append(values)
+        if self.trace and len(self.samples) in (WARMUP_SAMPLES, self.ticks // self.interval):
+            # The samples themselves are left out
+            self.snapshots.append(tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))))
+        print(f"  tick {len(self.samples) * self.interval:>9}: {values['enemies']:6.1f} enemies "
+              f"{values['coins']:5.1f} coins {values['timers']:6.1f} timers  rss {values['rss'] / 2 ** 20:7.1f} MB  "
+              f"game {self.games}", flush=True)
+
+    def trends(self):
+        """Return (name, start, end, growth, failed) for every series, fitted after the warm-up."""
+        # Short runs keep the warm-up rather than fit a line to fewer than two samples
+        samples = self.samples[WARMUP_SAMPLES:] if len(self.samples) >= WARMUP_SAMPLES + 2 else self.samples
+        results = []
+        if len(samples) < 2:
+            return results
+        n = len(samples)
+        mean_x = (n - 1) / 2
+        spread = sum((i - mean_x) ** 2 for i in range(n))
+        for name in samples[0]:
+            values = [sample[name] for sample in samples]
+            mean_y = sum(values) / n
+            slope = sum((i - mean_x) * (value - mean_y) for i, value in enumerate(values)) / spread
+            start = mean_y - slope * mean_x
+            end = mean_y + slope * mean_x
+            growth = end - start
+            floor = FLOORS['rss'] if name == 'rss' else FLOORS['ms'] if name.endswith('_ms') else FLOORS['count']
+            failed = growth > floor and growth > GROWTH_THRESHOLD * abs(start)
+            results.append((name, start, end, growth, failed))
+        return results
+
+    def report(self):
+        """Return a compact report of the run, failing series first."""
+        trends = sorted(self.trends(), key=lambda trend: (not trend[4], trend[0]))
+        lines = [f"Soak test: {self.ticks} ticks in {self.elapsed:.0f} s ({self.ticks / max(self.elapsed, 1e-9):.0f} "
+                 f"ticks/s), {self.games} games, {self.level_ups} level-ups, {len(self.samples)} samples",
+                 f"{'series':<22}{'start':>12}{'end':>12}{'growth':>12}  verdict"]
+        for name, start, end, growth, failed in trends:
+            if name == 'rss':
+                start, end, growth = start / 2 ** 20, end / 2 ** 20, growth / 2 ** 20
+                name = 'rss_mb'
+            lines.append(f"{name:<22}{start:12.3f}{end:12.3f}{growth:+12.3f}  {'GROWING' if failed else 'ok'}")
+        if len(self.snapshots) == 2:
+            lines.append(f"Largest allocation growth since the warm-up (top {TOP_ALLOCATORS} source lines):")
+            for stat in self.snapshots[1].compare_to(self.snapshots[0], 'lineno')[:TOP_ALLOCATORS]:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8} blocks  "
+                             f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        failures = [trend[0] for trend in trends if trend[4]]
+        if failures:
+            lines.append(f"FAIL: growing {', '.join(failures)}")
+        if self.untested():
+            lines.append(f"FAIL: no level-up in {self.ticks} ticks")
+        if not failures and not self.untested():
+            lines.append("PASS: nothing grows")
+        return '\n'.join(lines)
+
+    def untested(self):
+        """Return True if a long immortal run never leveled up, leaving the level-up path untested."""
+        return not self.mortal and self.ticks >= MIN_LEVEL_UP_TICKS and self.level_ups == 0
+
+    def failed(self):
+        """Return True if a series grows or the level-up path went untested."""
+        return self.untested() or any(trend[4] for trend in self.trends())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless soak test with leak and drift detection.")
+    parser.add_argument('ticks', type=int, nargs='?', default=1000000)
+    parser.add_argument('--interval', type=int, default=SAMPLE_INTERVAL, help="ticks between samples")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-trace', action='store_true', help="skip tracemalloc, which slows the game down")
+    parser.add_argument('--no-reset', action='store_true', help="play one game for the whole run")
+    parser.add_argument('--mortal', action='store_true', help="let the player die, starting a new game")
+    args = parser.parse_args()
+
+    soak = SoakTest(args.ticks, args.interval, args.seed, trace=not args.no_trace, reset=not args.no_reset,
+                    mortal=args.mortal)
+    soak.run()
+    print(soak.report())
+    sys.exit(1 if soak.failed() else 0)
@@ -0,0 +1,92 @@
+"""
+This module defines the SpatialHash class, a uniform grid used for fast neighbor queries.
+Items are bucketed by the grid cell that contains their position, so a radius query only
+looks at the cells the radius overlaps instead of every item.
+Classes:
+    SpatialHash: A grid of buckets keyed by cell coordinates.
+SpatialHash Methods:
+    __init__(cell_size): Initializes an empty grid with the given cell size.
+    clear(): Removes all items.
+    insert(item, x, y): Adds an item at a position.
+    build(sprites): Clears the grid and inserts every sprite at its rect center.
+    query(x, y, radius, max_results=None, exclude=None): Returns items within a radius.
+    nearest(x, y, radius, exclude=None, predicate=None): Returns the closest item within a radius.
+"""
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def clear(self):
+        """Remove all items."""
+        self.cells.clear()
+        self.count = 0
+
+    def insert(self, item, x, y):
+        """Add an item at a position."""
+        key = (int(x) // self.cell_size, int(y) // self.cell_size)
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [(item, x, y)]
+        else:
+            bucket.append((item, x, y))
+        self.count += 1
+
+    def build(self, sprites):
+        """Clear the grid and insert every sprite at the center of its rect."""
+        self.cells.clear()
+        self.count = len(sprites)
+        cells = self.cells
+        size = self.cell_size
+        for sprite in sprites:
+            x, y = sprite.rect.center
+            key = (x // size, y // size)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [(sprite, x, y)]
+            else:
+                bucket.append((sprite, x, y))
+
+    def query(self, x, y, radius, max_results=None, exclude=None):
+        """Return (item, dx, dy, distance_sq) for items within radius of (x, y).
+
+        dx and dy point from (x, y) to the item. At most max_results items are returned;
+        the search stops as soon as that many are found.
+        """
+        size = self.cell_size
+        radius_sq = radius * radius
+        cells = self.cells
+        results = []
+        min_cx = int(x - radius) // size
+        max_cx = int(x + radius) // size
+        min_cy = int(y - radius) // size
+        max_cy = int(y + radius) // size
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    continue
+                for item, ix, iy in bucket:
+                    if item is exclude:
+                        continue
+                    dx = ix - x
+                    dy = iy - y
+                    distance_sq = dx * dx + dy * dy
+                    if distance_sq <= radius_sq:
+                        results.append((item, dx, dy, distance_sq))
+                        if max_results is not None and len(results) >= max_results:
+                            return results
+        return results
+
+    def nearest(self, x, y, radius, exclude=None, predicate=None):
+        """Return the closest item within radius of (x, y) that passes the predicate, or None."""
+        best = None
+        best_distance_sq = radius * radius
+        for item, dx, dy, distance_sq in self.query(x, y, radius, exclude=exclude):
+            if distance_sq <= best_distance_sq and (predicate is None or predicate(item)):
+                best = item
+                best_distance_sq = distance_sq
+        return best
@@ -0,0 +1,95 @@
+"""
+This module defines the SpriteAtlas, a cache of pre-rendered sprite surfaces.
+Every entity kind and color is rasterized once, so drawing an entity is a single blit
+instead of several pygame.draw calls. Entities describe their sprite with a key tuple:
+    ('rect', color, width, height): A filled rectangle (enemies, player, sword).
+    ('outlined_rect', color, width, height): A filled rectangle with a white border (potions).
+    ('circle', color, radius): A filled circle (projectiles).
+    ('outlined_circle', color, radius): A filled circle with a white outline (coins).
+    ('health_bar', step): An enemy health bar, see health_bar_key.
+Health bars are quantized into HEALTH_BAR_STEPS + 1 pre-rendered widths.
+Functions:
+    health_bar_key(ratio): Returns the sprite key of the health bar closest to a health ratio.
+Classes:
+    SpriteAtlas: Builds and stores the sprite surfaces.
+SpriteAtlas Methods:
+    __init__(): Pre-renders the sprites of all known entity kinds and colors.
+    get(key): Returns the surface for a sprite key, rasterizing it on first use if unknown.
+    health_bar(ratio): Returns the pre-rendered health bar closest to the given ratio.
+"""
+
+import pygame
+from constants import *
+from enemy_archetypes import ARCHETYPES
+
+# Color used as the transparent colorkey of round sprites
+COLORKEY = (255, 0, 254)
+
+ENEMY_COLORS = [archetype.color for archetype in ARCHETYPES]
+PROJECTILE_COLORS = list(SPELL_COLORS.values()) + [CYAN, PURPLE, DARK_RED]
+POTION_COLORS = [RED, BLUE]
+
+
+def health_bar_key(ratio):
+    """Return the sprite key of the pre-rendered health bar closest to the given health ratio."""
+    step = round(ratio * HEALTH_BAR_STEPS)
+    if step < 0:
+        step = 0
+    elif step > HEALTH_BAR_STEPS:
+        step = HEALTH_BAR_STEPS
+    return ('health_bar', step)
+
+
+class SpriteAtlas:
+    def __init__(self):
+        self.sprites = {}
+        for color in ENEMY_COLORS:
+            self.get(('rect', color, 30, 30))
+        for color in PROJECTILE_COLORS:
+            self.get(('circle', color, 5))
+        for color in POTION_COLORS:
+            self.get(('outlined_rect', color, 20, 20))
+        self.get(('outlined_circle', GOLD, 10))
+        self.get(('rect', BLUE, 30, 30))  # Player
+        self.get(('rect', YELLOW, 10, 90))  # Sword, vertical
+        self.get(('rect', YELLOW, 90, 10))  # Sword, horizontal
+
+        # Enemy health bars, from empty to full
+        self.health_bars = []
+        for step in range(HEALTH_BAR_STEPS + 1):
+            bar = pygame.Surface((30, 5))
+            bar.fill(RED)
+            bar.fill(GREEN, (0, 0, round(30 * step / HEALTH_BAR_STEPS), 5))
+            self.health_bars.append(bar)
+            self.sprites[('health_bar', step)] = bar
+
+    def get(self, key):
+        """Return the surface for a sprite key, rasterizing it the first time it is seen."""
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.rasterize(key)
+            self.sprites[key] = sprite
+        return sprite
+
+    def health_bar(self, ratio):
+        """Return the pre-rendered health bar closest to the given health ratio."""
+        return self.sprites[health_bar_key(ratio)]
+
+    def rasterize(self, key):
+        """Draw a sprite from its key with the same primitives the entities used to use."""
+        shape, color = key[0], key[1]
+        if shape in ('rect', 'outlined_rect'):
+            width, height = key[2], key[3]
+            surface = pygame.Surface((width, height))
+            surface.fill(color)
+            if shape == 'outlined_rect':
+                pygame.draw.rect(surface, WHITE, surface.get_rect(), 2)
+            return surface
+        radius = key[2]
+        surface = pygame.Surface((radius * 2, radius * 2))
+        surface.fill(COLORKEY)
+        pygame.draw.circle(surface, color, (radius, radius), radius)
+        if shape == 'outlined_circle':
+            pygame.draw.circle(surface, WHITE, (radius, radius), radius, 2)
+        surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        return surface
@@ -0,0 +1,64 @@
+"""
+This module handles the game's startup path: bringing up only the pygame subsystems that are
+needed, and timing each startup step.
+Nothing here runs at import time except creating the timer, so importing the game modules
+never opens a window or initializes audio and joysticks.
+Classes:
+    StartupTimer: Records how long each startup step took.
+Functions:
+    init_display(): Initializes only the display subsystem and opens the game window.
+Attributes:
+    startup_timer (StartupTimer): The process-wide startup timer.
+Usage:
+    Set TDA_STARTUP_TIMING=1 or pass --startup-timing to main.py to print the breakdown
+    once the deferred setup after the first frame is done.
+"""
+
+import os
+import sys
+import time
+import pygame
+from constants import *
+
+
+class StartupTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.steps = []
+        self.done = False
+
+    def mark(self, label):
+        """Record the time spent since the previous mark under the given label."""
+        if self.done:
+            return
+        now = time.perf_counter()
+        self.steps.append((label, (now - self.last) * 1000))
+        self.last = now
+
+    def finish(self):
+        """Stop recording and print the breakdown if it was requested."""
+        if self.done:
+            return
+        self.done = True
+        if os.environ.get('TDA_STARTUP_TIMING') or '--startup-timing' in sys.argv:
+            print(self.report())
+
+    def report(self):
+        """Return the startup breakdown as text."""
+        lines = ["Startup timing:"]
+        for label, ms in self.steps:
+            lines.append(f"  {label:<28}{ms:8.1f} ms")
+        lines.append(f"  {'total':<28}{(self.last - self.start) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer()
+
+
+def init_display():
+    """Initialize only the display subsystem and open the game window."""
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Top-Down Adventure")
+    return screen
@@ -0,0 +1,274 @@
+"""
+This module defines the status effects: the spells' burn, slow, stun and chain lightning on
+enemies, and the players' speed, damage and shield power-ups.
+Effects are stored in columns, one entry per active effect in each of the parallel lists: the
+kind, the target, the ticks remaining, the magnitude and the jumps left (chain lightning only).
+An index maps (target, kind) to the effect's row, so applying an effect that is already active
+refreshes it instead of stacking, and a removal moves the last row into the freed one, so both
+cost the same with one afflicted enemy or hundreds. Once per tick update() counts down every
+effect in one pass over the columns, deals the burn damage that is due and expires the effects
+that ran out. Starting and ending an effect goes through the APPLY and EXPIRE tables, indexed
+by the effect's kind, like the enemy behaviors.
+Spells take effect when their projectile hits an enemy:
+    - Fireball burns it, dealing a fraction of the spell's damage every BURN_INTERVAL ticks,
+    - Ice Spike slows it,
+    - Lightning Bolt stuns it, then jumps to the nearest enemy within CHAIN_RADIUS that is not
+      stunned yet, with less damage at each jump. Jump targets are found with a nearest-neighbor
+      query on the enemy SpatialHash that was built for the tick.
+Classes:
+    StatusEffects: Holds and updates every active status effect.
+StatusEffects Methods:
+    subscribe(event_bus): Applies the spell effects on ProjectileHit and drops those of dead enemies on EnemyKilled.
+    apply(target, kind, duration, magnitude=1.0, jumps=0): Starts an effect, or refreshes it if it is active.
+    remove(target, kind): Ends an effect without running its expiry.
+    remove_target(target): Ends every effect on a target without running their expiry.
+    update(enemy_grid): Counts every effect down by one tick, deals burn damage and expires effects.
+    clear(): Drops every effect.
+StatusEffects Attributes:
+    count (int): Number of active effects.
+Usage:
+    Run this module directly to measure applying, updating and expiring effects on many enemies:
+        python status_effects.py [enemies] [ticks]
+"""
+
+from constants import *
+from events import EnemyKilled, ProjectileHit
+
+# Effect kinds, used as indices into APPLY and EXPIRE
+BURN, SLOW, STUN, CHAIN, SPEED, DAMAGE, SHIELD = range(7)
+KINDS = ('burn', 'slow', 'stun', 'chain', 'speed', 'damage', 'shield')
+POWER_UPS = {'speed': SPEED, 'damage': DAMAGE, 'shield': SHIELD}
+
+
+class StatusEffects:
+    def __init__(self):
+        # Columns, one entry per active effect
+        self.kinds = []
+        self.targets = []
+        self.remaining = []
+        self.magnitudes = []
+        self.jumps = []
+        self.rows = {}  # (target, kind) -> row
+        self.count = 0
+        self.enemy_grid = None  # Grid of the tick being updated, for chain jumps
+
+    def subscribe(self, event_bus):
+        """Apply the spell effects when projectiles hit and drop those of enemies that die."""
+        event_bus.subscribe(ProjectileHit, self.on_projectile_hit)
+        event_bus.subscribe(EnemyKilled, self.on_enemy_killed)
+
+    def on_projectile_hit(self, event):
+        enemy = event.target
+        spell = event.projectile.spell
+        if enemy is None or spell is None or event.projectile.target_type != 'enemies':
+            return
+        damage = event.projectile.damage
+        if spell == 'Lightning Bolt':
+            # The bolt jumps on even if it killed the enemy
+            self.apply(enemy, CHAIN, CHAIN_DELAY, damage * CHAIN_FALLOFF, CHAIN_JUMPS)
+        if enemy.health <= 0:
+            return
+        if spell == 'Fireball':
+            self.apply(enemy, BURN, BURN_DURATION, damage * BURN_DAMAGE_FACTOR)
+        elif spell == 'Ice Spike':
+            self.apply(enemy, SLOW, SLOW_DURATION, SLOW_FACTOR)
+        elif spell == 'Lightning Bolt':
+            self.apply(enemy, STUN, STUN_DURATION)
+
+    def on_enemy_killed(self, event):
+        # A pending chain jump still leaves from where the enemy died
+        enemy = event.enemy
+        self.remove(enemy, BURN)
+        self.remove(enemy, SLOW)
+        self.remove(enemy, STUN)
+
+    def apply(self, target, kind, duration, magnitude=1.0, jumps=0):
+        """Start an effect on target for duration ticks, or refresh it if it is already active."""
+        key = (target, kind)
+        row = self.rows.get(key)
+        if row is not None:
+            # Refreshing keeps the stronger effect, so it never has to be undone and redone
+            if duration > self.remaining[row]:
+                self.remaining[row] = duration
+            if magnitude > self.magnitudes[row]:
+                self.magnitudes[row] = magnitude
+            return
+        self.rows[key] = self.count
+        self.kinds.append(kind)
+        self.targets.append(target)
+        self.remaining.append(duration)
+        self.magnitudes.append(magnitude)
+        self.jumps.append(jumps)
+        self.count += 1
+        APPLY[kind](self, target, magnitude)
+
+    def remove(self, target, kind):
+        """End an effect without running its expiry."""
+        row = self.rows.pop((target, kind), None)
+        if row is not None:
+            self.remove_row(row)
+
+    def remove_target(self, target):
+        """End every effect on target without running their expiry."""
+        for kind in range(len(KINDS)):
+            self.remove(target, kind)
+
+    def remove_row(self, row):
+        # The last row moves into the freed one
+        last = self.count - 1
+        if row != last:
+            kind = self.kinds[row] = self.kinds[last]
+            target = self.targets[row] = self.targets[last]
+            self.remaining[row] = self.remaining[last]
+            self.magnitudes[row] = self.magnitudes[last]
+            self.jumps[row] = self.jumps[last]
+            self.rows[(target, kind)] = row
+        self.kinds.pop()
+        self.targets.pop()
+        self.remaining.pop()
+        self.magnitudes.pop()
+        self.jumps.pop()
+        self.count = last
+
+    def update(self, enemy_grid):
+        """Count every effect down by one tick, deal the burn damage due and expire the effects that ran out."""
+        if not self.count:
+            return
+        self.enemy_grid = enemy_grid
+        kinds = self.kinds
+        targets = self.targets
+        remaining = self.remaining
+        # Backwards, so the rows moved by removals have already been counted down.
+        # Effects applied by expiries are appended past the rows still to visit.
+        for row in range(self.count - 1, -1, -1):
+            ticks = remaining[row] - 1
+            remaining[row] = ticks
+            kind = kinds[row]
+            if kind == BURN and ticks % BURN_INTERVAL == 0 and targets[row].health > 0:
+                targets[row].take_damage(self.magnitudes[row])
+            if ticks <= 0:
+                target = targets[row]
+                magnitude = self.magnitudes[row]
+                jumps = self.jumps[row]
+                del self.rows[(target, kind)]
+                self.remove_row(row)
+                EXPIRE[kind](self, target, magnitude, jumps)
+
+    def clear(self):
+        """Drop every effect."""
+        self.kinds.clear()
+        self.targets.clear()
+        self.remaining.clear()
+        self.magnitudes.clear()
+        self.jumps.clear()
+        self.rows.clear()
+        self.count = 0
+
+    # Starting and ending each kind of effect
+
+    def start_slow(self, enemy, factor):
+        enemy.speed = enemy.archetype.speed * factor
+        enemy.publish_state()
+
+    def end_slow(self, enemy, factor, jumps):
+        enemy.speed = enemy.archetype.speed
+        enemy.publish_state()
+
+    def start_stun(self, enemy, magnitude):
+        enemy.stunned = True
+        enemy.publish_state()
+
+    def end_stun(self, enemy, magnitude, jumps):
+        enemy.stunned = False
+        enemy.publish_state()
+
+    def end_chain(self, enemy, damage, jumps):
+        """Strike the nearest enemy that is not stunned yet and jump on from it."""
+        if self.enemy_grid is None:
+            return
+        x, y = enemy.rect.center
+        target = self.enemy_grid.nearest(x, y, CHAIN_RADIUS, exclude=enemy,
+                                         predicate=lambda other: other.health > 0 and not other.stunned)
+        if target is None:
+            return
+        target.take_damage(damage)
+        if target.health > 0:
+            self.apply(target, STUN, STUN_DURATION)
+        if jumps > 1:
+            self.apply(target, CHAIN, CHAIN_DELAY, damage * CHAIN_FALLOFF, jumps - 1)
+
+    def start_speed(self, player, factor):
+        player.power_ups['speed'] = True
+        player.speed = player.base_speed * factor
+
+    def end_speed(self, player, factor, jumps):
+        player.power_ups['speed'] = False
+        player.speed = player.base_speed
+
+    def start_damage(self, player, magnitude):
+        player.power_ups['damage'] = True
+
+    def end_damage(self, player, magnitude, jumps):
+        player.power_ups['damage'] = False
+
+    def start_shield(self, player, magnitude):
+        player.power_ups['shield'] = True
+
+    def end_shield(self, player, magnitude, jumps):
+        player.power_ups['shield'] = False
+
+    def start_nothing(self, target, magnitude):
+        pass
+
+    def end_nothing(self, target, magnitude, jumps):
+        pass
+
+
+# Start and end of each kind of effect, indexed by kind
+APPLY = [StatusEffects.start_nothing, StatusEffects.start_slow, StatusEffects.start_stun,
+         StatusEffects.start_nothing, StatusEffects.start_speed, StatusEffects.start_damage,
+         StatusEffects.start_shield]
+EXPIRE = [StatusEffects.end_nothing, StatusEffects.end_slow, StatusEffects.end_stun,
+          StatusEffects.end_chain, StatusEffects.end_speed, StatusEffects.end_damage,
+          StatusEffects.end_shield]
+
+
+if __name__ == "__main__":
+    # Cost of applying, updating and expiring effects with every enemy afflicted.
+    import random
+    import sys
+    import time
+    from crowd import CrowdSeparation
+    from enemy import Enemy
+    from timer_wheel import TimerWheel
+
+    enemy_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    random.seed(1)
+    timers = TimerWheel()
+    enemies = [Enemy(random.randint(50, WIDTH - 50), random.randint(HUD_HEIGHT + 50, HEIGHT - 50), timers)
+               for _ in range(enemy_count)]
+    for enemy in enemies:
+        enemy.health = enemy.max_health = 10 ** 9
+    crowd = CrowdSeparation()
+    crowd.rebuild(enemies)
+    effects = StatusEffects()
+    applied = updated = 0.0
+    applications = peak = 0
+    for tick in range(ticks):
+        # Every enemy is hit every few ticks, so effects keep starting, refreshing and expiring,
+        # and a Lightning Bolt chain starts every tick
+        start = time.perf_counter()
+        for enemy in enemies[tick % 10::10]:
+            effects.apply(enemy, random.choice((BURN, SLOW, STUN)), random.randint(1, BURN_DURATION), 5.0)
+            applications += 1
+        effects.apply(enemies[tick % enemy_count], CHAIN, CHAIN_DELAY, 5.0, CHAIN_JUMPS)
+        applications += 1
+        applied += time.perf_counter() - start
+        peak = max(peak, effects.count)
+        start = time.perf_counter()
+        effects.update(crowd.grid)
+        updated += time.perf_counter() - start
+    print(f"{enemy_count} enemies, {ticks} ticks, up to {peak} active effects")
+    print(f"  apply  {applied * 1e6 / applications:6.2f} us per effect")
+    print(f"  update {updated * 1000 / ticks:6.3f} ms per tick (countdown, burn damage, expiry and chain jumps)")
@@ -0,0 +1,299 @@
+"""
+This module defines the gameplay telemetry log and its offline reader.
+Telemetry records what happens in a session: enemy spawns by archetype, kills, damage taken,
+level-ups with the chosen stat, potion and coin pickups, game overs, and a frame-time summary
+every second, with the garbage collector pauses of that second. Recording never blocks the game loop:
+    - Each event is packed into a preallocated buffer with struct.pack_into. There are two
+      buffers; the game fills one while a background writer thread writes out the other.
+    - The writer swaps the buffers every TELEMETRY_FLUSH_INTERVAL seconds, or sooner when the
+      active one is half full. An event that does not fit, or that arrives while the buffers
+      are being swapped, is dropped and counted. The count is included in every frame-time
+      summary, so the log shows its own losses.
+    - Files are written to TELEMETRY_DIR, under $XDG_STATE_HOME (~/.local/state by default),
+      and rotated every TELEMETRY_FILE_BYTES bytes, keeping the newest TELEMETRY_MAX_FILES.
+File format: a FILE_HEADER (magic, version, session start as a Unix time) followed by
+length-prefixed records. Each record is a RECORD_HEADER (record size, event kind, simulation
+tick, milliseconds since the session started) followed by the event's PAYLOADS struct.
+Events:
+    SPAWN(archetype, x, y), KILL(archetype, exp), DAMAGE(target, amount), where target is the
+    archetype of the enemy hit or PLAYER_TARGET, LEVEL_UP(level, stat), PICKUP(item),
+    FRAME_TIMES(frames, mean_ms, p95_ms, max_ms, dropped), GAME_OVER(score, enemies_defeated),
+    GC_PAUSES(collections, total_ms, max_ms).
+Classes:
+    Telemetry: Records events and owns the writer thread.
+    FrameStats: Collects frame times and GC pauses and records a summary of them every second.
+Telemetry Methods:
+    __init__(clock, directory=TELEMETRY_DIR): Creates the buffers; clock returns the current tick.
+    start(): Starts the writer thread, and closes the log when the interpreter exits.
+    record(kind, *fields): Queues an event, or drops it if the buffer is full.
+    subscribe(event_bus): Records kills, damage and pickups posted on an event bus.
+    close(): Writes out everything recorded and stops the writer thread.
+FrameStats Methods:
+    add(seconds): Adds the work time of one frame.
+    add_gc(seconds): Adds the duration of one garbage collection.
+Functions:
+    telemetry_enabled(): Returns whether telemetry is on (TDA_TELEMETRY=0 turns it off).
+    read_records(path): Yields every event in a telemetry file as a dict.
+    write_csv(paths, out): Converts telemetry files to CSV.
+Usage:
+    Convert telemetry files, or whole directories of them, to CSV:
+        python telemetry.py [paths...] [-o out.csv]
+"""
+
+import atexit
+import os
+import struct
+import threading
+import time
+from constants import *
+from events import EnemyKilled, DamageTaken, ItemPicked
+from enemy_archetypes import ARCHETYPES
+
+TELEMETRY_DIR = os.path.join(
+    os.environ.get('XDG_STATE_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'state'),
+    'topdownadventure', 'telemetry')
+MAGIC = b'TDAT'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sBd')
+RECORD_HEADER = struct.Struct('<BBII')
+
+SPAWN, KILL, DAMAGE, LEVEL_UP, PICKUP, FRAME_TIMES, GAME_OVER, GC_PAUSES = range(8)
+EVENT_NAMES = ('spawn', 'kill', 'damage', 'level_up', 'pickup', 'frame_times', 'game_over', 'gc_pauses')
+PAYLOADS = (
+    struct.Struct('<BHH'),
+    struct.Struct('<BH'),
+    struct.Struct('<Bf'),
+    struct.Struct('<HB'),
+    struct.Struct('<B'),
+    struct.Struct('<HfffI'),
+    struct.Struct('<IH'),
+    struct.Struct('<Hff'),
+)
+FIELDS = (
+    ('archetype', 'x', 'y'),
+    ('archetype', 'exp'),
+    ('target', 'amount'),
+    ('level', 'stat'),
+    ('item',),
+    ('frames', 'mean_ms', 'p95_ms', 'max_ms', 'dropped'),
+    ('score', 'enemies_defeated'),
+    ('collections', 'total_ms', 'max_ms'),
+)
+PLAYER_TARGET = 255
+LEVEL_UP_STATS = ('max_mana', 'magic_damage', 'max_health', 'sword_damage')
+PICKUP_ITEMS = ('health', 'mana', 'coin')
+
+
+def telemetry_enabled():
+    """Return whether telemetry should be recorded."""
+    return os.environ.get('TDA_TELEMETRY', '1') not in ('', '0')
+
+
+class Telemetry:
+    def __init__(self, clock, directory=TELEMETRY_DIR):
+        self.clock = clock  # Returns the current simulation tick
+        self.directory = directory
+        self.session = time.time()
+        self.start_time = time.perf_counter()
+        self.buffer = bytearray(TELEMETRY_BUFFER_BYTES)  # Filled by the game
+        self.spare = bytearray(TELEMETRY_BUFFER_BYTES)  # Written out by the writer thread
+        self.used = 0
+        self.lock = threading.Lock()  # Only held to append a record or swap the buffers
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = threading.Thread(target=self.loop, name='telemetry', daemon=True)
+        self.recorded = 0
+        self.dropped = 0
+        self.file = None
+        self.file_index = 0
+        self.file_size = 0
+        self.error = None
+
+    def start(self):
+        """Start the writer thread. The log is also closed at exit, so sys.exit loses nothing."""
+        self.running = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, kind, *fields):
+        """Queue an event. Never blocks: when there is no room the event is dropped and counted."""
+        payload = PAYLOADS[kind]
+        size = RECORD_HEADER.size + payload.size
+        if not self.lock.acquire(False):
+            self.dropped += 1
+            return
+        try:
+            offset = self.used
+            if offset + size > TELEMETRY_BUFFER_BYTES:
+                self.dropped += 1
+                return
+            elapsed_ms = int((time.perf_counter() - self.start_time) * 1000)
+            RECORD_HEADER.pack_into(self.buffer, offset, size, kind, self.clock(), elapsed_ms)
+            payload.pack_into(self.buffer, offset + RECORD_HEADER.size, *fields)
+            self.used = offset + size
+        finally:
+            self.lock.release()
+        self.recorded += 1
+        if self.used > TELEMETRY_BUFFER_BYTES // 2:
+            self.wake.set()
+
+    def subscribe(self, event_bus):
+        """Record the kills, damage and pickups posted on an event bus."""
+        event_bus.subscribe(EnemyKilled, self.on_enemy_killed)
+        event_bus.subscribe(DamageTaken, self.on_damage_taken)
+        event_bus.subscribe(ItemPicked, self.on_item_picked)
+
+    def on_enemy_killed(self, event):
+        self.record(KILL, event.enemy.archetype_id, event.enemy.exp_value)
+
+    def on_damage_taken(self, event):
+        self.record(DAMAGE, getattr(event.target, 'archetype_id', PLAYER_TARGET), event.amount)
+
+    def on_item_picked(self, event):
+        self.record(PICKUP, PICKUP_ITEMS.index(event.kind))
+
+    def close(self):
+        """Write out everything recorded so far and stop the writer thread."""
+        if self.running:
+            self.running = False
+            self.wake.set()
+            self.thread.join()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def loop(self):
+        """Swap the buffers and write out the full one, until closed."""
+        while True:
+            self.wake.wait(TELEMETRY_FLUSH_INTERVAL)
+            self.wake.clear()
+            running = self.running
+            with self.lock:
+                full, used = self.buffer, self.used
+                self.buffer, self.used = self.spare, 0
+                self.spare = full
+            if used and self.error is None:
+                try:
+                    self.write(memoryview(full)[:used])
+                except OSError as error:
+                    self.error = error  # Keep the game running; later events are discarded
+                    print(f"Telemetry disabled: {error}")
+            if not running:
+                break
+
+    def write(self, data):
+        """Append whole records to the current file, starting a new file when it is full."""
+        if self.file is not None and self.file_size >= TELEMETRY_FILE_BYTES:
+            self.file.close()
+            self.file = None
+        if self.file is None:
+            self.open_file()
+        self.file.write(data)
+        self.file.flush()
+        self.file_size += len(data)
+
+    def open_file(self):
+        """Start the next telemetry file and delete the oldest ones beyond TELEMETRY_MAX_FILES."""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.session))
+        self.file_index += 1
+        path = os.path.join(self.directory, f'telemetry-{stamp}-{self.file_index:04d}.bin')
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, self.session))
+        self.file_size = FILE_HEADER.size
+        files = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith('telemetry-') and name.endswith('.bin'))
+        for name in files[:-TELEMETRY_MAX_FILES]:
+            os.remove(os.path.join(self.directory, name))
+
+
+class FrameStats:
+    def __init__(self, telemetry):
+        self.telemetry = telemetry
+        self.times = []
+        self.gc_pauses = []
+        self.next_summary = time.perf_counter() + 1
+
+    def add_gc(self, seconds):
+        """Add the duration of one garbage collection."""
+        self.gc_pauses.append(seconds)
+
+    def add(self, seconds):
+        """Add the work time of one frame, and record a summary once a second has passed."""
+        self.times.append(seconds)
+        now = time.perf_counter()
+        if now < self.next_summary:
+            return
+        self.next_summary = now + 1
+        times = sorted(self.times)
+        self.times.clear()
+        frames = len(times)
+        self.telemetry.record(FRAME_TIMES, min(frames, 0xFFFF), sum(times) * 1000 / frames,
+                              times[min(frames - 1, frames * 95 // 100)] * 1000, times[-1] * 1000,
+                              self.telemetry.dropped)
+        pauses = self.gc_pauses
+        if pauses:
+            self.telemetry.record(GC_PAUSES, min(len(pauses), 0xFFFF), sum(pauses) * 1000, max(pauses) * 1000)
+            pauses.clear()
+
+
+def read_records(path):
+    """Yield every event in a telemetry file as a dict of its fields."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, session = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} telemetry file")
+    offset = FILE_HEADER.size
+    while offset + RECORD_HEADER.size <= len(data):
+        size, kind, tick, elapsed_ms = RECORD_HEADER.unpack_from(data, offset)
+        if size == 0 or offset + size > len(data):
+            break  # Truncated by a crash while writing
+        record = {'session': session, 'time_ms': elapsed_ms, 'tick': tick, 'event': EVENT_NAMES[kind]}
+        record.update(zip(FIELDS[kind], PAYLOADS[kind].unpack_from(data, offset + RECORD_HEADER.size)))
+        offset += size
+        if 'archetype' in record:
+            record['archetype'] = ARCHETYPES[record['archetype']].name
+        if kind == DAMAGE:
+            target = record['target']
+            record['target'] = 'player' if target == PLAYER_TARGET else ARCHETYPES[target].name
+        elif kind == LEVEL_UP:
+            record['stat'] = LEVEL_UP_STATS[record['stat']]
+        elif kind == PICKUP:
+            record['item'] = PICKUP_ITEMS[record['item']]
+        yield record
+
+
+def write_csv(paths, out):
+    """Write the events of the given telemetry files, in order, as CSV."""
+    import csv
+    columns = ['session', 'time_ms', 'tick', 'event']
+    for fields in FIELDS:
+        columns += [field for field in fields if field not in columns]
+    writer = csv.DictWriter(out, columns)
+    writer.writeheader()
+    for path in paths:
+        for record in read_records(path):
+            writer.writerow(record)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Convert telemetry files to CSV.")
+    parser.add_argument('paths', nargs='*', default=[TELEMETRY_DIR], help="files or directories")
+    parser.add_argument('-o', '--output', help="CSV file to write instead of standard output")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.bin'))
+        else:
+            paths.append(path)
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_csv(paths, out)
+    else:
+        write_csv(paths, sys.stdout)
@@ -0,0 +1,128 @@
+"""
+This module defines the TimerWheel, a hierarchical timer wheel keyed on the simulation tick.
+Timers are placed in a slot by the tick they are due at, so advancing the wheel by one tick
+only looks at the timers due on that tick instead of decrementing every countdown.
+The wheel has three levels: 256 slots of one tick, 64 slots of 256 ticks and 64 slots of
+16384 ticks. Timers further away than the top level wait in an overflow list. When the tick
+counter crosses the boundary of a higher-level slot, that slot's timers are redistributed
+("cascaded") into the finer levels, so every timer still fires on exactly its tick.
+Cooldowns that are only ever checked ("can I attack yet?") do not need a timer at all:
+entities store the tick at which they are ready and compare it with TimerWheel.now.
+Classes:
+    Timer: A scheduled callback; keep it to cancel it.
+    TimerWheel: Holds the timers and fires them as the ticks advance.
+TimerWheel Methods:
+    __init__(): Creates an empty wheel at tick 0.
+    schedule(delay, callback, *args): Calls callback(*args) in delay ticks.
+    schedule_at(tick, callback, *args): Calls callback(*args) on the given tick.
+    every(interval, callback, *args): Calls callback(*args) every interval ticks until cancelled.
+    cancel(timer): Cancels a timer.
+    advance(ticks=1): Moves time forward, firing the timers that become due.
+    clear(): Drops every timer and goes back to tick 0, for a new game.
+"""
+
+LEVEL_BITS = (8, 6, 6)
+LEVEL_SHIFTS = (0, 8, 14)
+LEVEL_SPANS = (1 << 8, 1 << 14, 1 << 20)  # Largest delay each level can hold
+
+
+class Timer:
+    __slots__ = ('tick', 'interval', 'callback', 'args', 'cancelled')
+
+    def __init__(self, tick, interval, callback, args):
+        self.tick = tick
+        self.interval = interval  # Repeat period in ticks, or 0 for a one-shot timer
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancel the timer. A cancelled timer is dropped when its slot comes up."""
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self):
+        self.now = 0
+        self.levels = [[[] for _ in range(1 << bits)] for bits in LEVEL_BITS]
+        self.overflow = []
+        self.fired = 0
+
+    def schedule(self, delay, callback, *args):
+        """Call callback(*args) in delay ticks and return the Timer."""
+        return self.schedule_at(self.now + delay, callback, *args)
+
+    def schedule_at(self, tick, callback, *args):
+        """Call callback(*args) on the given tick, or on the next one if it has passed."""
+        timer = Timer(max(tick, self.now + 1), 0, callback, args)
+        self._insert(timer)
+        return timer
+
+    def every(self, interval, callback, *args):
+        """Call callback(*args) every interval ticks until the returned Timer is cancelled."""
+        timer = Timer(self.now + interval, interval, callback, args)
+        self._insert(timer)
+        return timer
+
+    def cancel(self, timer):
+        """Cancel a timer; None is ignored."""
+        if timer is not None:
+            timer.cancelled = True
+
+    def advance(self, ticks=1):
+        """Move time forward, firing every timer that becomes due, in tick order."""
+        for _ in range(ticks):
+            self.now += 1
+            now = self.now
+            if now & 0xFF == 0:
+                if (now >> 8) & 0x3F == 0:
+                    if (now >> 14) & 0x3F == 0:
+                        overflow = self.overflow
+                        self.overflow = []
+                        for timer in overflow:
+                            self._insert(timer)
+                    self._cascade(2, (now >> 14) & 0x3F)
+                self._cascade(1, (now >> 8) & 0x3F)
+
+            slots = self.levels[0]
+            bucket = slots[now & 0xFF]
+            if not bucket:
+                continue
+            slots[now & 0xFF] = []
+            for timer in bucket:
+                if timer.cancelled:
+                    continue
+                if timer.tick > now:
+                    self._insert(timer)
+                    continue
+                self.fired += 1
+                timer.callback(*timer.args)
+                if timer.interval and not timer.cancelled:
+                    timer.tick += timer.interval
+                    self._insert(timer)
+
+    def clear(self):
+        """Drop every timer and go back to tick 0."""
+        for slots in self.levels:
+            for bucket in slots:
+                bucket.clear()
+        self.overflow.clear()
+        self.now = 0
+
+    def _cascade(self, level, index):
+        slots = self.levels[level]
+        bucket = slots[index]
+        if bucket:
+            slots[index] = []
+            for timer in bucket:
+                if not timer.cancelled:
+                    self._insert(timer)
+
+    def _insert(self, timer):
+        delay = timer.tick - self.now
+        for level, span in enumerate(LEVEL_SPANS):
+            if delay < span:
+                slots = self.levels[level]
+                slots[(timer.tick >> LEVEL_SHIFTS[level]) & (len(slots) - 1)].append(timer)
+                return
+        self.overflow.append(timer)